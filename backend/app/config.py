@@ -5,14 +5,118 @@ class Settings(BaseSettings):
     # Path to your CSV (keep this name or point to your file)
     DATA_PATH: str = "app/data/sample_products.csv"
 
+    # Normalized catalog compiled to Parquet on first load (needs pyarrow).
+    # Rebuilt whenever the CSV is newer. Empty string disables it.
+    CATALOG_COMPILED_PATH: str = "app/data/catalog.parquet"
+
+    # Rows added through /data/upload (append-only JSONL, replayed on boot).
+    UPLOADS_PATH: str = "app/data/uploads.jsonl"
+
+    # /data/upload reads, validates and embeds the CSV this many rows at a time.
+    INGEST_CHUNK_ROWS: int = 2000
+
     # Local FAISS index dir
     VECTOR_INDEX_DIR: str = "app/vector_index"
 
+    # Index generations live in VECTOR_INDEX_DIR/gen-*, with CURRENT naming the live one.
+    # Workers re-check CURRENT every VS_RELOAD_INTERVAL seconds; older generations
+    # beyond the newest VS_KEEP_GENERATIONS are deleted after each rebuild.
+    VS_KEEP_GENERATIONS: int = 2
+    VS_RELOAD_INTERVAL: float = 5.0
+
+    # Vector search engine: "exact" (brute-force scan) or "ivf" (approximate).
+    # IVF_NPROBE is the recall/latency knob; IVF_NLIST=0 picks ~4*sqrt(N) lists.
+    VS_INDEX_TYPE: str = "exact"
+    VS_IVF_NLIST: int = 0
+    VS_IVF_NPROBE: int = 8
+
+    # Memory-map vectors.npy read-only instead of loading it into each worker
+    VS_MMAP: bool = False
+
+    # Vector storage: "float32" or "int8" (scalar-quantized codes, 4x smaller).
+    # int8 re-ranks a shortlist of VS_RERANK * k rows with the float32 vectors.
+    VS_STORAGE: str = "float32"
+    VS_RERANK: int = 4
+
+    # /recommend mode="hybrid" fuses the top HYBRID_DEPTH dense and BM25 rows with
+    # reciprocal rank fusion (1 / (HYBRID_RRF_K + rank)); mode="shortlist" scores
+    # only the top HYBRID_DEPTH BM25 rows with embeddings.
+    HYBRID_DEPTH: int = 100
+    HYBRID_RRF_K: int = 60
+
+    # Image embeddings behind /cv/similar, built by `python -m app.jobs.build_visual_index`
+    VISUAL_INDEX_DIR: str = "app/visual_index"
+
     # Small, local sentence-transformer (fast + no internet)
     EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
 
+    # Fast CPU encoder: int8 dynamic quantization of the embedder's Linear layers, with
+    # texts encoded in token-length order. Measure the quality cost with
+    # `python -m benchmarks.encoder`. Each index generation records the encoder it was built
+    # with; after switching, search answers 503 while the index is rebuilt.
+    EMBEDDING_QUANTIZE: bool = False
+    # Texts per encoder forward pass, and torch intra-op threads (0 = torch default).
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_THREADS: int = 0
+
+    # On-disk embedding cache (model name + text hash). Empty string disables it.
+    EMBEDDING_CACHE_DIR: str = "app/embedding_cache"
+
     # GenAI model name to use via transformers pipeline (local)
     # Uses gpt2-like small model. If it’s heavy, generator will gracefully fallback.
     GENAI_MODEL: str = "gpt2"
 
+    # Shared model host (`python -m app.model_server`): when set, workers send encode /
+    # generate calls to this socket (a file path; \\.\pipe\<name> on Windows) instead of
+    # each loading its own copy of the models. Workers wait up to
+    # MODEL_SERVER_CONNECT_TIMEOUT seconds at startup for the server to finish warming up.
+    MODEL_SERVER: str = ""
+    MODEL_SERVER_CONNECT_TIMEOUT: float = 120.0
+    # Shared secret for the model server connection. Empty: the server creates a random
+    # one in MODEL_SERVER_AUTHKEY_FILE (mode 0600; default: "<socket>.key", or
+    # "<temp dir>/<pipe name>.key" on Windows) and workers of the same user read it there.
+    MODEL_SERVER_AUTHKEY: str = ""
+    MODEL_SERVER_AUTHKEY_FILE: str = ""
+
+    # Model server micro-batching: calls arriving within MODEL_SERVER_BATCH_WAIT seconds
+    # run as one forward pass of up to MODEL_SERVER_MAX_BATCH texts to encode or
+    # MODEL_SERVER_GEN_BATCH prompts to generate.
+    MODEL_SERVER_MAX_BATCH: int = 64
+    MODEL_SERVER_GEN_BATCH: int = 8
+    MODEL_SERVER_BATCH_WAIT: float = 0.005
+
+    # Load the models (and encode once) when a worker starts instead of on its first
+    # request. Off by default to keep small deployments' memory / boot time low.
+    MODEL_WARMUP: bool = False
+
+    # Upper bound (seconds) on description generation per /recommend call;
+    # slower batches fall back to canned text. 0 disables the cap.
+    GENAI_TIMEOUT: float = 8.0
+
+    # Admission control for /recommend: requests allowed in each stage at once (0 = unlimited)
+    # and how many may queue per stage. A full queue, or a wait past REQUEST_DEADLINE seconds
+    # from arrival, answers 503 for embed / search and falls back to canned text for generation.
+    EMBED_CONCURRENCY: int = 4
+    SEARCH_CONCURRENCY: int = 8
+    GENERATE_CONCURRENCY: int = 2
+    STAGE_QUEUE_SIZE: int = 64
+    REQUEST_DEADLINE: float = 10.0
+
+    # Precomputed base descriptions (see app/jobs/generate_descriptions.py).
+    # /recommend serves these; live generation is opt-in per request.
+    DESCRIPTIONS_PATH: str = "app/data/descriptions.jsonl"
+    # Rows the batch job has not covered yet get the canned description; set this to
+    # generate them inline instead (puts the LLM back on the request path).
+    DESCRIPTIONS_GENERATE_MISSING: bool = False
+
+    # Add a Server-Timing header (per-stage ms: embed, search, generate, ...) to
+    # every response, for profiling from the browser dev tools.
+    SERVER_TIMING: bool = False
+
+    # In-process /recommend caches: normalized query -> embedding and (query, k) -> hits.
+    # Bounded LRU with a TTL in seconds; hits are dropped whenever /data/upload changes the catalog.
+    QUERY_CACHE_SIZE: int = 2048
+    RESULT_CACHE_SIZE: int = 2048
+    QUERY_CACHE_TTL: float = 3600.0
+
 settings = Settings()
@@ -0,0 +1,96 @@
+# app/jobs/build_visual_index.py
+"""
+Offline batch job: embed every catalog image with the CV model and store the
+vectors in the visual index behind /cv/similar.
+
+    python -m app.jobs.build_visual_index --batch-size 32 --workers 8
+
+Images are downloaded / decoded on a thread pool while ResNet runs on fixed
+size batches. Each batch is appended to the index as it finishes, and rows
+already indexed are skipped, so an interrupted run resumes where it stopped.
+Images that fail to load are counted and retried on the next run.
+"""
+from __future__ import annotations
+import argparse
+import os
+import time
+from typing import List, Tuple
+
+import pandas as pd
+
+from ..config import settings
+from ..services.catalog import Catalog, split_first
+from ..services.ingest import UploadStore
+from ..services.visual_index import VisualIndex
+
+IMAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "images")
+
+
+def image_ref(images, image_dir: str) -> str:
+    """First image of an `images` cell: URL, or local path for files in data/images."""
+    v = split_first(images)
+    if not v or v.lower().startswith(("http://", "https://")):
+        return v
+    path = os.path.join(image_dir, v)
+    return path if os.path.isfile(path) else ""
+
+
+def pending_images(df: pd.DataFrame, index: VisualIndex, image_dir: str) -> List[Tuple[str, str]]:
+    """(uniq_id, image ref) for rows with an image that the index does not have yet."""
+    out, seen = [], set()
+    for uid, images in zip(df["uniq_id_str"], df["images"]):
+        ref = image_ref(images, image_dir)
+        if ref and uid and uid not in seen and uid not in index:
+            seen.add(uid)
+            out.append((uid, ref))
+    return out
+
+
+def run(csv_path: str, index_dir: str, batch_size: int = 32, workers: int = 8, limit: int = 0,
+        threads: int = 0) -> int:
+    import torch
+    from ..models_cv import CVClassifier
+
+    if threads:
+        torch.set_num_threads(threads)
+    catalog = Catalog.load(csv_path, compiled_path=settings.CATALOG_COMPILED_PATH or None, image_dir=IMAGE_DIR)
+    for rows in UploadStore(settings.UPLOADS_PATH).frames(settings.INGEST_CHUNK_ROWS):
+        catalog.append(rows)  # products added through /data/upload
+    index = VisualIndex(index_dir)
+    todo = pending_images(catalog.df, index, IMAGE_DIR)
+    if limit:
+        todo = todo[:limit]
+    total = len(todo)
+    print(f"{index.n} indexed, {total} pending")
+    if not total:
+        return 0
+
+    clf = CVClassifier()
+    done, failed, seen, t0 = 0, 0, 0, time.time()
+    for pos, feats in clf.process([ref for _, ref in todo], batch_size=batch_size, workers=workers):
+        index.append([todo[i][0] for i in pos], feats)
+        done += len(pos)
+        failed += pos[-1] + 1 - seen - len(pos)
+        seen = pos[-1] + 1
+        rate = done / max(1e-9, time.time() - t0)
+        print(f"{seen}/{total} images, {done} indexed, {failed} failed ({rate:.1f} images/s)", flush=True)
+    failed += total - seen
+    print(f"done: {done} indexed, {failed} failed")
+    return done
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Embed catalog images into the visual similarity index.")
+    ap.add_argument("--csv", default=settings.DATA_PATH, help="catalog CSV (default: DATA_PATH)")
+    ap.add_argument("--out", default=settings.VISUAL_INDEX_DIR, help="index dir (default: VISUAL_INDEX_DIR)")
+    ap.add_argument("--batch-size", type=int, default=32, help="images per model forward pass")
+    ap.add_argument("--workers", type=int, default=8, help="download / decode threads")
+    ap.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0: torch default)")
+    ap.add_argument("--limit", type=int, default=0, help="only process the first N pending images")
+    args = ap.parse_args()
+    run(args.csv, args.out, batch_size=args.batch_size, workers=args.workers, limit=args.limit,
+        threads=args.threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# app/jobs/generate_descriptions.py
+"""
+Offline batch job: precompute a base description for every catalog row.
+
+    python -m app.jobs.generate_descriptions --workers 2 --chunk-size 32
+
+Covers the base CSV plus the products added through /data/upload (the
+uploads log). Rows whose uniq_id is already in the store are skipped, so
+an interrupted run resumes where it stopped. Chunks are generated on a
+process pool (one DescriptionGenerator per worker) and appended to the
+store as they finish.
+"""
+from __future__ import annotations
+import argparse
+import multiprocessing as mp
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Tuple
+
+import pandas as pd
+
+from ..config import settings
+from ..services.descriptions import DescriptionStore
+from ..services.genai import PROMPT_FIELDS, DescriptionGenerator, product_prompt
+from ..services.ingest import UploadStore
+
+PROMPT_COLS = ["uniq_id"] + PROMPT_FIELDS
+
+_generator: DescriptionGenerator | None = None
+
+
+def _init_worker(model_name: str):
+    global _generator
+    _generator = DescriptionGenerator(model_name=model_name)
+
+
+def _generate_chunk(rows: List[dict]) -> List[Tuple[str, str]]:
+    texts = _generator.generate_batch([product_prompt(r) for r in rows])
+    return [(str(r["uniq_id"]), t) for r, t in zip(rows, texts)]
+
+
+def pending_rows(df: pd.DataFrame, store: DescriptionStore) -> List[dict]:
+    df = df.reindex(columns=PROMPT_COLS).fillna("")
+    df = df[df["uniq_id"].astype(str).str.strip() != ""].drop_duplicates("uniq_id")
+    return [r for r in df.to_dict("records") if str(r["uniq_id"]) not in store]
+
+
+def run(csv_path: str, store_path: str, model_name: str, workers: int = 1, chunk_size: int = 32,
+        limit: int = 0) -> int:
+    store = DescriptionStore(store_path)
+    # products added through /data/upload, in catalog order after the base CSV
+    frames = [pd.read_csv(csv_path)] + list(UploadStore(settings.UPLOADS_PATH).frames(settings.INGEST_CHUNK_ROWS))
+    rows = pending_rows(pd.concat(frames, ignore_index=True), store)
+    if limit:
+        rows = rows[:limit]
+    total = len(rows)
+    print(f"{len(store)} stored, {total} pending")
+    if not total:
+        return 0
+
+    chunks = [rows[i:i + chunk_size] for i in range(0, total, chunk_size)]
+    done, t0 = 0, time.time()
+    # spawn: torch/tokenizers are not fork-safe once initialised
+    ctx = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=_init_worker, initargs=(model_name,)) as pool:
+        futures = [pool.submit(_generate_chunk, c) for c in chunks]
+        for fut in as_completed(futures):
+            items = fut.result()
+            store.append(items)
+            done += len(items)
+            rate = done / max(1e-9, time.time() - t0)
+            print(f"{done}/{total} rows ({rate:.1f} rows/s)", flush=True)
+    return done
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Precompute per-product descriptions.")
+    ap.add_argument("--csv", default=settings.DATA_PATH, help="catalog CSV (default: DATA_PATH)")
+    ap.add_argument("--out", default=settings.DESCRIPTIONS_PATH, help="JSONL store (default: DESCRIPTIONS_PATH)")
+    ap.add_argument("--model", default=settings.GENAI_MODEL)
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--chunk-size", type=int, default=32)
+    ap.add_argument("--limit", type=int, default=0, help="only process the first N pending rows")
+    args = ap.parse_args()
+    run(args.csv, args.out, args.model, workers=args.workers, chunk_size=args.chunk_size, limit=args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,32 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Response, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from functools import lru_cache
+import numpy as np
 import pandas as pd
-import os, urllib.parse, requests, math
+import os, re, requests, json, shutil, tempfile, threading, time
 
 from .config import settings
 from .services.embeddings import TextEmbedder
-from .services.vector_store import VectorStore
-from .services.genai import DescriptionGenerator
-from .services.analytics import compute_analytics
+from .services.vector_store import SEARCH_MODES, VectorStore
+from .services.genai import FALLBACK_TEXT, PROMPT_FIELDS, DescriptionGenerator, product_prompt
+from .services.descriptions import DescriptionStore
+from .services.analytics import AnalyticsAggregator
 from .services.nlp import cluster_products
+from .services.cache import TTLCache
+from .services.filters import AttributeIndex
+from .services.catalog import Catalog
+from .services.ingest import IngestQueue, UploadStore
+from .services.index_manager import IndexFork, IndexManager
+from .services.metrics import REGISTRY, timed, start_request_timings, server_timing_header
+from .services.model_server import ModelClient, RemoteEmbedder, RemoteGenerator, RemoteImageEmbedder
+from .services.visual_index import VisualIndex
+from .services.admission import AsyncStageLimiter, Overloaded, SingleFlight, remaining
+from .services.warmup import WarmUp
 
 # ----------------- FastAPI App -----------------
 app = FastAPI(title="AI-ML Furniture Recommender")
@@ -26,7 +40,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Health check for Render
+# ----------------- Metrics -----------------
+REQUEST_SECONDS = REGISTRY.histogram("recommender_http_request_seconds", "HTTP request latency by route.")
+REQUESTS = REGISTRY.counter("recommender_http_requests_total", "HTTP requests by route and status.")
+MODEL_LOAD_SECONDS = REGISTRY.gauge("recommender_model_load_seconds", "Time taken to load each model.")
+DESCRIPTIONS = REGISTRY.counter("recommender_descriptions_total", "Descriptions served, by source.")
+INGEST_ROWS = REGISTRY.counter("recommender_ingest_rows_total", "Rows appended through /data/upload.")
+
+@app.middleware("http")
+async def instrument(request: Request, call_next):
+    rec = start_request_timings()
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    dt = time.perf_counter() - t0
+    # route template, not the raw path, to keep label cardinality bounded
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    REQUEST_SECONDS.observe(dt, route=route, method=request.method)
+    REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    if settings.SERVER_TIMING:
+        # streamed responses only include the stages finished before the first byte
+        response.headers["Server-Timing"] = server_timing_header(rec, total=dt)
+        response.headers["Timing-Allow-Origin"] = "*"
+    return response
+
+# Liveness (Render health check): answers as soon as the process is up, even while warming up
 @app.get("/healthz")
 def healthz():
     return {"ok": True}
@@ -36,103 +73,344 @@ STATIC_IMG_DIR = os.path.join(os.path.dirname(__file__), "data", "images")
 if os.path.isdir(STATIC_IMG_DIR):
     app.mount("/images", StaticFiles(directory=STATIC_IMG_DIR), name="images")
 
-# ----------------- Helper Functions -----------------
-def split_first(raw) -> str:
-    if not isinstance(raw, str):
-        return ""
-    first = raw.split("|")[0].split(",")[0].strip()
-    return first.strip().strip("'\"").strip()
+# ----------------- Data Load -----------------
+DATA_PATH = settings.DATA_PATH
 
-def to_price_number(v) -> Optional[float]:
-    if v is None:
-        return None
-    s = str(v).strip().replace(",", "")
-    for sym in ["₹", "$", "€", "£"]:
-        s = s.replace(sym, "")
-    try:
-        return float(s)
-    except:
-        return None
+# set by load_catalog() on the warm-up thread, not at import (see warmup below)
+catalog: Optional[Catalog] = None
+upload_store: Optional[UploadStore] = None
+attr_index: Optional[AttributeIndex] = None
+analytics: Optional[AnalyticsAggregator] = None
 
-def build_click_url(row: pd.Series) -> str:
-    for cand in ["product_url", "url", "link", "product_link"]:
-        if cand in row and isinstance(row[cand], str) and row[cand].strip():
-            return row[cand].strip()
-    q = f"{row.get('title','')} {row.get('brand','')}".strip() or str(row.get("uniq_id","furniture"))
-    return f"https://www.google.com/search?q={urllib.parse.quote(q)}"
+# bumped whenever the catalog changes; part of derived-data cache keys
+catalog_version = 0
 
-def json_none_if_nan(x):
+def load_catalog():
+    global catalog, upload_store, attr_index, analytics
     try:
-        if isinstance(x, float) and math.isnan(x):
-            return None
-    except:
-        pass
-    return x if x is not None else None
+        # compiled Parquet copy is reused while it is newer than the CSV
+        cat = Catalog.load(DATA_PATH, compiled_path=settings.CATALOG_COMPILED_PATH or None, image_dir=STATIC_IMG_DIR)
+    except Exception as e:
+        raise RuntimeError(f"Failed to load dataset at {DATA_PATH}: {e}")
 
-# ----------------- Data Load -----------------
-DATA_PATH = settings.DATA_PATH
-required_cols = [
-    "uniq_id","title","brand","description","price","categories","images",
-    "manufacturer","package dimensions","country_of_origin","material","color"
-]
-
-try:
-    df = pd.read_csv(DATA_PATH)
-    for c in required_cols:
-        if c not in df.columns:
-            df[c] = ""
-    df["price_num"] = df["price"].apply(to_price_number) if "price" in df.columns else None
-    df["image_first"] = df["images"].apply(split_first) if "images" in df.columns else ""
-except Exception as e:
-    raise RuntimeError(f"Failed to load dataset at {DATA_PATH}: {e}")
+    # rows from earlier uploads, in upload order (row i <-> vector i)
+    store = UploadStore(settings.UPLOADS_PATH)
+    for rows in store.frames(settings.INGEST_CHUNK_ROWS):
+        cat.append(rows)
+
+    # price / brand / category / material / color indexes for filtered search
+    attr_index = AttributeIndex.from_frame(cat.df)
+    # running aggregates for /analytics/summary, updated on upload
+    analytics = AnalyticsAggregator.from_frame(cat.df)
+    upload_store = store
+    catalog = cat  # last: the warm-up gate below opens once this is set
 
 # ----------------- Lazy Initialization for Render -----------------
 @lru_cache
-def get_embedder():
-    return TextEmbedder(model_name=settings.EMBEDDING_MODEL)
+def get_model_client() -> ModelClient:
+    # one connection per worker to the shared model host (settings.MODEL_SERVER)
+    return ModelClient(settings.MODEL_SERVER, connect_timeout=settings.MODEL_SERVER_CONNECT_TIMEOUT,
+                       authkey=settings.MODEL_SERVER_AUTHKEY.encode() or None,
+                       authkey_file=settings.MODEL_SERVER_AUTHKEY_FILE)
 
 @lru_cache
-def get_vs():
-    return VectorStore(index_dir=settings.VECTOR_INDEX_DIR)
+def get_embedder():
+    if settings.MODEL_SERVER:
+        return RemoteEmbedder(get_model_client(), model_name=settings.EMBEDDING_MODEL)
+    t0 = time.perf_counter()
+    emb = TextEmbedder(model_name=settings.EMBEDDING_MODEL, cache_dir=settings.EMBEDDING_CACHE_DIR or None,
+                       quantize=settings.EMBEDDING_QUANTIZE, batch_size=settings.EMBEDDING_BATCH_SIZE,
+                       threads=settings.EMBEDDING_THREADS)
+    MODEL_LOAD_SECONDS.set(time.perf_counter() - t0, model="embedder")
+    return emb
+
+def open_vs(index_dir: str, mmap: Optional[bool] = None) -> VectorStore:
+    return VectorStore(
+        index_dir=index_dir,
+        index_type=settings.VS_INDEX_TYPE,
+        nprobe=settings.VS_IVF_NPROBE,
+        nlist=settings.VS_IVF_NLIST,
+        mmap=settings.VS_MMAP if mmap is None else mmap,
+        storage=settings.VS_STORAGE,
+        rerank=settings.VS_RERANK,
+    )
+
+def get_vs() -> Optional[VectorStore]:
+    # live index generation (hot-swapped after a rebuild); None before the first build
+    return index_manager.store()
 
 @lru_cache
 def get_genai():
-    return DescriptionGenerator()
+    if settings.MODEL_SERVER:
+        return RemoteGenerator(get_model_client(), model_name=settings.GENAI_MODEL)
+    t0 = time.perf_counter()
+    genai = DescriptionGenerator()
+    MODEL_LOAD_SECONDS.set(time.perf_counter() - t0, model="genai")
+    return genai
+
+def warm_up_models():
+    """Keep model loading out of user requests (see MODEL_SERVER / MODEL_WARMUP)."""
+    if settings.MODEL_SERVER:
+        # blocks until the model server listens, which it only does once its models are warm
+        get_model_client().call("status")
+    elif settings.MODEL_WARMUP:
+        with timed("warmup"):
+            get_embedder().encode(["warm up"])
+            get_genai()
 
-SKIP_VS_BUILD = os.getenv("SKIP_VS_BUILD", "0") == "1"
+@lru_cache
+def get_cv():
+    if settings.MODEL_SERVER:
+        # image embeddings come from the model server too (python -m app.model_server --cv)
+        return RemoteImageEmbedder(get_model_client())
+    from .models_cv import CVClassifier  # torch / torchvision load only for image queries
+    t0 = time.perf_counter()
+    clf = CVClassifier()
+    MODEL_LOAD_SECONDS.set(time.perf_counter() - t0, model="cv")
+    return clf
 
-def ensure_index_built(df):
-    vs = get_vs()
-    if vs.is_built() or SKIP_VS_BUILD:
-        return
-    emb = get_embedder()
-    vs.build(
-        df,
-        emb,
-        text_cols=["title","description","categories","brand","material","color"]
-    )
+@lru_cache
+def get_visual_index() -> VisualIndex:
+    return VisualIndex(settings.VISUAL_INDEX_DIR)
+
+@lru_cache
+def get_desc_store():
+    return DescriptionStore(settings.DESCRIPTIONS_PATH)
 
-# ----------------- Image Resolution -----------------
-AMAZON_PREFIX = "https://m.media-amazon.com/images/I/"
+SKIP_VS_BUILD = os.getenv("SKIP_VS_BUILD", "0") == "1"
 
-def resolve_image_url(val: str, request: Request) -> Optional[str]:
-    if not val:
-        return None
-    v = val.strip().strip("'\"")
-    if v.lower().startswith("http://") or v.lower().startswith("https://"):
-        return v
-    if v.lower().endswith((".jpg", ".jpeg", ".png", ".webp")) and "/" not in v:
-        return f"{AMAZON_PREFIX}{urllib.parse.quote(v)}"
-    local_path = os.path.join(STATIC_IMG_DIR, v)
-    if os.path.isfile(local_path):
-        base = str(request.base_url).rstrip("/")
-        return f"{base}/images/{urllib.parse.quote(v)}"
-    return None
+INDEX_TEXT_COLS = ["title","description","categories","brand","material","color"]
+
+# serializes index writes in this process (generation swaps, catch-up, ingestion);
+# index_manager.writing() adds the lock shared with the other workers
+index_lock = threading.RLock()
+
+def on_index_swap(vs: VectorStore):
+    # hits from the previous generation may rank differently
+    result_cache.clear()
+
+def before_index_swap(vs: VectorStore):
+    # a generation published by another worker indexes rows it logged: load them first
+    sync_uploads()
+
+index_manager = IndexManager(
+    settings.VECTOR_INDEX_DIR, open_vs,
+    keep=settings.VS_KEEP_GENERATIONS,
+    reload_interval=settings.VS_RELOAD_INTERVAL,
+    write_lock=index_lock,
+    # forks are appended to in place and go live as-is: no full load or refit per upload
+    fork_factory=lambda path: open_vs(path, mmap=True),
+    on_swap=on_index_swap,
+    before_swap=before_index_swap,
+)
+
+def sync_uploads() -> int:
+    """
+    Add the rows logged to the uploads log since this worker last read it
+    (by another worker, or by this one's ingest_chunk) to the catalog, filter
+    index and analytics. Returns how many rows were added.
+    """
+    global catalog_version
+    if catalog is None or upload_store is None:
+        return 0
+    added = 0
+    with index_lock:
+        for rows in upload_store.tail(settings.INGEST_CHUNK_ROWS):
+            norm = catalog.append(rows)
+            attr_index.add(norm)
+            analytics.update(norm)
+            added += len(norm)
+        if added:
+            # catalog changed: cached hits may be stale (query embeddings stay valid)
+            catalog_version += 1
+            result_cache.clear()
+    return added
+
+def build_generation(vs: VectorStore):
+    # runs on the index-build thread against a catalog snapshot
+    with timed("index_build"):
+        vs.build(catalog.df, get_embedder(), text_cols=INDEX_TEXT_COLS)
+
+def catch_up(vs: VectorStore) -> bool:
+    """Index the catalog rows `vs` lacks (uploaded during a build, or logged but never indexed)."""
+    sync_uploads()
+    if vs.n >= len(catalog):
+        return False
+    with timed("index_catch_up"):
+        vs.append(catalog.df.iloc[vs.n:], get_embedder(), text_cols=INDEX_TEXT_COLS)
+    return True
+
+def start_rebuild():
+    return index_manager.rebuild(build_generation, finalize=catch_up)
+
+def index_encoder_ok(vs: VectorStore) -> bool:
+    """Was `vs` built by the current encoder (model and EMBEDDING_QUANTIZE mode)?"""
+    # generations from before the encoder was recorded were all built in fp32
+    return (vs.encoder or settings.EMBEDDING_MODEL) == get_embedder().signature
+
+def ensure_index_built() -> bool:
+    """
+    True once the live index covers the catalog with the current encoder.
+    A missing or stale index, or one built by a different encoder (int8 vs
+    fp32), is rebuilt in the background (False meanwhile); a short tail of
+    new rows is indexed inline into a new generation.
+    """
+    if SKIP_VS_BUILD:
+        return get_vs() is not None
+    vs = get_vs()
+    if vs is not None and vs.n and not index_encoder_ok(vs):
+        # its vectors are not comparable with this worker's query embeddings
+        start_rebuild()
+        return False
+    if vs is not None and vs.n == len(catalog):
+        return True
+    if vs is not None and 0 < vs.n < len(catalog) and ingest_fork is not None:
+        return True  # the running upload job publishes the missing rows when it finishes
+    if vs is not None and vs.n > len(catalog) and sync_uploads():
+        vs = get_vs()  # rows another worker logged and indexed
+    if vs is None or vs.n == 0 or vs.n > len(catalog):
+        start_rebuild()
+        return False
+    if vs.n < len(catalog):
+        vs = index_manager.extend(catch_up)
+    return vs is not None and vs.n == len(catalog)
+
+def require_index():
+    if not ensure_index_built():
+        raise HTTPException(status_code=503, detail="Vector index is being built; retry shortly.",
+                            headers={"Retry-After": "5"})
+
+# ----------------- Warm-up / Readiness -----------------
+# slow startup work runs on a background thread, not at import, so /healthz
+# answers immediately; /readyz reports when the worker can take traffic
+warmup = WarmUp()
+warmup.add("catalog", load_catalog)
+warmup.add("index", ensure_index_built)  # opens the live generation, or starts the first build
+warmup.add("models", warm_up_models)
+
+@app.on_event("startup")
+def start_warm_up():
+    warmup.start()
+
+# routes that work before the catalog is loaded
+WARMUP_EXEMPT = ("/healthz", "/readyz", "/metrics", "/models/status", "/docs", "/redoc", "/openapi.json", "/images/")
+
+@app.middleware("http")
+async def require_catalog(request: Request, call_next):
+    if catalog is None and not request.url.path.startswith(WARMUP_EXEMPT):
+        warmup.start()  # no-op while running; resumes after a failed load
+        return JSONResponse({"detail": "Service is starting; retry shortly."}, status_code=503,
+                            headers={"Retry-After": "2"})
+    return await call_next(request)
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: warm-up finished and a vector index is live (or index builds are skipped)."""
+    body = warmup.status()
+    vs = index_manager.current()
+    body["ready"] = body["ready"] and (SKIP_VS_BUILD or vs is not None)
+    body["catalog_rows"] = len(catalog) if catalog is not None else 0
+    body["index_rows"] = vs.n if vs is not None else 0
+    if not body["ready"]:
+        warmup.start()
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+# ----------------- Query / Result Caches -----------------
+query_emb_cache = TTLCache(maxsize=settings.QUERY_CACHE_SIZE, ttl=settings.QUERY_CACHE_TTL)
+result_cache = TTLCache(maxsize=settings.RESULT_CACHE_SIZE, ttl=settings.QUERY_CACHE_TTL)
+# (n_clusters, text_cols, method, catalog_version) -> labels
+cluster_cache = TTLCache(maxsize=64, ttl=0)
+
+# ----------------- Admission Control -----------------
+# per-stage concurrency limits; Overloaded -> 503 (embed / search) or canned text (generate)
+embed_stage = AsyncStageLimiter("embed", settings.EMBED_CONCURRENCY, settings.STAGE_QUEUE_SIZE)
+search_stage = AsyncStageLimiter("search", settings.SEARCH_CONCURRENCY, settings.STAGE_QUEUE_SIZE)
+generate_stage = AsyncStageLimiter("generate", settings.GENERATE_CONCURRENCY, settings.STAGE_QUEUE_SIZE)
+# identical concurrent requests share one computation
+search_flight = SingleFlight()
+recommend_flight = SingleFlight()
+
+def request_deadline() -> Optional[float]:
+    return time.monotonic() + settings.REQUEST_DEADLINE if settings.REQUEST_DEADLINE > 0 else None
+
+@app.exception_handler(Overloaded)
+async def on_overloaded(request: Request, exc: Overloaded):
+    return JSONResponse({"detail": f"Server busy ({exc.stage}); retry shortly."}, status_code=503,
+                        headers={"Retry-After": "1"})
+
+def normalize_query(q: str) -> str:
+    return " ".join(str(q).lower().split())
+
+async def cached_search(query: str, k: int, filters: Optional["RecommendFilters"] = None, mode: str = "dense",
+                        deadline: Optional[float] = None):
+    """(query, k, filters, mode) -> hits, reusing cached query embeddings and results."""
+    nq = normalize_query(query)
+    fkey = filters.cache_key() if filters is not None else None
+    key = (nq, k, fkey, mode)
+    hits = result_cache.get(key)
+    if hits is not None:
+        return hits
+    # concurrent misses for the same key wait for the first one instead of repeating it
+    return await search_flight.ado(key, lambda: run_search(nq, k, filters, mode, key, deadline))
+
+# Stage slots are taken on the event loop, before any threadpool hop: a request
+# waiting for one holds no worker thread, so the stage queues (not the threadpool's
+# own unbounded, deadline-less queue) are where overload shows up and is shed.
+async def run_search(nq: str, k: int, filters: Optional["RecommendFilters"], mode: str, key,
+                     deadline: Optional[float]):
+    q = None
+    if mode != "lexical":  # BM25-only queries never touch the encoder
+        q = (await encode_queries([nq], deadline))[0]
+
+    async with search_stage.aslot(deadline):
+        hits = await run_in_threadpool(search_index, nq, q, k, filters if key[2] else None, mode)
+    result_cache.set(key, hits)
+    return hits
+
+def search_index(nq: str, q, k: int, filters: Optional["RecommendFilters"], mode: str):
+    with timed("search"):
+        mask = attr_index.mask(**filters.model_dump()) if filters is not None else None
+        return get_vs().search_text(nq, q, top_k=k, mode=mode, mask=mask,
+                                    depth=settings.HYBRID_DEPTH, rrf_k=settings.HYBRID_RRF_K)
+
+async def encode_queries(queries: List[str], deadline: Optional[float] = None):
+    """Embeddings for many queries: cached ones reused, the rest in one encoder batch."""
+    nqs = [normalize_query(q) for q in queries]
+    vecs = {nq: query_emb_cache.get(nq) for nq in set(nqs)}
+    todo = [nq for nq, v in vecs.items() if v is None]
+    if todo:
+        emb = await run_in_threadpool(get_embedder)
+        async with embed_stage.aslot(deadline):
+            with timed("embed"):
+                encoded = await run_in_threadpool(emb.encode, todo)
+        for nq, v in zip(todo, encoded):
+            vecs[nq] = v
+            query_emb_cache.set(nq, v)
+    return [vecs[nq] for nq in nqs]
 
 # ----------------- Models -----------------
+class RecommendFilters(BaseModel):
+    # keyword filters match any listed value, case-insensitively
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    brand: Optional[List[str]] = None
+    category: Optional[List[str]] = None  # first category of the product
+    material: Optional[List[str]] = None
+    color: Optional[List[str]] = None
+
+    def cache_key(self):
+        items = tuple((k, tuple(v) if isinstance(v, list) else v)
+                      for k, v in self.model_dump().items() if v not in (None, []))
+        return items or None
+
 class RecommendRequest(BaseModel):
     query: str
     k: int = 5
+    # True: query-aware blurbs generated live; False: precomputed descriptions
+    live: bool = False
+    filters: Optional[RecommendFilters] = None
+    # "dense" | "lexical" | "hybrid" (fused) | "shortlist" (BM25 candidates, dense scores)
+    mode: str = "dense"
 
 class RecommendResponseItem(BaseModel):
     uniq_id: str
@@ -144,6 +422,22 @@ class RecommendResponseItem(BaseModel):
     generated_description: str
     link: Optional[str] = None
 
+class SimilarItem(RecommendResponseItem):
+    similarity: float
+
+class BatchRecommendRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=10000)
+    k: int = 5
+    filters: Optional[RecommendFilters] = None
+    # include precomputed descriptions (never generated live in batch mode)
+    descriptions: bool = False
+    # same modes as RecommendRequest; non-dense modes search query by query
+    mode: str = "dense"
+
+class BatchRecommendResult(BaseModel):
+    query: str
+    items: List[RecommendResponseItem]
+
 class ClusterResponse(BaseModel):
     n_clusters: int
     labels: List[int]
@@ -153,75 +447,463 @@ class ClusterResponse(BaseModel):
 def health():
     return {"status": "ok"}
 
-@app.post("/recommend", response_model=List[RecommendResponseItem])
-def recommend(req: RecommendRequest, request: Request):
-    ensure_index_built(df)
-    vs = get_vs()
-    emb = get_embedder()
-    genai = get_genai()
+def check_mode(mode: str):
+    if mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown mode {mode!r}; expected one of {list(SEARCH_MODES)}.")
+
+def build_items(idxs: List[int], descs: List[Optional[str]], request: Request) -> List[dict]:
+    # precomputed response fields, gathered by row index
+    with timed("assemble"):
+        items = catalog.items(idxs, base_url=str(request.base_url))
+        for item, desc in zip(items, descs):
+            item["generated_description"] = str(desc or "")
+    return items
+
+def prompt_rows(idxs: List[int]) -> List[dict]:
+    return catalog.records(idxs, ["uniq_id"] + PROMPT_FIELDS)
 
-    hits = vs.search(req.query, emb, top_k=req.k)
+def genai_timeout(deadline: Optional[float]) -> Optional[float]:
+    # GENAI_TIMEOUT, cut short by whatever is left of the request deadline
+    limits = [t for t in (settings.GENAI_TIMEOUT or None, remaining(deadline)) if t is not None]
+    return min(limits) if limits else None
+
+async def generate_descriptions(prompts: List[str], deadline: Optional[float] = None) -> List[str]:
+    """One batched generation, or canned text when the generate stage is saturated / out of time."""
+    try:
+        async with generate_stage.aslot(deadline):
+            genai = await run_in_threadpool(get_genai)
+            with timed("generate"):
+                generated = await genai.agenerate_batch(prompts, timeout=genai_timeout(deadline))
+    except Overloaded:
+        # degrade instead of failing: the hits are still worth returning
+        DESCRIPTIONS.inc(len(prompts), source="degraded")
+        return [FALLBACK_TEXT] * len(prompts)
+    DESCRIPTIONS.inc(len(prompts), source="generated")
+    return generated
+
+def stored_descriptions(rows: List[dict], live: bool) -> List[Optional[str]]:
+    """
+    Per row: the stored description, or None where one must be generated
+    (every row when `live`). Rows without a stored one get FALLBACK_TEXT,
+    keeping the LLM off the request path, unless DESCRIPTIONS_GENERATE_MISSING.
+    """
+    if live:
+        return [None] * len(rows)
+    descs = get_desc_store().get_many([str(row.get("uniq_id", "")) for row in rows])
+    missing = sum(d is None for d in descs)
+    DESCRIPTIONS.inc(len(descs) - missing, source="store")
+    if missing and not settings.DESCRIPTIONS_GENERATE_MISSING:
+        DESCRIPTIONS.inc(missing, source="fallback")
+        descs = [FALLBACK_TEXT if d is None else d for d in descs]
+    return descs
+
+async def describe_rows(rows: List[dict], query: str, live: bool = False,
+                        deadline: Optional[float] = None) -> List[str]:
+    """
+    Precomputed description per row (O(1) lookup); rows the batch job has
+    not covered yet get FALLBACK_TEXT (see stored_descriptions). When `live`
+    is set, every row gets one batched generation on the dedicated genai
+    thread, capped by GENAI_TIMEOUT and the deadline.
+    """
+    descs = stored_descriptions(rows, live)
+    missing = [i for i, d in enumerate(descs) if d is None]
+    if missing:
+        generated = await generate_descriptions([product_prompt(rows[i], query) for i in missing], deadline)
+        for i, d in zip(missing, generated):
+            descs[i] = d
+    return descs
+
+async def compute_recommendation(req: "RecommendRequest", deadline: Optional[float]):
+    # embedding + search are CPU-bound: keep them off the event loop
+    await run_in_threadpool(require_index)
+    hits = await cached_search(req.query, req.k, req.filters, req.mode, deadline)
     if not hits:
         raise HTTPException(status_code=404, detail="No products found")
 
-    out = []
-    for idx, score in hits:
-        row = df.iloc[idx]
-        prompt = (
-            f"Product: {row.get('title','')}\n"
-            f"Brand: {row.get('brand','')}\n"
-            f"Category: {row.get('categories','')}\n"
-            f"Material: {row.get('material','')}\n"
-            f"Color: {row.get('color','')}\n"
-            f"Price: {row.get('price','')}\n\n"
-            f"User query: {req.query}\n"
-            "Write a concise, enticing description (<= 70 words) for why this fits."
-        )
-        desc = genai.generate(prompt) or ""
-        price_val = row.get("price_num", None)
-        img_val = row.get("image_first", "")
-        img_url = resolve_image_url(img_val, request)
-
-        item = {
-            "uniq_id": str(row.get("uniq_id", "")),
-            "title": str(row.get("title", "")),
-            "image": img_url,
-            "price": price_val,
-            "brand": json_none_if_nan(row.get("brand", None)),
-            "categories": json_none_if_nan(row.get("categories", None)),
-            "generated_description": str(desc),
-            "link": build_click_url(row),
-        }
-        out.append(item)
+    idxs = [idx for idx, _ in hits]
+    descs = await describe_rows(prompt_rows(idxs), req.query, live=req.live, deadline=deadline)
+    return idxs, descs
 
+@app.post("/recommend", response_model=List[RecommendResponseItem])
+async def recommend(req: RecommendRequest, request: Request):
+    check_mode(req.mode)
+    deadline = request_deadline()
+    # identical concurrent requests share one search + generation; items are built per request (base URL)
+    key = (normalize_query(req.query), req.k, req.filters.cache_key() if req.filters else None, req.mode, req.live)
+    idxs, descs = await recommend_flight.ado(key, lambda: compute_recommendation(req, deadline))
+    return build_items(idxs, descs, request)
+
+@app.post("/recommend/stream")
+async def recommend_stream(req: RecommendRequest, request: Request):
+    """
+    NDJSON stream of the same results as /recommend:
+    1. {"type": "hits", "items": [...]} as soon as the search is done;
+       items whose description is being generated (see stored_descriptions)
+       have generated_description = null
+    2. {"type": "description", "index": i, "uniq_id": ..., "generated_description": ...}
+       for each of those, in completion order
+    3. {"type": "done"}
+    """
+    check_mode(req.mode)
+    deadline = request_deadline()
+    await run_in_threadpool(require_index)
+    hits = await cached_search(req.query, req.k, req.filters, req.mode, deadline)
+    if not hits:
+        raise HTTPException(status_code=404, detail="No products found")
+
+    idxs = [idx for idx, _ in hits]
+    rows = prompt_rows(idxs)
+    descs = stored_descriptions(rows, req.live)
+
+    async def events():
+        items = build_items(idxs, descs, request)
+        for item, desc in zip(items, descs):
+            if desc is None:
+                item["generated_description"] = None
+        yield json.dumps({"type": "hits", "items": items}) + "\n"
+
+        missing = [i for i, d in enumerate(descs) if d is None]
+
+        def event(i: int, text: str) -> str:
+            return json.dumps({
+                "type": "description",
+                "index": i,
+                "uniq_id": items[i]["uniq_id"],
+                "generated_description": text,
+            }) + "\n"
+
+        if missing:
+            prompts = [product_prompt(rows[i], req.query) for i in missing]
+            try:
+                async with generate_stage.aslot(deadline):
+                    genai = await run_in_threadpool(get_genai)
+                    with timed("generate"):
+                        async for j, text in genai.astream(prompts, timeout=genai_timeout(deadline)):
+                            yield event(missing[j], text)
+                DESCRIPTIONS.inc(len(missing), source="generated")
+            except Overloaded:
+                DESCRIPTIONS.inc(len(missing), source="degraded")
+                for i in missing:
+                    yield event(i, FALLBACK_TEXT)
+        yield json.dumps({"type": "done"}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.post("/recommend/batch", response_model=List[BatchRecommendResult])
+async def recommend_batch(req: BatchRecommendRequest, request: Request):
+    """
+    Many queries in one call: one encoder batch, one (N x catalog) matrix search.
+    Descriptions, when requested, come from the precomputed store only.
+    """
+    check_mode(req.mode)
+    deadline = request_deadline()
+    await run_in_threadpool(require_index)
+    if req.mode == "dense":
+        q = await encode_queries(req.queries, deadline)
+        async with search_stage.aslot(deadline):
+            all_hits = await run_in_threadpool(search_index_batch, q, req.k, req.filters)
+    else:
+        all_hits = [await cached_search(query, req.k, req.filters, req.mode, deadline) for query in req.queries]
+    return await run_in_threadpool(batch_results, req, all_hits, request)
+
+def search_index_batch(q, k: int, filters: Optional["RecommendFilters"]):
+    with timed("search"):
+        mask = attr_index.mask(**filters.model_dump()) if filters and filters.cache_key() else None
+        return get_vs().search_batch(q, top_k=k, mask=mask)
+
+def batch_results(req: BatchRecommendRequest, all_hits, request: Request) -> List[dict]:
+    store = get_desc_store() if req.descriptions else None
+    out = []
+    for query, hits in zip(req.queries, all_hits):
+        idxs = [idx for idx, _ in hits]
+        items = build_items(idxs, [""] * len(idxs), request)
+        if store:
+            for item, d in zip(items, store.get_many([it["uniq_id"] for it in items])):
+                item["generated_description"] = d or ""
+        out.append({"query": query, "items": items})
     return out
 
+def similar_items(hits, request: Request) -> List[dict]:
+    # visual index hits are uniq_ids; products no longer in the catalog are dropped
+    rows = catalog.rows_for([uid for uid, _ in hits])
+    keep = [(row, uid, sim) for row, (uid, sim) in zip(rows, hits) if row is not None]
+    items = build_items([row for row, _, _ in keep], [""] * len(keep), request)
+    for item, (_, _, sim) in zip(items, keep):
+        item["similarity"] = sim
+    return items
+
+@app.get("/cv/similar/{uniq_id}", response_model=List[SimilarItem])
+def cv_similar(uniq_id: str, request: Request, k: int = Query(5, ge=1, le=100)):
+    """Products whose images look most like this product's image."""
+    vi = get_visual_index()
+    vi.refresh()  # pick up batches written by the build job
+    with timed("search"):
+        hits = vi.similar(uniq_id, top_k=k)
+    if hits is None:
+        raise HTTPException(status_code=404, detail="No image embedding for this product "
+                                                    "(run python -m app.jobs.build_visual_index).")
+    return similar_items(hits, request)
+
+@app.post("/cv/similar", response_model=List[SimilarItem])
+def cv_similar_image(request: Request, file: UploadFile = File(...), k: int = Query(5, ge=1, le=100)):
+    """Products whose images look most like the uploaded image."""
+    vi = get_visual_index()
+    vi.refresh()
+    if not vi.n:
+        raise HTTPException(status_code=503, detail="Visual index is empty (run python -m app.jobs.build_visual_index).")
+    try:
+        clf = get_cv()
+    except ImportError as e:
+        raise HTTPException(status_code=503, detail=f"Image model unavailable: {e}")
+    try:
+        with timed("embed_image"):
+            q = clf.embed(file.file.read())
+    except (ConnectionError, RuntimeError) as e:
+        # model server down, or started without --cv
+        raise HTTPException(status_code=503, detail=f"Image model unavailable: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Unreadable image: {e}")
+    with timed("search"):
+        hits = vi.search(q, top_k=k)
+    return similar_items(hits, request)
+
+@app.get("/index/recall")
+def index_recall(k: int = Query(10, ge=1, le=100), n_queries: int = Query(200, ge=1, le=5000),
+                 nprobe: Optional[int] = Query(None, ge=1)):
+    require_index()
+    return get_vs().recall_at_k(k=k, n_queries=n_queries, nprobe=nprobe)
+
+@app.get("/index/status")
+def index_status():
+    return index_manager.status()
+
+@app.post("/index/rebuild", status_code=202)
+def index_rebuild():
+    """Build a new index generation in the background and hot-swap it when done."""
+    if SKIP_VS_BUILD:
+        raise HTTPException(status_code=400, detail="Index builds are disabled (SKIP_VS_BUILD=1).")
+    start_rebuild()
+    return index_manager.status()
+
+def collect_metrics():
+    # point-in-time values, read at scrape time
+    for name, cache in (("query_embeddings", query_emb_cache), ("results", result_cache), ("clusters", cluster_cache)):
+        st = cache.stats()
+        CACHE_HITS.set(st["hits"], cache=name)
+        CACHE_MISSES.set(st["misses"], cache=name)
+        CACHE_EVICTIONS.set(st["evictions"], cache=name)
+        CACHE_SIZE.set(st["size"], cache=name)
+    for stage in (embed_stage, search_stage, generate_stage):
+        STAGE_ACTIVE.set(stage.active, stage=stage.name)
+        STAGE_WAITING.set(stage.waiting, stage=stage.name)
+        for reason, n in stage.rejected.items():
+            STAGE_REJECTED.set(n, stage=stage.name, reason=reason)
+    COALESCED.set(search_flight.shared, call="search")
+    COALESCED.set(recommend_flight.shared, call="recommend")
+    CATALOG_ROWS.set(len(catalog) if catalog is not None else 0)
+    vs = index_manager.current()
+    INDEX_ROWS.set(vs.n if vs is not None else 0)
+    INDEX_BUILDING.set(int(index_manager.building))
+
+CACHE_HITS = REGISTRY.counter("recommender_cache_hits_total", "Cache hits.")
+CACHE_MISSES = REGISTRY.counter("recommender_cache_misses_total", "Cache misses.")
+CACHE_EVICTIONS = REGISTRY.counter("recommender_cache_evictions_total", "Entries evicted (LRU or TTL).")
+CACHE_SIZE = REGISTRY.gauge("recommender_cache_entries", "Entries currently cached.")
+STAGE_ACTIVE = REGISTRY.gauge("recommender_stage_active", "Requests currently in each admission-controlled stage.")
+STAGE_WAITING = REGISTRY.gauge("recommender_stage_waiting", "Requests queued for a stage slot.")
+STAGE_REJECTED = REGISTRY.counter("recommender_stage_rejected_total",
+                                  "Requests shed or degraded by admission control, by stage and reason.")
+COALESCED = REGISTRY.counter("recommender_coalesced_total", "Requests served by another in-flight identical request.")
+CATALOG_ROWS = REGISTRY.gauge("recommender_catalog_rows", "Rows in the serving catalog.")
+INDEX_ROWS = REGISTRY.gauge("recommender_index_rows", "Rows in the live vector index generation.")
+INDEX_BUILDING = REGISTRY.gauge("recommender_index_building", "1 while an index generation is being built.")
+REGISTRY.add_collector(collect_metrics)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/models/status")
+def models_status():
+    if settings.MODEL_SERVER:
+        try:
+            return {"mode": "server", "address": settings.MODEL_SERVER, **get_model_client().call("status", timeout=5)}
+        except Exception as e:
+            raise HTTPException(status_code=503, detail=f"Model server unavailable: {e}")
+    return {"mode": "local", "embedder_loaded": get_embedder.cache_info().currsize > 0,
+            "genai_loaded": get_genai.cache_info().currsize > 0}
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {"query_embeddings": query_emb_cache.stats(), "results": result_cache.stats()}
+
+@app.get("/admission/stats")
+def admission_stats():
+    return {
+        "stages": {s.name: s.stats() for s in (embed_stage, search_stage, generate_stage)},
+        "coalesced": {"search": search_flight.shared, "recommend": recommend_flight.shared},
+        "deadline_s": settings.REQUEST_DEADLINE,
+    }
+
+_ENTITY_TAG = re.compile(r'\s*(\*|(?:W/)?"[^"]*")\s*(?:,|$)')
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match (RFC 9110 13.1.2): `*` or any listed tag equal to `etag`, ignoring W/ (weak comparison)."""
+    if not if_none_match or not etag:
+        return False
+    tags = [m.group(1) for m in _ENTITY_TAG.finditer(if_none_match)]
+    return "*" in tags or etag.removeprefix("W/") in {t.removeprefix("W/") for t in tags}
+
 @app.get("/analytics/summary")
-def analytics_summary():
-    return compute_analytics(df)
+def analytics_summary(request: Request):
+    # conditional GET: clients revalidate with If-None-Match and get 304 when unchanged
+    summary, etag = analytics.snapshot()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(summary, headers=headers)
 
 class ClusterRequest(BaseModel):
     n_clusters: int = 8
-    text_cols: List[str] = ["title","description","categories"]
+    # default: the index's columns, so the stored row vectors can be reused
+    text_cols: List[str] = Field(default_factory=lambda: list(INDEX_TEXT_COLS))
+    # "auto" | "kmeans" | "minibatch"
+    method: str = "auto"
+
+def cluster_vectors(text_cols: List[str]):
+    """
+    Row vectors for clustering taken from the live index when it embeds
+    exactly `text_cols` with the current encoder; only catalog rows it does
+    not cover yet are encoded. None: encode the whole catalog.
+    """
+    vs = get_vs()
+    if vs is None or not vs.n or vs.text_cols != list(text_cols) or vs.n > len(catalog) or not index_encoder_ok(vs):
+        return None
+    if vs.n == len(catalog):
+        return vs.vectors
+    tail = vs.embed(catalog.df.iloc[vs.n:], get_embedder(), text_cols)
+    return np.vstack([np.asarray(vs.vectors), tail])
 
 @app.post("/nlp/cluster", response_model=ClusterResponse)
 def nlp_cluster(req: ClusterRequest):
-    labels = cluster_products(df, get_embedder(), req.text_cols, req.n_clusters)
-    return {"n_clusters": req.n_clusters, "labels": list(map(int, labels))}
-
-@app.post("/data/upload")
-def upload_dataset(file: UploadFile = File(...)):
-    global df
+    key = (req.n_clusters, tuple(req.text_cols), req.method, catalog_version)
+    labels = cluster_cache.get(key)
+    if labels is None:
+        try:
+            labels = cluster_products(catalog.df, get_embedder(), req.text_cols, req.n_clusters,
+                                      vectors=cluster_vectors(req.text_cols), method=req.method)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        labels = list(map(int, labels))
+        cluster_cache.set(key, labels)
+    return {"n_clusters": req.n_clusters, "labels": labels}
+
+# ----------------- Ingestion -----------------
+# private generation the running upload job appends to (ingest thread only)
+ingest_fork: Optional[IndexFork] = None
+
+def drop_ingest_fork():
+    global ingest_fork
+    fork, ingest_fork = ingest_fork, None
+    if fork is not None:
+        index_manager.discard(fork)
+
+def ingest_chunk(rows: pd.DataFrame) -> int:
+    """
+    Normalize, embed and append one validated, de-duplicated upload chunk;
+    returns how many rows were added. The first chunk of a job forks the
+    live generation; every chunk is appended to that fork in place and
+    logged, and finish_ingest() publishes it. The catalog, filters and
+    analytics pick the rows up from the log once they are indexed.
+    """
+    global ingest_fork
+    norm = catalog.normalize(rows)
+    vs = ingest_fork.vs if ingest_fork is not None else get_vs()
+    index_live = vs is not None and vs.n > 0 and not SKIP_VS_BUILD and index_encoder_ok(vs)
+    # the slow part (embedding) runs before taking the lock, so searches keep going
+    embs = None
+    if index_live:
+        emb = get_embedder()
+        with timed("ingest_embed"):
+            embs = vs.embed(norm, emb, INDEX_TEXT_COLS)
+    with index_manager.writing(), timed("ingest_apply"):
+        # another worker may have added some of these rows since the chunk was cleaned
+        sync_uploads()
+        fresh = ~rows["uniq_id"].map(lambda uid: uid in catalog).to_numpy(dtype=bool)
+        if not fresh.all():
+            rows, norm = rows[fresh], norm[fresh]
+            embs = embs[fresh] if embs is not None else None
+        if len(rows) == 0:
+            return 0
+
+        if index_live and ingest_fork is None:
+            ingest_fork = index_manager.fork()
+        if index_live and ingest_fork is not None:
+            fork = ingest_fork.vs
+            try:
+                catch_up(fork)  # rows other workers logged since the fork
+                if fork.n == len(catalog):
+                    fork.append(norm, text_cols=INDEX_TEXT_COLS, embeddings=embs)
+                else:
+                    drop_ingest_fork()  # misaligned: finish_ingest() rebuilds instead
+            except Exception:
+                drop_ingest_fork()  # possibly half-appended
+                raise
+        # logged after indexing into the fork: on restart, rows whose fork was never published are re-indexed
+        upload_store.append(rows)
+        sync_uploads()
+    INGEST_ROWS.inc(len(rows))
+    return len(rows)
+
+def finish_fork(vs: VectorStore) -> bool:
+    # publish only if it covers the catalog and nobody switched encoders meanwhile
+    catch_up(vs)
+    return vs.n == len(catalog) and index_encoder_ok(vs)
+
+def finish_ingest() -> int:
+    global ingest_fork
+    if ingest_fork is not None:
+        try:
+            with timed("ingest_publish"):
+                index_manager.publish(ingest_fork, finish_fork)
+        finally:
+            ingest_fork = None  # cleared after publishing, so searches meanwhile do not fork it again
+    ensure_index_built()  # catches up (or starts a build) if chunks were skipped above
+    return len(catalog)
+
+ingest_queue = IngestQueue(ingest_chunk, is_known=lambda uid: uid in catalog, finish=finish_ingest,
+                           chunk_rows=settings.INGEST_CHUNK_ROWS)
+
+@app.post("/data/upload", status_code=202)
+def upload_dataset(file: UploadFile = File(...), wait: bool = Query(False)):
+    """
+    Queue a CSV for chunked ingestion and return its job status right away
+    (poll GET /data/upload/{job_id}); `wait=true` blocks until it finishes.
+    """
+    # spool to disk: the upload is read chunk by chunk after this request returns
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp:
+        shutil.copyfileobj(file.file, tmp, length=1 << 20)
     try:
-        new_df = pd.read_csv(file.file)
-        for c in required_cols:
-            if c not in new_df.columns:
-                new_df[c] = ""
-        new_df["price_num"] = new_df["price"].apply(to_price_number) if "price" in new_df.columns else None
-        new_df["image_first"] = new_df["images"].apply(split_first) if "images" in new_df.columns else ""
-
-        df = pd.concat([df, new_df], ignore_index=True)
-        ensure_index_built(df)
-        return {"rows": int(len(df))}
+        cols = pd.read_csv(tmp.name, nrows=0).columns
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        os.remove(tmp.name)
+        raise HTTPException(status_code=400, detail=f"Unreadable CSV: {e}")
+    if "uniq_id" not in cols:
+        os.remove(tmp.name)
+        raise HTTPException(status_code=400, detail="CSV must have a uniq_id column.")
+
+    job = ingest_queue.submit(tmp.name, filename=file.filename or "")
+    if not wait:
+        return JSONResponse(job.status(), status_code=202)
+    job.done.wait()
+    if job.state == "failed":
+        raise HTTPException(status_code=400, detail=job.error)
+    return JSONResponse(job.status(), status_code=200)
+
+@app.get("/data/upload/{job_id}")
+def upload_status(job_id: str):
+    job = ingest_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown upload job")
+    return job.status()
@@ -0,0 +1,83 @@
+# app/model_server.py
+"""
+Shared model host for all uvicorn workers on a machine:
+
+    python -m app.model_server --socket /tmp/recommender-models.sock
+    MODEL_SERVER=/tmp/recommender-models.sock uvicorn app.main:app --workers 4
+
+Loads the embedder and the description generator once, runs one warm-up
+call through each, and only then starts listening, so workers (which wait
+for the socket at startup) never send a request to a cold model.
+Concurrent encode / generate calls from all workers are micro-batched.
+With --cv it also hosts the image embedder behind POST /cv/similar.
+"""
+from __future__ import annotations
+import argparse
+import time
+
+from .config import settings
+from .services.embeddings import TextEmbedder
+from .services.genai import DescriptionGenerator, product_prompt
+from .services.model_server import MicroBatcher, ModelServer, encode_handler, generate_handler, image_embed_handler
+
+_WARMUP_ROW = {"title": "Oak Dining Chair", "brand": "Acme", "categories": "['Furniture']",
+               "material": "Wood", "color": "Brown", "price": "$99"}
+
+
+def build_server(address: str, max_batch: int, gen_batch: int, max_wait: float, cv: bool = False) -> ModelServer:
+    t0 = time.perf_counter()
+    embedder = TextEmbedder(model_name=settings.EMBEDDING_MODEL, cache_dir=settings.EMBEDDING_CACHE_DIR or None,
+                            quantize=settings.EMBEDDING_QUANTIZE, batch_size=settings.EMBEDDING_BATCH_SIZE,
+                            threads=settings.EMBEDDING_THREADS)
+    embedder.encode(["warm up"], cache=False)
+    print(f"embedder {settings.EMBEDDING_MODEL} ready in {time.perf_counter() - t0:.1f}s", flush=True)
+
+    t0 = time.perf_counter()
+    generator = DescriptionGenerator(model_name=settings.GENAI_MODEL)
+    generator.generate_batch([product_prompt(_WARMUP_ROW)])
+    print(f"generator {settings.GENAI_MODEL} ready in {time.perf_counter() - t0:.1f}s"
+          f"{'' if generator.pipe is not None else ' (no model: canned text)'}", flush=True)
+
+    batchers = {
+        "encode": MicroBatcher(encode_handler(embedder), max_batch=max_batch, max_wait=max_wait, name="encode"),
+        "generate": MicroBatcher(generate_handler(generator), max_batch=gen_batch, max_wait=max_wait,
+                                 name="generate"),
+    }
+    info = {"embedding_model": settings.EMBEDDING_MODEL, "embedding_int8": embedder.quantized,
+            "genai_model": settings.GENAI_MODEL,
+            "genai_loaded": generator.pipe is not None}
+    if cv:
+        from .models_cv import CVClassifier  # torchvision is optional
+        classifier = CVClassifier()
+        batchers["image_embed"] = MicroBatcher(image_embed_handler(classifier), max_batch=max_batch,
+                                               max_wait=max_wait, name="image_embed")
+        info["cv"] = True
+    return ModelServer(address, batchers, info=info, authkey=settings.MODEL_SERVER_AUTHKEY.encode() or None,
+                       authkey_file=settings.MODEL_SERVER_AUTHKEY_FILE)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve the embedding / generation models to local workers.")
+    ap.add_argument("--socket", default=settings.MODEL_SERVER or "/tmp/recommender-models.sock",
+                    help="socket path (\\\\.\\pipe\\<name> on Windows; default: MODEL_SERVER)")
+    ap.add_argument("--max-batch", type=int, default=settings.MODEL_SERVER_MAX_BATCH,
+                    help="texts per encode batch")
+    ap.add_argument("--gen-batch", type=int, default=settings.MODEL_SERVER_GEN_BATCH,
+                    help="prompts per generate batch")
+    ap.add_argument("--wait-ms", type=float, default=settings.MODEL_SERVER_BATCH_WAIT * 1000.0,
+                    help="how long a batch waits for more requests")
+    ap.add_argument("--cv", action="store_true", help="also host the image embedder for POST /cv/similar "
+                                                      "(needs torchvision)")
+    args = ap.parse_args()
+
+    server = build_server(args.socket, args.max_batch, args.gen_batch, args.wait_ms / 1000.0, cv=args.cv)
+    server.bind()
+    print(f"listening on {args.socket}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,79 @@
 # app/models_cv.py
+import io
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import requests
 import torch
 import torchvision.transforms as T
 from torchvision.models import resnet18, ResNet18_Weights
 from PIL import Image
 
+
+def load_image(ref, timeout: float = 10.0) -> Image.Image:
+    """RGB image from a local path, an http(s) URL or raw file bytes."""
+    if isinstance(ref, (bytes, bytearray)):
+        img = Image.open(io.BytesIO(ref))
+    elif ref.startswith(("http://", "https://")):
+        resp = requests.get(ref, timeout=timeout)
+        resp.raise_for_status()
+        img = Image.open(io.BytesIO(resp.content))
+    else:
+        img = Image.open(ref)
+    return img.convert("RGB")
+
+
+def prefetch_batches(refs: Iterable[str], prepare: Callable[[str], Optional[object]], batch_size: int = 32,
+                     workers: int = 8, prefetch: int = 2) -> Iterator[Tuple[List[int], List[object]]]:
+    """
+    Yield (positions, prepared) batches of up to `batch_size`, in input order.
+    `prepare` runs on a thread pool (download / decode / transform release the
+    GIL), at most `prefetch` batches ahead of the consumer, so inference on
+    one batch overlaps decoding of the next without holding the whole input in
+    memory. Refs that fail (exception or None) are left out.
+    """
+    it = enumerate(refs)
+    window: deque = deque()
+    ahead = batch_size * (prefetch + 1)
+
+    def safe(ref):
+        try:
+            return prepare(ref)
+        except Exception:
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="cv-decode") as pool:
+        def fill():
+            while len(window) < ahead:
+                nxt = next(it, None)
+                if nxt is None:
+                    return
+                window.append((nxt[0], pool.submit(safe, nxt[1])))
+
+        fill()
+        while window:
+            pos, items = [], []
+            while window and len(pos) < batch_size:
+                i, fut = window.popleft()
+                x = fut.result()
+                if x is not None:
+                    pos.append(i)
+                    items.append(x)
+                fill()
+            if pos:
+                yield pos, items
+
+
 class CVClassifier:
     def __init__(self, labels=None):
         self.labels = labels or ["chair", "table", "sofa", "bed", "storage", "lighting"]
         self.model = resnet18(weights=ResNet18_Weights.DEFAULT)
         self.model.fc = torch.nn.Linear(self.model.fc.in_features, len(self.labels))
         self.model.eval()
+        # every layer up to the global average pool: 512-d image embedding (shares weights with model)
+        self.backbone = torch.nn.Sequential(*list(self.model.children())[:-1])
         self.tf = T.Compose([
             T.Resize((224, 224)),
             T.ToTensor(),
@@ -17,9 +81,37 @@ class CVClassifier:
                         std=[0.229, 0.224, 0.225]),
         ])
 
+    @property
+    def dim(self) -> int:
+        return int(self.model.fc.in_features)
+
+    def prepare(self, ref: str) -> torch.Tensor:
+        return self.tf(load_image(ref))
+
+    @torch.no_grad()
+    def forward(self, x: torch.Tensor) -> np.ndarray:
+        """L2-normalized penultimate-layer embeddings for a batch tensor (B, 3, 224, 224)."""
+        feats = torch.flatten(self.backbone(x), 1)
+        return torch.nn.functional.normalize(feats, dim=1).numpy().astype("float32")
+
     @torch.no_grad()
     def predict(self, image_path: str) -> str:
         img = Image.open(image_path).convert("RGB")
         x = self.tf(img).unsqueeze(0)
         logits = self.model(x)
         return self.labels[int(logits.argmax(1).item())]
+
+    def embed(self, image) -> np.ndarray:
+        """Embedding for one image (path, URL, bytes or PIL image)."""
+        img = image if isinstance(image, Image.Image) else load_image(image)
+        return self.forward(self.tf(img.convert("RGB")).unsqueeze(0))[0]
+
+    def process(self, refs: Iterable[str], batch_size: int = 32, workers: int = 8,
+                prefetch: int = 2) -> Iterator[Tuple[List[int], np.ndarray]]:
+        """
+        Whole-catalog mode: stream (positions, embeddings) per batch of
+        `batch_size` images, decoding on `workers` threads while the previous
+        batch runs through the model. Images that fail to load are skipped.
+        """
+        for pos, tensors in prefetch_batches(refs, self.prepare, batch_size, workers, prefetch):
+            yield pos, self.forward(torch.stack(tensors))
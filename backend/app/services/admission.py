@@ -0,0 +1,182 @@
+# app/services/admission.py
+from __future__ import annotations
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class Overloaded(Exception):
+    """A stage could not admit the request: its queue is full or the deadline passed while waiting."""
+    def __init__(self, stage: str, reason: str):
+        super().__init__(f"{stage}: {reason}")
+        self.stage = stage
+        self.reason = reason
+
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left until a time.monotonic() deadline (None: no deadline)."""
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one execution: the first caller
+    runs it, callers arriving meanwhile wait for and reuse its result (or
+    exception). Nothing is kept once the call finishes; that is the caches' job.
+    do() is for threads, ado() for coroutines on one event loop.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Hashable, asyncio.Future] = {}
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    async def ado(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._tasks.get(key)
+        if task is None:
+            # own task: a caller that goes away does not cancel the others' result
+            task = self._tasks[key] = asyncio.ensure_future(factory())
+            task.add_done_callback(lambda t, key=key: self._tasks.pop(key, None) if self._tasks.get(key) is t else None)
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+
+class StageLimiter:
+    """
+    Admission control for one pipeline stage run on request threads.
+    - At most `limit` requests in the stage at once (limit <= 0: unlimited)
+    - At most `max_queue` waiting for a slot; more are rejected right away
+    - A request already past its deadline is refused, even if a slot is free;
+      a waiter gives up when its deadline passes
+    Rejections raise Overloaded so the caller can shed (503) or degrade.
+    """
+    def __init__(self, name: str, limit: int, max_queue: int = 64):
+        self.name = name
+        self.limit = int(limit)
+        self.max_queue = max(0, int(max_queue))
+        self._cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "deadline": 0}
+
+    def _reject(self, reason: str):
+        self.rejected[reason] += 1
+        raise Overloaded(self.name, reason)
+
+    def acquire(self, deadline: Optional[float] = None):
+        with self._cond:
+            # work started past the deadline would only be thrown away
+            left = remaining(deadline)
+            if left is not None and left <= 0:
+                self._reject("deadline")
+            if self.limit > 0 and self.active >= self.limit:
+                if self.waiting >= self.max_queue:
+                    self._reject("queue_full")
+                self.waiting += 1
+                try:
+                    while self.active >= self.limit:
+                        left = remaining(deadline)
+                        if left is not None and left <= 0:
+                            self._reject("deadline")
+                        self._cond.wait(left)
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            self.admitted += 1
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self, deadline: Optional[float] = None):
+        self.acquire(deadline)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "active": self.active, "waiting": self.waiting, "max_queue": self.max_queue,
+                "admitted": self.admitted, "rejected": dict(self.rejected)}
+
+
+class AsyncStageLimiter(StageLimiter):
+    """
+    StageLimiter for stages awaited on the event loop (waiting never blocks the
+    loop). Acquire the slot before handing the work to a threadpool, so that
+    waiting requests hold no thread and the stage queue is the only queue.
+    """
+    def __init__(self, name: str, limit: int, max_queue: int = 64):
+        super().__init__(name, limit, max_queue)
+        self._sem = asyncio.Semaphore(self.limit) if self.limit > 0 else None
+
+    async def aacquire(self, deadline: Optional[float] = None):
+        left = remaining(deadline)
+        if left is not None and left <= 0:
+            self._reject("deadline")
+        if self._sem is not None and self._sem.locked():
+            if self.waiting >= self.max_queue:
+                self._reject("queue_full")
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._sem.acquire(), timeout=remaining(deadline))
+            except asyncio.TimeoutError:
+                self._reject("deadline")
+            finally:
+                self.waiting -= 1
+        elif self._sem is not None:
+            await self._sem.acquire()
+        self.active += 1
+        self.admitted += 1
+
+    def arelease(self):
+        self.active -= 1
+        if self._sem is not None:
+            self._sem.release()
+
+    @asynccontextmanager
+    async def aslot(self, deadline: Optional[float] = None):
+        await self.aacquire(deadline)
+        try:
+            yield
+        finally:
+            self.arelease()
@@ -1,47 +1,116 @@
 # backend/app/services/analytics.py
+from collections import Counter
+import hashlib
+import json
+import threading
+from typing import Tuple
+
+import numpy as np
 import pandas as pd
-import re
 
-def compute_analytics(df: pd.DataFrame):
+# fixed price bucket edges so histograms can be updated incrementally;
+# the last bucket is open-ended
+PRICE_BUCKETS = [0, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000]
+PRICE_QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+
+def _prices(df: pd.DataFrame) -> np.ndarray:
     # prices: prefer numeric column if present
     if "price_num" in df.columns:
         prices = pd.to_numeric(df["price_num"], errors="coerce")
     else:
         prices = pd.to_numeric(df.get("price", pd.Series(dtype="float")), errors="coerce")
+    return prices.dropna().to_numpy(dtype="float64")
 
-    avg_price = float(prices.dropna().mean()) if prices.notna().any() else None
-    n_products = int(len(df))
-
-    # top brands
-    if "brand" in df.columns:
-        top_brands = (
-            df["brand"]
-            .fillna("Unknown")
-            .astype(str)
-            .str.strip()
-            .str[:40]
-            .value_counts()
-            .head(10)
-            .to_dict()
-        )
-    else:
-        top_brands = {}
+def _brands(df: pd.DataFrame) -> pd.Series:
+    if "brand" not in df.columns:
+        return pd.Series(dtype="object")
+    return df["brand"].fillna("Unknown").astype(str).str.strip().str[:40]
 
+def _first_categories(df: pd.DataFrame) -> pd.Series:
     # top categories (take first token before | or ,)
-    if "categories" in df.columns:
-        first_cat = (
-            df["categories"]
-            .fillna("Unknown")
-            .astype(str)
-            .apply(lambda s: re.split(r"[|,]", s)[0].strip())
-        )
-        top_categories = first_cat.value_counts().head(10).to_dict()
-    else:
-        top_categories = {}
-
-    return {
-        "count": n_products,
-        "avg_price": avg_price,
-        "top_brands": top_brands,
-        "top_categories": top_categories,
-    }
+    if "categories" not in df.columns:
+        return pd.Series(dtype="object")
+    return (
+        df["categories"]
+        .fillna("Unknown")
+        .astype(str)
+        .str.split(r"[|,]", n=1, regex=True)
+        .str[0]
+        .str.strip()
+    )
+
+class AnalyticsAggregator:
+    """
+    Running catalog aggregates, updated per upload instead of per request.
+    - price sum / count, sorted prices (quantiles) and fixed-bucket histogram
+    - brand and first-category counters
+    summary() and etag are precomputed on every update, so serving is O(1);
+    snapshot() returns both from one publish, so they always match.
+    """
+    def __init__(self):
+        self.count = 0
+        self.price_sum = 0.0
+        self.price_count = 0
+        self.brands: Counter = Counter()
+        self.categories: Counter = Counter()
+        self._sorted_prices = np.empty(0, dtype="float64")
+        self._hist = np.zeros(len(PRICE_BUCKETS), dtype="int64")
+        self._lock = threading.Lock()
+        self._state: Tuple[dict, str] = ({}, "")
+        self._refresh()
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "AnalyticsAggregator":
+        agg = cls()
+        agg.update(df)
+        return agg
+
+    def update(self, df: pd.DataFrame):
+        """Fold the rows of `df` (new catalog rows) into the aggregates."""
+        prices = _prices(df)
+        with self._lock:
+            self.count += int(len(df))
+            self.price_sum += float(prices.sum())
+            self.price_count += int(prices.size)
+            self.brands.update(_brands(df).value_counts().to_dict())
+            self.categories.update(_first_categories(df).value_counts().to_dict())
+
+            self._sorted_prices = np.sort(np.concatenate([self._sorted_prices, prices]))
+            buckets = np.searchsorted(PRICE_BUCKETS, prices, side="right") - 1
+            self._hist += np.bincount(np.clip(buckets, 0, None), minlength=len(PRICE_BUCKETS))
+            self._refresh()
+
+    def _refresh(self):
+        avg_price = (self.price_sum / self.price_count) if self.price_count else None
+        if self._sorted_prices.size:
+            qs = np.quantile(self._sorted_prices, PRICE_QUANTILES)
+            quantiles = {f"p{int(q * 100)}": float(v) for q, v in zip(PRICE_QUANTILES, qs)}
+        else:
+            quantiles = {}
+        labels = [f"{lo}-{hi}" for lo, hi in zip(PRICE_BUCKETS, PRICE_BUCKETS[1:])] + [f"{PRICE_BUCKETS[-1]}+"]
+
+        summary = {
+            "count": self.count,
+            "avg_price": avg_price,
+            "top_brands": dict(self.brands.most_common(10)),
+            "top_categories": dict(self.categories.most_common(10)),
+            "price_quantiles": quantiles,
+            "price_histogram": dict(zip(labels, map(int, self._hist))),
+        }
+        # content hash: identical across workers/restarts for identical data
+        digest = hashlib.sha1(json.dumps(summary, sort_keys=True).encode("utf-8")).hexdigest()[:20]
+        self._state = (summary, f'"{digest}"')  # one assignment: readers never see a mixed pair
+
+    def snapshot(self) -> Tuple[dict, str]:
+        """(summary, etag) of the same update."""
+        return self._state
+
+    def summary(self) -> dict:
+        return self._state[0]
+
+    @property
+    def etag(self) -> str:
+        return self._state[1]
+
+def compute_analytics(df: pd.DataFrame):
+    return AnalyticsAggregator.from_frame(df).summary()
@@ -0,0 +1,238 @@
+# backend/app/services/ann.py
+from __future__ import annotations
+import os
+from typing import Tuple
+
+import numpy as np
+
+
+def topk_inner_product(vectors: np.ndarray, q: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact top-k by inner product for a batch of queries `q` (m, D).
+    On L2-normalized vectors this is cosine similarity.
+    Returns (sims, idxs), both (m, k), best first.
+    """
+    sims = q @ vectors.T  # (m, N)
+    k = min(k, sims.shape[1])
+    part = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    part_sims = np.take_along_axis(sims, part, axis=1)
+    order = np.argsort(-part_sims, axis=1)
+    return np.take_along_axis(part_sims, order, axis=1), np.take_along_axis(part, order, axis=1)
+
+
+def topk_scores(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k of a 1-D score vector. Returns (scores, positions), best first."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=scores.dtype), np.empty(0, dtype="int64")
+    part = np.argpartition(-scores, k - 1)[:k]
+    order = np.argsort(-scores[part])
+    return scores[part][order], part[order]
+
+
+def chunked_topk(n: int, score_fn, k: int, chunk: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k over rows [0, n) scored block by block with `score_fn(start, stop)`,
+    so temporary memory stays bounded by `chunk` rows.
+    """
+    if n == 0:
+        return np.empty(0, dtype="float32"), np.empty(0, dtype="int64")
+    best_sims, best_idxs = [], []
+    for s in range(0, n, chunk):
+        sims, pos = topk_scores(score_fn(s, min(n, s + chunk)), k)
+        best_sims.append(sims)
+        best_idxs.append(pos + s)
+    sims, pos = topk_scores(np.concatenate(best_sims), k)
+    return sims, np.concatenate(best_idxs)[pos]
+
+
+def batch_topk_inner_product(vectors: np.ndarray, q: np.ndarray, k: int, chunk: int = 65536,
+                             qchunk: int = 1024) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact top-k for many queries at once: (m, D) x (N, D)^T as blocked matrix
+    products (BLAS) with a per-row argpartition, merging block results.
+    Temporary memory is bounded by qchunk x chunk scores.
+    Returns (sims, idxs), both (m, k), best first.
+    """
+    n, m = int(vectors.shape[0]), int(q.shape[0])
+    k = min(k, n)
+    out_sims = np.empty((m, k), dtype="float32")
+    out_idxs = np.empty((m, k), dtype="int64")
+    for qs in range(0, m, qchunk):
+        qb = q[qs:qs + qchunk]
+        best_sims = best_idxs = None
+        for s in range(0, n, chunk):
+            sims, idxs = topk_inner_product(vectors[s:s + chunk], qb, k)
+            idxs = idxs + s
+            if best_sims is not None:
+                sims = np.concatenate([best_sims, sims], axis=1)
+                idxs = np.concatenate([best_idxs, idxs], axis=1)
+                pos = np.argsort(-sims, axis=1)[:, :k]
+                sims, idxs = np.take_along_axis(sims, pos, axis=1), np.take_along_axis(idxs, pos, axis=1)
+            best_sims, best_idxs = sims, idxs
+        out_sims[qs:qs + qchunk], out_idxs[qs:qs + qchunk] = best_sims, best_idxs
+    return out_sims, out_idxs
+
+
+class FlatIndex:
+    """
+    Exact inner-product scan with nothing to fit.
+    Works directly on a read-only np.memmap, so loading it is O(1) and the
+    pages are shared between worker processes through the OS page cache.
+    """
+    def __init__(self, chunk: int = 262144):
+        self.chunk = int(chunk)  # rows scanned per block; bounds temp memory
+
+    def search(self, vectors: np.ndarray, q: np.ndarray, k: int, nprobe: int | None = None) -> Tuple[np.ndarray, np.ndarray]:
+        return chunked_topk(int(vectors.shape[0]), lambda s, e: vectors[s:e] @ q, k, self.chunk)
+
+
+class ScalarQuantizer:
+    """
+    Per-dimension symmetric int8 quantization (4x smaller than float32).
+    code = round(x / scale), scale = max|x_d| / 127 over the training rows.
+    Scores are approximate inner products: codes @ (q * scale).
+    """
+    def __init__(self, scale: np.ndarray | None = None, chunk: int = 65536):
+        self.scale = scale  # (D,) float32
+        self.chunk = int(chunk)
+
+    def fit(self, vectors: np.ndarray, sample: int = 100000):
+        rows = vectors[:sample] if vectors.shape[0] > sample else vectors
+        amax = np.max(np.abs(np.asarray(rows, dtype="float32")), axis=0)
+        self.scale = (np.where(amax == 0, 1.0, amax) / 127.0).astype("float32")
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        out = np.empty(vectors.shape, dtype="int8")
+        for s in range(0, out.shape[0], self.chunk):
+            block = np.rint(vectors[s:s + self.chunk] / self.scale)
+            out[s:s + self.chunk] = np.clip(block, -127, 127)
+        return out
+
+    def search(self, codes: np.ndarray, q: np.ndarray, k: int, ids: np.ndarray | None = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k over `codes`, or over the subset `ids` when given.
+        Returns (approx_sims, row_ids) best first.
+        """
+        qs = (q * self.scale).astype("float32")
+        if ids is not None:
+            sims, pos = topk_scores(codes[ids].astype("float32") @ qs, k)
+            return sims, ids[pos]
+        return chunked_topk(int(codes.shape[0]), lambda s, e: codes[s:e].astype("float32") @ qs, k, self.chunk)
+
+    def save(self, path: str):
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, scale=self.scale)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ScalarQuantizer":
+        with np.load(path) as z:
+            return cls(scale=z["scale"])
+
+
+class IVFIndex:
+    """
+    Inverted-file ANN index (CPU-only, numpy).
+    - Coarse k-means centroids partition the catalog into `nlist` lists
+    - A query scans only the `nprobe` closest lists (recall/latency knob)
+    Vectors themselves are not stored here; callers pass the matrix in,
+    so the index file only holds centroids and list assignments.
+    """
+    def __init__(self, nlist: int = 0, nprobe: int = 8):
+        self.nlist = int(nlist)  # 0 = pick from catalog size at fit time
+        self.nprobe = int(nprobe)
+
+        self.centroids: np.ndarray | None = None  # (nlist, D), normalized
+        self.assign: np.ndarray | None = None     # (N,) list id per row
+        self._ids: np.ndarray | None = None       # row ids grouped by list
+        self._offsets: np.ndarray | None = None   # (nlist + 1,) CSR offsets into _ids
+
+    @property
+    def ntotal(self) -> int:
+        return 0 if self.assign is None else int(self.assign.shape[0])
+
+    # -------- build --------
+    @staticmethod
+    def _auto_nlist(n: int) -> int:
+        # ~4*sqrt(N) lists is the usual starting point for IVF
+        return max(1, min(n, int(4 * np.sqrt(n))))
+
+    def fit(self, vectors: np.ndarray, max_train: int = 64):
+        """
+        Train centroids on (a sample of) `vectors` and assign every row.
+        At most `max_train` points per list are used for training.
+        """
+        n = int(vectors.shape[0])
+        nlist = min(self.nlist, n) if self.nlist else self._auto_nlist(n)
+
+        rng = np.random.default_rng(42)
+        n_train = min(n, max_train * nlist)
+        train = vectors if n_train == n else vectors[np.sort(rng.choice(n, n_train, replace=False))]
+
+        from sklearn.cluster import MiniBatchKMeans
+        km = MiniBatchKMeans(n_clusters=nlist, n_init=1, batch_size=4096, max_iter=20, random_state=42)
+        km.fit(np.asarray(train, dtype="float32"))
+        centroids = km.cluster_centers_.astype("float32")
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-12
+
+        self.nlist = nlist
+        self.centroids = centroids
+        self.assign = self._assign(vectors)
+        self._rebuild_lists()
+        return self
+
+    def add(self, vectors: np.ndarray):
+        """Assign new rows (appended after the existing ones) to their closest list."""
+        if self.centroids is None:
+            raise RuntimeError("IVFIndex must be fit before add().")
+        self.assign = np.concatenate([self.assign, self._assign(vectors)])
+        self._rebuild_lists()
+
+    def _assign(self, vectors: np.ndarray, chunk: int = 65536) -> np.ndarray:
+        out = np.empty(int(vectors.shape[0]), dtype="int32")
+        for s in range(0, out.shape[0], chunk):
+            out[s:s + chunk] = np.argmax(vectors[s:s + chunk] @ self.centroids.T, axis=1)
+        return out
+
+    def _rebuild_lists(self):
+        self._ids = np.argsort(self.assign, kind="stable").astype("int64")
+        counts = np.bincount(self.assign, minlength=self.nlist)
+        self._offsets = np.concatenate([[0], np.cumsum(counts)]).astype("int64")
+
+    # -------- search --------
+    def search(self, vectors: np.ndarray, q: np.ndarray, k: int, nprobe: int | None = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k for a single query `q` (D,).
+        Returns (sims, idxs) best first; fewer than k if the probed lists are small.
+        """
+        cand = self.candidates(q, nprobe)
+        if cand.size == 0:
+            return np.empty(0, dtype="float32"), np.empty(0, dtype="int64")
+
+        sims, pos = topk_inner_product(vectors[cand], q[None, :], k)
+        return sims[0], cand[pos[0]]
+
+    def candidates(self, q: np.ndarray, nprobe: int | None = None) -> np.ndarray:
+        """Row ids stored in the `nprobe` lists whose centroids are closest to `q`."""
+        nprobe = max(1, min(int(nprobe or self.nprobe), self.nlist))
+        csims = self.centroids @ q
+        probe = np.argpartition(-csims, nprobe - 1)[:nprobe] if nprobe < self.nlist else np.arange(self.nlist)
+        return np.concatenate([self._ids[self._offsets[l]:self._offsets[l + 1]] for l in probe])
+
+    # -------- persistence --------
+    def save(self, path: str):
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, centroids=self.centroids, assign=self.assign, nprobe=np.int64(self.nprobe))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, nprobe: int | None = None) -> "IVFIndex":
+        with np.load(path) as z:
+            centroids, assign = z["centroids"], z["assign"]
+            stored_nprobe = int(z["nprobe"])
+        idx = cls(nlist=int(centroids.shape[0]), nprobe=nprobe or stored_nprobe)
+        idx.centroids, idx.assign = centroids, assign
+        idx._rebuild_lists()
+        return idx
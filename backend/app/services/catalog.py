@@ -0,0 +1,226 @@
+# app/services/catalog.py
+from __future__ import annotations
+import math
+import os
+import threading
+import urllib.parse
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+REQUIRED_COLS = [
+    "uniq_id","title","brand","description","price","categories","images",
+    "manufacturer","package dimensions","country_of_origin","material","color"
+]
+
+# precomputed per-row response fields (see normalize_frame)
+RESPONSE_COLS = ["uniq_id_str", "title_str", "image_url", "price_num", "brand_clean", "categories_clean", "link"]
+
+AMAZON_PREFIX = "https://m.media-amazon.com/images/I/"
+
+# ----------------- Helper Functions -----------------
+def split_first(raw) -> str:
+    if not isinstance(raw, str):
+        return ""
+    # "a|b", "a, b" or a list literal "['a', 'b']"
+    first = raw.strip().lstrip("[").split("|")[0].split(",")[0].strip()
+    return first.rstrip("]").strip().strip("'\"").strip()
+
+def to_price_number(v) -> Optional[float]:
+    if v is None:
+        return None
+    s = str(v).strip().replace(",", "")
+    for sym in ["₹", "$", "€", "£"]:
+        s = s.replace(sym, "")
+    try:
+        return float(s)
+    except:
+        return None
+
+def build_click_url(row) -> str:
+    for cand in ["product_url", "url", "link", "product_link"]:
+        if cand in row and isinstance(row[cand], str) and row[cand].strip():
+            return row[cand].strip()
+    q = f"{row.get('title','')} {row.get('brand','')}".strip() or str(row.get("uniq_id","furniture"))
+    return f"https://www.google.com/search?q={urllib.parse.quote(q)}"
+
+def json_none_if_nan(x):
+    try:
+        if isinstance(x, float) and math.isnan(x):
+            return None
+    except:
+        pass
+    return x if x is not None else None
+
+def resolve_image_ref(val: str, image_dir: Optional[str]) -> str:
+    """
+    Request-independent image reference: an absolute URL, "/images/<file>"
+    for files served from `image_dir` (prefix with the request base URL),
+    or "" when nothing usable is found.
+    """
+    if not val:
+        return ""
+    v = val.strip().strip("'\"")
+    if v.lower().startswith("http://") or v.lower().startswith("https://"):
+        return v
+    if v.lower().endswith((".jpg", ".jpeg", ".png", ".webp")) and "/" not in v:
+        return f"{AMAZON_PREFIX}{urllib.parse.quote(v)}"
+    if image_dir and os.path.isfile(os.path.join(image_dir, v)):
+        return f"/images/{urllib.parse.quote(v)}"
+    return ""
+
+def normalize_frame(df: pd.DataFrame, image_dir: Optional[str] = None) -> pd.DataFrame:
+    """
+    Fill required columns and precompute every field the API responds with,
+    so serving a hit is a gather by row index instead of per-row parsing.
+    """
+    df = df.copy()
+    for c in REQUIRED_COLS:
+        if c not in df.columns:
+            df[c] = ""
+    df["price_num"] = pd.to_numeric(df["price"].map(to_price_number), errors="coerce")
+    df["image_first"] = df["images"].map(split_first)
+    df["image_url"] = df["image_first"].map(lambda v: resolve_image_ref(v, image_dir))
+    df["link"] = [build_click_url(r) for r in df.to_dict("records")]
+    df["uniq_id_str"] = df["uniq_id"].fillna("").astype(str)
+    df["title_str"] = df["title"].fillna("").astype(str)
+    df["brand_clean"] = df["brand"].map(json_none_if_nan).astype(object)
+    df["categories_clean"] = df["categories"].map(json_none_if_nan).astype(object)
+    return df
+
+
+class Catalog:
+    """
+    Product catalog plus a compiled columnar copy.
+
+    load() parses + normalizes the CSV once and writes the result to a
+    Parquet file; later boots read that file directly while it is newer than
+    the CSV. Response fields are kept as numpy arrays so building the items
+    for a list of hits is a fancy-index gather. Appends are kept as separate
+    parts and merged lazily, so chunked ingestion never copies the catalog
+    once per chunk.
+    """
+    def __init__(self, df: pd.DataFrame, image_dir: Optional[str] = None):
+        self.image_dir = image_dir
+        # appended chunks stay separate parts until a reader needs one frame
+        self._parts: List[pd.DataFrame] = [df.reset_index(drop=True)]
+        self._array_parts: List[Dict[str, np.ndarray]] = [self._column_arrays(self._parts[0])]
+        # uniq_id -> first row index
+        self._ids: Dict[str, int] = {}
+        self._index_ids(self._array_parts[0]["uniq_id_str"], 0)
+        self._n = len(df)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __contains__(self, uniq_id: str) -> bool:
+        return uniq_id in self._ids
+
+    def _index_ids(self, ids: np.ndarray, start: int):
+        for i, uid in enumerate(ids, start):
+            self._ids.setdefault(uid, i)
+
+    def rows_for(self, uniq_ids) -> List[Optional[int]]:
+        """Row index of each uniq_id (None if unknown)."""
+        return [self._ids.get(str(u)) for u in uniq_ids]
+
+    @property
+    def df(self) -> pd.DataFrame:
+        return self._consolidate()[0]
+
+    @staticmethod
+    def _column_arrays(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        arrays = {c: df[c].to_numpy(dtype=object) for c in RESPONSE_COLS}
+        price = df["price_num"].to_numpy(dtype="float64")
+        arrays["price_num"] = np.array([None if math.isnan(p) else float(p) for p in price], dtype=object)
+        for c in ("brand_clean", "categories_clean"):
+            arrays[c] = np.array([json_none_if_nan(v) for v in arrays[c]], dtype=object)
+        return arrays
+
+    def _consolidate(self) -> Tuple[pd.DataFrame, Dict[str, np.ndarray]]:
+        """Merge pending parts (once per batch of appends, not once per append)."""
+        with self._lock:
+            if len(self._parts) > 1:
+                df = pd.concat(self._parts, ignore_index=True)
+                arrays = {c: np.concatenate([a[c] for a in self._array_parts]) for c in RESPONSE_COLS}
+                self._parts, self._array_parts = [df], [arrays]
+            return self._parts[0], self._array_parts[0]
+
+    # -------- load / compile --------
+    @classmethod
+    def load(cls, csv_path: str, compiled_path: Optional[str] = None, image_dir: Optional[str] = None) -> "Catalog":
+        fresh = (compiled_path and os.path.isfile(compiled_path)
+                 and os.path.getmtime(compiled_path) >= os.path.getmtime(csv_path))
+        if fresh:
+            try:
+                df = pd.read_parquet(compiled_path)
+                if all(c in df.columns for c in RESPONSE_COLS):
+                    return cls(df, image_dir)
+            except Exception:
+                pass  # unreadable / no parquet engine: recompile below
+
+        df = normalize_frame(pd.read_csv(csv_path), image_dir)
+        if compiled_path:
+            cls.compile(df, compiled_path)
+        return cls(df, image_dir)
+
+    @staticmethod
+    def compile(df: pd.DataFrame, compiled_path: str) -> bool:
+        """Write the normalized frame as Parquet; False if no engine (pyarrow) is available."""
+        tmp_path = compiled_path + ".tmp"
+        try:
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, compiled_path)
+            return True
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+    # -------- updates --------
+    def normalize(self, new_df: pd.DataFrame) -> pd.DataFrame:
+        return normalize_frame(new_df, self.image_dir)
+
+    def append(self, new_df: pd.DataFrame, normalized: bool = False) -> pd.DataFrame:
+        """
+        Append rows as row indices len(self), len(self)+1, ...; returns the
+        normalized new rows. The existing frame is not copied here.
+        """
+        new_rows = (new_df if normalized else self.normalize(new_df)).reset_index(drop=True)
+        arrays = self._column_arrays(new_rows)
+        with self._lock:
+            self._parts.append(new_rows)
+            self._array_parts.append(arrays)
+            self._index_ids(arrays["uniq_id_str"], self._n)
+            self._n += len(new_rows)
+        return new_rows
+
+    # -------- serving --------
+    def items(self, idxs, base_url: str = "") -> List[dict]:
+        """Response items for row indices (without generated_description)."""
+        idxs = np.asarray(idxs, dtype="int64")
+        _, arrays = self._consolidate()
+        cols = {c: arrays[c][idxs] for c in RESPONSE_COLS}
+        base = base_url.rstrip("/")
+        images = [(base + u if u.startswith("/") else u) or None for u in cols["image_url"]]
+        return [
+            {
+                "uniq_id": uid,
+                "title": title,
+                "image": img,
+                "price": price,
+                "brand": brand,
+                "categories": cats,
+                "link": link,
+            }
+            for uid, title, img, price, brand, cats, link in zip(
+                cols["uniq_id_str"], cols["title_str"], images, cols["price_num"],
+                cols["brand_clean"], cols["categories_clean"], cols["link"],
+            )
+        ]
+
+    def records(self, idxs, cols: List[str]) -> List[dict]:
+        """Raw catalog fields for row indices (e.g. generation prompts)."""
+        return self.df.iloc[np.asarray(idxs, dtype="int64")][cols].to_dict("records")
@@ -0,0 +1,77 @@
+# app/services/descriptions.py
+from __future__ import annotations
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class DescriptionStore:
+    """
+    Precomputed per-product descriptions keyed by uniq_id.
+
+    Backed by an append-only JSONL file ({"uniq_id": ..., "text": ...} per
+    line) so the offline batch job can resume after a crash and the API can
+    pick up newly appended lines without a restart. Lookups are O(1).
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._texts: Dict[str, str] = {}
+        self._offset = 0  # bytes of the file already read
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def __contains__(self, uniq_id: str) -> bool:
+        return uniq_id in self._texts
+
+    def refresh(self):
+        """Read lines appended since the last refresh (no-op if the file is unchanged)."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        with self._lock:
+            if size == self._offset:
+                return
+            if size < self._offset:  # file replaced/truncated: start over
+                self._texts, self._offset = {}, 0
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                chunk = f.read(size - self._offset)
+            # only consume complete lines; a torn last line is re-read next time
+            end = chunk.rfind(b"\n") + 1
+            for line in chunk[:end].splitlines():
+                try:
+                    rec = json.loads(line)
+                    self._texts[str(rec["uniq_id"])] = str(rec["text"])
+                except Exception:
+                    continue
+            self._offset += end
+
+    def get(self, uniq_id: str) -> Optional[str]:
+        return self._texts.get(uniq_id)
+
+    def get_many(self, uniq_ids: Iterable[str]) -> List[Optional[str]]:
+        self.refresh()
+        return [self._texts.get(u) for u in uniq_ids]
+
+    def append(self, items: List[Tuple[str, str]]):
+        """Persist (uniq_id, text) pairs; later lines win on reload."""
+        if not items:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        data = "".join(json.dumps({"uniq_id": u, "text": t}, ensure_ascii=False) + "\n" for u, t in items)
+        with self._lock:
+            with open(self.path, "a+b") as f:
+                # start on a fresh line if a previous writer died mid-line
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        data = "\n" + data
+                f.write(data.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+        self.refresh()
@@ -0,0 +1,128 @@
+# app/services/embedding_cache.py
+from __future__ import annotations
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .filelock import FileLock
+
+
+def text_key(model_name: str, text: str) -> str:
+    """Cache key: model name + content hash of the (already concatenated) text."""
+    return hashlib.sha1(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Append-only on-disk embedding cache for one model.
+
+    Layout under `<cache_dir>/<model slug>/`:
+    - vectors.f32: raw float32 rows, read through a read-only np.memmap
+    - keys.txt:    one hex key per line; line i <-> row i of vectors.f32
+    - info.json:   embedding dim
+
+    Rows are written before their keys, so a crash mid-write can only
+    leave unreferenced bytes; those are dropped on the next load/append.
+    Processes sharing the directory serialize writes on `.lock` and pick up
+    each other's rows (keys.txt past what they have read) before appending.
+    """
+    def __init__(self, cache_dir: str, model_name: str):
+        self.model_name = model_name
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.dir = os.path.join(cache_dir, slug)
+        os.makedirs(self.dir, exist_ok=True)
+
+        self.vec_path = os.path.join(self.dir, "vectors.f32")
+        self.keys_path = os.path.join(self.dir, "keys.txt")
+        self.info_path = os.path.join(self.dir, "info.json")
+
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(os.path.join(self.dir, ".lock"))
+        self._rows: Dict[str, int] = {}
+        self._n = 0          # rows of vectors.f32 covered by keys.txt
+        self._keys_end = 0   # bytes of keys.txt read so far
+        self._dim: int | None = None
+        self._mm: np.ndarray | None = None
+        with self._lock, self._file_lock:
+            self._sync()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # -------- persistence helpers --------
+    def _sync(self):
+        """Read the keys appended since the last sync (by any process); call under the file lock."""
+        if self._dim is None:
+            if not os.path.isfile(self.info_path):
+                return
+            with open(self.info_path, "r", encoding="utf-8") as f:
+                self._dim = int(json.load(f)["dim"])
+        if not (os.path.isfile(self.keys_path) and os.path.isfile(self.vec_path)):
+            return
+        with open(self.keys_path, "rb") as f:
+            f.seek(self._keys_end)
+            data = f.read()
+        keys = data.decode("utf-8", errors="replace").split("\n")[:-1]  # last element is "" or a torn line
+        keys = keys[:max(0, os.path.getsize(self.vec_path) // (4 * self._dim) - self._n)]
+        end = self._keys_end + sum(len(k) + 1 for k in keys)
+        if end != self._keys_end + len(data):
+            # a writer died mid-write: drop its partial line (its vector rows go on the next append)
+            with open(self.keys_path, "r+b") as f:
+                f.truncate(end)
+        for i, k in enumerate(keys, self._n):
+            self._rows[k] = i
+        self._n += len(keys)
+        self._keys_end = end
+        if keys:
+            self._remap()
+
+    def _remap(self):
+        n = self._n
+        self._mm = np.memmap(self.vec_path, dtype="float32", mode="r", shape=(n, self._dim)) if n else None
+
+    # -------- public API --------
+    def keys_for(self, texts: List[str]) -> List[str]:
+        return [text_key(self.model_name, t) for t in texts]
+
+    def get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        """Cached vector per key, or None for misses."""
+        with self._lock:
+            rows = [self._rows.get(k) for k in keys]
+            mm = self._mm
+        return [None if r is None else np.array(mm[r]) for r in rows]
+
+    def put_many(self, keys: List[str], vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        with self._lock, self._file_lock:
+            self._sync()  # rows other processes added since our last write
+            if self._dim is None:
+                self._dim = int(vectors.shape[1])
+                with open(self.info_path, "w", encoding="utf-8") as f:
+                    json.dump({"dim": self._dim, "model": self.model_name}, f)
+            if int(vectors.shape[1]) != self._dim:
+                raise ValueError(f"Embedding dim {vectors.shape[1]} does not match cache dim {self._dim}.")
+
+            fresh = {}
+            for k, v in zip(keys, vectors):
+                if k not in self._rows and k not in fresh:
+                    fresh[k] = v
+            if not fresh:
+                return
+
+            with open(self.vec_path, "ab") as f:
+                f.truncate(self._n * self._dim * 4)  # drop rows of an interrupted write
+                f.write(np.stack(list(fresh.values())).tobytes())
+            data = "".join(k + "\n" for k in fresh).encode("utf-8")
+            with open(self.keys_path, "ab") as f:
+                f.write(data)
+
+            for i, k in enumerate(fresh, self._n):
+                self._rows[k] = i
+            self._n += len(fresh)
+            self._keys_end += len(data)
+            self._remap()
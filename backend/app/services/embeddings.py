@@ -1,9 +1,10 @@
 # app/services/embeddings.py
-from sentence_transformers import SentenceTransformer
 import numpy as np
-from typing import List, Union
+from typing import List, Optional, Union
 import os
 
+from .embedding_cache import EmbeddingCache
+
 # Avoid non-deterministic parallel tokenization behavior
 os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
 
@@ -20,24 +21,121 @@ def _l2_normalize(x: np.ndarray) -> np.ndarray:
     denom = np.where(denom == 0, 1e-12, denom)
     return x / denom
 
+def quantize_dynamic_int8(model):
+    """Copy of `model` with every nn.Linear dynamically quantized to int8 (CPU inference only)."""
+    import torch
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def cosine_agreement(a: np.ndarray, b: np.ndarray) -> dict:
+    """Row-wise cosine between two embeddings of the same texts (e.g. int8 vs fp32)."""
+    cos = np.sum(_l2_normalize(np.asarray(a)) * _l2_normalize(np.asarray(b)), axis=1)
+    return {
+        "mean": float(cos.mean()),
+        "p01": float(np.percentile(cos, 1)),
+        "min": float(cos.min()),
+        "rows": int(cos.shape[0]),
+    }
+
+
 class TextEmbedder:
-    def __init__(self, model_name: str):
+    # texts per forward pass; fast mode sorts texts by token length first
+    batch_size = 32
+    bucket = False
+    quantized = False
+
+    def __init__(self, model_name: str, cache_dir: Optional[str] = None, quantize: bool = False,
+                 batch_size: int = 32, threads: int = 0, bucket: Optional[bool] = None):
+        """
+        quantize: int8 dynamic quantization of the Linear layers (the "fast"
+        CPU mode; embeddings differ slightly from fp32, see cosine_agreement).
+        bucket: encode in token-length order (defaults to on with quantize).
+        threads: torch intra-op threads for this process (0 keeps torch's default).
+        """
         # Load once; caller already caches the instance via @lru_cache
+        self.model_name = model_name
+        if threads:
+            import torch
+            torch.set_num_threads(int(threads))
+        from sentence_transformers import SentenceTransformer  # heavy (torch): only when a model is loaded
         self.model = SentenceTransformer(model_name)
+        if quantize:
+            self.model = quantize_dynamic_int8(self.model)
+        self.quantized = bool(quantize)
+        self.bucket = self.quantized if bucket is None else bool(bucket)
+        self.batch_size = max(1, int(batch_size))
+        # optional on-disk cache keyed by model name + text hash; int8 vectors are cached separately
+        self.cache = EmbeddingCache(cache_dir, self.signature) if cache_dir else None
 
-    def encode(self, texts: Union[str, List[str]]) -> np.ndarray:
+    @property
+    def signature(self) -> str:
+        """Model and mode ("<model>" or "<model>#int8"): embeddings are only comparable within one."""
+        return self.model_name + ("#int8" if self.quantized else "")
+
+    def encode(self, texts: Union[str, List[str]], cache: Optional[bool] = None) -> np.ndarray:
         """
         Returns L2-normalized embeddings (float32).
         We disable internal normalization and do it ourselves to ensure
         consistent behavior across library/model versions.
+
+        With a cache configured, batches only run the model on texts that
+        are not cached yet. Single texts (search queries) bypass the disk
+        cache so ad-hoc queries don't grow it without bound; `cache` forces
+        either behaviour (e.g. for queries batched together by the model server).
         """
         if isinstance(texts, str):
             texts = [texts]
+        if cache is None:
+            cache = len(texts) >= 2
+        if self.cache is None or not cache:
+            return self._encode_model(texts)
+
+        keys = self.cache.keys_for(texts)
+        cached = self.cache.get_many(keys)
+        missing = {}
+        for i, (k, v) in enumerate(zip(keys, cached)):
+            if v is None and k not in missing:
+                missing[k] = i
+        if missing:
+            fresh = self._encode_model([texts[i] for i in missing.values()])
+            self.cache.put_many(list(missing), fresh)
+            by_key = dict(zip(missing, fresh))
+            cached = [by_key[k] if v is None else v for k, v in zip(keys, cached)]
+        return np.stack(cached).astype("float32", copy=False)
+
+    def _encode_model(self, texts: List[str]) -> np.ndarray:
+        if self.bucket and len(texts) > self.batch_size:
+            return self._encode_bucketed(texts)
+        return _l2_normalize(self._forward(texts))
 
-        embs = self.model.encode(
+    def _forward(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(
             texts,
+            batch_size=self.batch_size,
             show_progress_bar=False,
             convert_to_numpy=True,
             normalize_embeddings=False,  # we normalize explicitly below
         )
-        return _l2_normalize(embs)
+
+    def _token_lengths(self, texts: List[str]) -> np.ndarray:
+        tok = getattr(self.model, "tokenizer", None)
+        if tok is None:
+            return np.fromiter((len(t) for t in texts), dtype="int64", count=len(texts))
+        max_len = getattr(self.model, "max_seq_length", None) or 512
+        ids = tok(texts, add_special_tokens=True, truncation=True, max_length=max_len)["input_ids"]
+        return np.fromiter((len(x) for x in ids), dtype="int64", count=len(texts))
+
+    def _encode_bucketed(self, texts: List[str]) -> np.ndarray:
+        """
+        Batches of similar token length, so padding stays close to zero
+        (catalog rows range from a title to a long description).
+        """
+        order = np.argsort(self._token_lengths(texts), kind="stable")
+        out = None
+        for s in range(0, len(order), self.batch_size):
+            idx = order[s:s + self.batch_size]
+            embs = self._forward([texts[i] for i in idx])
+            if out is None:
+                out = np.empty((len(texts), embs.shape[1]), dtype="float32")
+            out[idx] = embs
+        return _l2_normalize(out)
@@ -0,0 +1,124 @@
+# app/services/filters.py
+from __future__ import annotations
+import re
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# request field -> catalog column holding the (normalized) value
+KEYWORD_FIELDS = {
+    "brand": "brand",
+    "category": "categories",
+    "material": "material",
+    "color": "color",
+}
+
+
+def norm_value(v) -> str:
+    if not isinstance(v, str):
+        return ""
+    return " ".join(v.lower().split())
+
+
+def first_category(raw) -> str:
+    """First entry of a categories cell: "['Home & Kitchen', ...]" / "A|B" / "A, B" -> "home & kitchen"."""
+    if not isinstance(raw, str):
+        return ""
+    first = re.split(r"[|,]", raw)[0]
+    return norm_value(first.strip().strip("[]'\" "))
+
+
+class AttributeIndex:
+    """
+    Precomputed attribute indexes over catalog rows (row i <-> vector i).
+    - price: row ids sorted by price_num, for range lookups via searchsorted
+    - brand / category / material / color: value -> sorted int64 row-id postings
+    `mask()` turns structured filters into a boolean row mask that the
+    vector search applies while scanning (not as a post-filter).
+    """
+    def __init__(self):
+        self.n = 0
+        self._price_sorted = np.empty(0, dtype="float64")  # prices ascending (NaN dropped)
+        self._price_order = np.empty(0, dtype="int64")     # row id per sorted price
+        self._postings: Dict[str, Dict[str, np.ndarray]] = {f: {} for f in KEYWORD_FIELDS}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "AttributeIndex":
+        idx = cls()
+        idx.add(df)
+        return idx
+
+    @staticmethod
+    def _keyword_values(df: pd.DataFrame, field: str) -> pd.Series:
+        col = KEYWORD_FIELDS[field]
+        if col not in df.columns:
+            return pd.Series([""] * len(df), index=df.index)
+        if field == "category":
+            return df[col].map(first_category)
+        return df[col].map(norm_value)
+
+    def add(self, df: pd.DataFrame):
+        """Index `df` as rows n, n+1, ... (call in the same order rows are appended)."""
+        start, m = self.n, len(df)
+        if m == 0:
+            return
+        ids = np.arange(start, start + m, dtype="int64")
+
+        prices = pd.to_numeric(df["price_num"], errors="coerce").to_numpy(dtype="float64") \
+            if "price_num" in df.columns else np.full(m, np.nan)
+        ok = ~np.isnan(prices)
+        all_prices = np.concatenate([self._price_sorted, prices[ok]])
+        all_ids = np.concatenate([self._price_order, ids[ok]])
+        order = np.argsort(all_prices, kind="stable")
+        self._price_sorted, self._price_order = all_prices[order], all_ids[order]
+
+        for field in KEYWORD_FIELDS:
+            values = self._keyword_values(df, field).to_numpy()
+            postings = self._postings[field]
+            for value, pos in pd.Series(np.arange(m)).groupby(values).groups.items():
+                if not value:
+                    continue
+                new = ids[np.asarray(pos, dtype="int64")]
+                old = postings.get(value)
+                postings[value] = new if old is None else np.concatenate([old, new])
+
+        self.n = start + m
+
+    def values(self, field: str) -> List[str]:
+        return sorted(self._postings[field])
+
+    def mask(self, price_min: Optional[float] = None, price_max: Optional[float] = None,
+             **keywords: Optional[Iterable[str]]) -> Optional[np.ndarray]:
+        """
+        Boolean mask (n,) of rows matching every given filter; None if no filter is set.
+        Keyword filters (brand/category/material/color) match any of the listed
+        values, case-insensitively.
+        """
+        mask = None
+
+        if price_min is not None or price_max is not None:
+            lo = 0 if price_min is None else np.searchsorted(self._price_sorted, price_min, side="left")
+            hi = len(self._price_sorted) if price_max is None else np.searchsorted(self._price_sorted, price_max, side="right")
+            mask = np.zeros(self.n, dtype=bool)
+            mask[self._price_order[lo:hi]] = True
+
+        for field, wanted in keywords.items():
+            if field not in KEYWORD_FIELDS:
+                raise ValueError(f"Unknown filter field {field!r}.")
+            if not wanted:
+                continue
+            if isinstance(wanted, str):
+                wanted = [wanted]
+            postings = self._postings[field]
+            m = np.zeros(self.n, dtype=bool)
+            for v in wanted:
+                if field == "category":
+                    ids = postings.get(first_category(v))
+                else:
+                    ids = postings.get(norm_value(v))
+                if ids is not None:
+                    m[ids] = True
+            mask = m if mask is None else (mask & m)
+
+        return mask
@@ -1,22 +1,62 @@
 # app/services/genai.py
-from typing import Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import AsyncIterator, List, Optional, Tuple
+import asyncio
 import textwrap
 
-try:
-    from transformers import pipeline
-except Exception:
-    pipeline = None
-
 _SYSTEM_STYLE = (
     "Write a concise, vivid, benefit-focused product blurb (45–65 words). "
     "Prefer active voice. Start with a hook. Mention material/color if relevant. "
     "End with a short use-case. No hashtags. No URLs."
 )
 
+# canned text when no model is available / generation is too slow
+FALLBACK_TEXT = ("Clean, modern design built for everyday comfort. Durable materials, easy to maintain, "
+                 "and sized to fit most rooms. A versatile piece that elevates your space without fuss.")
+_ERROR_TEXT = ("Comfort-forward build with a refined silhouette and practical finish. "
+               "Pairs well with modern and minimalist décor for daily use.")
+
+_GEN_KWARGS = dict(
+    max_new_tokens=70,
+    do_sample=True,
+    temperature=0.7,
+    top_p=0.9,
+    repetition_penalty=1.1,
+)
+
+# catalog fields product_prompt reads
+PROMPT_FIELDS = ["title", "brand", "categories", "material", "color", "price"]
+
+def product_prompt(row, query: Optional[str] = None) -> str:
+    """
+    Generation context for one catalog row (dict / pd.Series).
+    Without `query` this is the query-independent base description
+    that the offline batch job precomputes.
+    """
+    ctx = (
+        f"Product: {row.get('title','')}\n"
+        f"Brand: {row.get('brand','')}\n"
+        f"Category: {row.get('categories','')}\n"
+        f"Material: {row.get('material','')}\n"
+        f"Color: {row.get('color','')}\n"
+        f"Price: {row.get('price','')}\n\n"
+    )
+    if query:
+        return ctx + (
+            f"User query: {query}\n"
+            "Write a concise, enticing description (<= 70 words) for why this fits."
+        )
+    return ctx + "Write a concise, enticing description (<= 70 words) of this product."
+
+
 class DescriptionGenerator:
     def __init__(self, model_name: str = "gpt2"):
         self.model_name = model_name
         self.pipe = None
+        try:
+            from transformers import pipeline  # heavy (torch): only when a generator is built
+        except Exception:
+            pipeline = None
         if pipeline is not None:
             try:
                 self.pipe = pipeline(
@@ -26,25 +66,83 @@ class DescriptionGenerator:
                 )
             except Exception:
                 self.pipe = None
+        if self.pipe is not None and self.pipe.tokenizer.pad_token_id is None:
+            # GPT-2 has no pad token; left-pad with EOS so a batch can share one forward pass
+            self.pipe.tokenizer.pad_token_id = self.pipe.model.config.eos_token_id
+            self.pipe.tokenizer.padding_side = "left"
+
+        # dedicated worker so generation never runs on the event loop / request threads
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="genai")
+
+    @staticmethod
+    def _wrap(prompt: str) -> str:
+        return f"{_SYSTEM_STYLE}\n\nContext:\n{prompt}\n\nBlurb:"
+
+    @staticmethod
+    def _tail(out: str) -> str:
+        # return the new tail after "Blurb:"
+        tail = out.split("Blurb:", 1)[-1].strip()
+        return textwrap.shorten(tail, width=420, placeholder="…")
 
     def generate(self, prompt: str) -> str:
-        prompt = f"{_SYSTEM_STYLE}\n\nContext:\n{prompt}\n\nBlurb:"
+        prompt = self._wrap(prompt)
         if self.pipe is None:
             # graceful fallback
-            return ("Clean, modern design built for everyday comfort. Durable materials, easy to maintain, "
-                    "and sized to fit most rooms. A versatile piece that elevates your space without fuss.")
+            return FALLBACK_TEXT
+        try:
+            out = self.pipe(prompt, **_GEN_KWARGS)[0]["generated_text"]
+            return self._tail(out)
+        except Exception:
+            return _ERROR_TEXT
+
+    def generate_batch(self, prompts: List[str]) -> List[str]:
+        """
+        Generate one blurb per prompt in a single padded, batched pipeline call.
+        """
+        if not prompts:
+            return []
+        if self.pipe is None:
+            return [FALLBACK_TEXT] * len(prompts)
         try:
-            out = self.pipe(
-                prompt,
-                max_new_tokens=70,
-                do_sample=True,
-                temperature=0.7,
-                top_p=0.9,
-                repetition_penalty=1.1,
-            )[0]["generated_text"]
-            # return the new tail after "Blurb:"
-            tail = out.split("Blurb:", 1)[-1].strip()
-            return textwrap.shorten(tail, width=420, placeholder="…")
+            outs = self.pipe([self._wrap(p) for p in prompts], batch_size=len(prompts), **_GEN_KWARGS)
+            return [self._tail(o[0]["generated_text"]) for o in outs]
         except Exception:
-            return ("Comfort-forward build with a refined silhouette and practical finish. "
-                    "Pairs well with modern and minimalist décor for daily use.")
+            return [_ERROR_TEXT] * len(prompts)
+
+    def submit_batch(self, prompts: List[str]) -> Future:
+        """Queue `generate_batch` on the dedicated generation thread."""
+        return self._executor.submit(self.generate_batch, prompts)
+
+    async def agenerate_batch(self, prompts: List[str], timeout: Optional[float] = None) -> List[str]:
+        """
+        Awaitable `generate_batch` with a latency cap: after `timeout` seconds
+        every blurb falls back to the canned text.
+        """
+        fut = asyncio.wrap_future(self.submit_batch(prompts))
+        try:
+            return await asyncio.wait_for(fut, timeout=timeout)
+        except asyncio.TimeoutError:
+            return [FALLBACK_TEXT] * len(prompts)
+
+    async def astream(self, prompts: List[str], timeout: Optional[float] = None) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Yield (index, blurb) as each prompt finishes on the generation thread.
+        Prompts still pending after `timeout` seconds yield the canned text.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        pending = {asyncio.wrap_future(self._executor.submit(self.generate, p)): i for i, p in enumerate(prompts)}
+        try:
+            while pending:
+                remaining = None if deadline is None else max(0.0, deadline - loop.time())
+                done, _ = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    for i in sorted(pending.values()):
+                        yield i, FALLBACK_TEXT
+                    return
+                for fut in done:
+                    yield pending.pop(fut), fut.result()
+        finally:
+            # deadline hit or client went away: drop work that has not started yet
+            for fut in pending:
+                fut.cancel()
@@ -0,0 +1,331 @@
+# app/services/index_manager.py
+from __future__ import annotations
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from .filelock import FileLock
+from .vector_store import VectorStore
+
+CURRENT_FILE = "CURRENT"
+GEN_PREFIX = "gen-"
+LOCK_FILE = ".write.lock"
+DRAFT_FILE = ".draft"  # marks a fork that has not been published yet
+# written in place by VectorStore.append (append_npy, CSV append, json dump);
+# every other index file is only created or replaced (temp file + os.replace)
+IN_PLACE_FILES = ("vectors.npy", "meta.csv", "codes.npy", "meta.json")
+
+
+class IndexManager:
+    """
+    Versioned vector index generations under one root directory:
+
+        <root>/gen-20240101T120000000000-1a2b3c/   vectors.npy, meta.csv, ...
+        <root>/CURRENT                             name of the live generation
+
+    A rebuild writes a brand-new generation on a background thread and then
+    atomically replaces CURRENT (temp file + os.replace), so a crash never
+    leaves a torn index behind and serving never blocks on a build.
+    Published generations are never modified: fork() copies the live one
+    into a private generation that a writer appends to in place for as long
+    as it likes (e.g. one upload job), and publish() then makes it live in
+    one step. Forks are opened with `fork_factory` (typically mmap mode), so
+    appends and publishing never reload the vectors. Publishing processes
+    serialize on a lock file in `root`, so concurrent writers never fork the
+    same base.
+    Each process polls CURRENT at most every `reload_interval` seconds and
+    loads a newer generation in the background, swapping it in once ready;
+    `before_swap(vs)` runs (under `write_lock`) just before a store goes live.
+    Generations other than the live one and the `keep` newest are removed
+    after each publish, once they have been superseded for a few reload
+    intervals; unpublished forks only once untouched for `draft_ttl`
+    seconds. A pre-versioning index stored directly in `root` is served
+    as-is until the first rebuild or extend.
+    """
+    def __init__(self, root: str, factory: Callable[[str], VectorStore], keep: int = 2,
+                 reload_interval: float = 5.0, write_lock=None,
+                 fork_factory: Optional[Callable[[str], VectorStore]] = None,
+                 on_swap: Optional[Callable[[VectorStore], None]] = None,
+                 before_swap: Optional[Callable[[VectorStore], None]] = None):
+        self.root = root
+        self.factory = factory
+        self.fork_factory = fork_factory or factory
+        self.keep = max(1, int(keep))
+        self.reload_interval = reload_interval
+        self.write_lock = write_lock if write_lock is not None else nullcontext()
+        self.on_swap = on_swap
+        self.before_swap = before_swap
+        # other processes may still be loading a superseded generation
+        self.gc_grace = max(30.0, 3 * reload_interval)
+        # a writer may still be appending to an unpublished fork
+        self.draft_ttl = 3600.0
+        os.makedirs(self.root, exist_ok=True)
+        self._file_lock = FileLock(os.path.join(self.root, LOCK_FILE))
+
+        self._store: Optional[VectorStore] = None
+        self._generation: Optional[str] = None
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._loading: Optional[str] = None
+        self._build: Optional[Future] = None
+        self._last_build: dict = {}
+        self._build_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-build")
+        self._load_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-load")
+
+    # -------- generations on disk --------
+    @property
+    def current_path(self) -> str:
+        return os.path.join(self.root, CURRENT_FILE)
+
+    def _read_current(self) -> Optional[str]:
+        try:
+            with open(self.current_path, "r", encoding="utf-8") as f:
+                name = f.read().strip()
+        except OSError:
+            name = ""
+        if name and os.path.isdir(os.path.join(self.root, name)):
+            return name
+        # legacy layout: vectors.npy directly in the root
+        if os.path.isfile(os.path.join(self.root, "vectors.npy")):
+            return "."
+        return None
+
+    def _publish(self, name: str):
+        tmp_path = self.current_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(name)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.current_path)
+
+    def generations(self) -> List[str]:
+        return sorted(d for d in os.listdir(self.root)
+                      if d.startswith(GEN_PREFIX) and os.path.isdir(os.path.join(self.root, d)))
+
+    def gc(self) -> List[str]:
+        """
+        Delete generations that are neither live nor among the `keep` newest,
+        and whose successor is older than `gc_grace` seconds; forks still
+        being written to are kept until they go `draft_ttl` seconds untouched.
+        """
+        live = self._read_current()
+        gens = self.generations()
+        now = time.time()
+        removed = []
+        for name, successor in zip(gens[:-self.keep], gens[1:]):
+            if name in (live, self._generation) or self._draft_active(name, now):
+                continue
+            try:
+                if now - os.path.getmtime(os.path.join(self.root, successor)) < self.gc_grace:
+                    continue
+            except OSError:
+                pass
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+            removed.append(name)
+        return removed
+
+    def _draft_active(self, name: str, now: float) -> bool:
+        path = os.path.join(self.root, name)
+        if not os.path.isfile(os.path.join(path, DRAFT_FILE)):
+            return False
+        # meta.json is rewritten by every append
+        touched = max((os.path.getmtime(os.path.join(path, f))
+                       for f in (DRAFT_FILE, "meta.json") if os.path.isfile(os.path.join(path, f))), default=0.0)
+        return now - touched < self.draft_ttl
+
+    @staticmethod
+    def _new_name() -> str:
+        # names sort by creation time (gc keeps the newest)
+        return f"{GEN_PREFIX}{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:6]}"
+
+    def _fork(self, src: str, dst: str):
+        """Copy generation `src` into a new directory `dst` without touching `src`."""
+        os.makedirs(dst)
+        for fname in os.listdir(src):
+            path = os.path.join(src, fname)
+            if fname.startswith((CURRENT_FILE, LOCK_FILE, DRAFT_FILE)) or ".tmp" in fname or not os.path.isfile(path):
+                continue
+            target = os.path.join(dst, fname)
+            if fname in IN_PLACE_FILES:
+                shutil.copyfile(path, target)
+                continue
+            try:
+                os.link(path, target)
+            except OSError:  # no hard links on this filesystem
+                shutil.copyfile(path, target)
+
+    @contextmanager
+    def writing(self):
+        """`write_lock` plus the cross-process lock held while a generation is published."""
+        with self.write_lock, self._file_lock:
+            yield
+
+    # -------- serving --------
+    def store(self) -> Optional[VectorStore]:
+        """The live VectorStore (None until a generation exists); never waits on a build."""
+        now = time.monotonic()
+        if self._store is not None and now - self._last_check < self.reload_interval:
+            return self._store
+        self._last_check = now
+
+        name = self._read_current()
+        if name is None or name == self._generation:
+            return self._store
+        if self._store is None:
+            # first load in this process: nothing to serve meanwhile
+            with self.write_lock, self._lock:
+                if self._store is None:
+                    self._swap(name, self.factory(os.path.join(self.root, name)))
+            return self._store
+        # published by another process: load it off the request path
+        with self._lock:
+            if self._loading != name:
+                self._loading = name
+                self._load_executor.submit(self._load, name)
+        return self._store
+
+    def _load(self, name: str):
+        try:
+            vs = self.factory(os.path.join(self.root, name))
+            if vs.n:
+                with self.write_lock:
+                    self._swap(name, vs)
+        finally:
+            self._loading = None
+
+    def current(self) -> Optional[VectorStore]:
+        """The store being served right now, without checking for a newer generation."""
+        return self._store
+
+    def _swap(self, name: str, vs: VectorStore):
+        if self.before_swap is not None:
+            self.before_swap(vs)
+        self._store, self._generation = vs, name
+        if self.on_swap is not None:
+            self.on_swap(vs)
+
+    # -------- rebuilds --------
+    @property
+    def building(self) -> bool:
+        return self._build is not None and not self._build.done()
+
+    def rebuild(self, build: Callable[[VectorStore], None],
+                finalize: Optional[Callable[[VectorStore], None]] = None) -> Future:
+        """
+        Build a new generation in the background (no-op if one is running).
+        `build(vs)` fills the fresh store; `finalize(vs)` then runs under
+        `writing()` right before CURRENT is switched (e.g. to index rows
+        that arrived during the build).
+        """
+        with self._lock:
+            if self.building:
+                return self._build
+            self._build = self._build_executor.submit(self._run_build, build, finalize)
+            return self._build
+
+    def _run_build(self, build, finalize):
+        name = self._new_name()
+        self._last_build = {"generation": name, "state": "running", "started": time.time(),
+                            "finished": None, "error": None}
+        try:
+            vs = self.factory(os.path.join(self.root, name))
+            build(vs)
+            with self.writing():
+                if finalize is not None:
+                    finalize(vs)
+                self._publish(name)
+                self._swap(name, vs)
+            self._last_build["state"] = "done"
+            self.gc()
+        except Exception as e:
+            self._last_build.update(state="failed", error=str(e))
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+            raise
+        finally:
+            self._last_build["finished"] = time.time()
+
+    # -------- appends --------
+    def fork(self) -> Optional[IndexFork]:
+        """
+        Private copy of the published generation (which may be newer than
+        the one this process serves), opened with `fork_factory`; append to
+        `fork.vs` freely, then publish() or discard() it. None if nothing is
+        published yet.
+        """
+        with self.writing():
+            base = self._read_current()
+            if base is None:
+                return None
+            name = self._new_name()
+            path = os.path.join(self.root, name)
+            try:
+                self._fork(os.path.join(self.root, base), path)
+                open(os.path.join(path, DRAFT_FILE), "w").close()
+                vs = self.fork_factory(path)
+            except Exception:
+                shutil.rmtree(path, ignore_errors=True)
+                raise
+        return IndexFork(name, base, vs)
+
+    def publish(self, fork: IndexFork, finalize: Optional[Callable[[VectorStore], bool]] = None) -> bool:
+        """
+        Make `fork` the live generation, under `writing()`. `finalize(vs)`
+        runs first (e.g. to append rows other writers published meanwhile);
+        if it returns False the fork is discarded instead. True if published.
+        """
+        with self.writing():
+            try:
+                ok = finalize is None or finalize(fork.vs)
+                if ok:
+                    os.remove(os.path.join(self.root, fork.name, DRAFT_FILE))
+                    self._publish(fork.name)
+                    self._swap(fork.name, fork.vs)
+            except Exception:
+                self.discard(fork)
+                raise
+            if not ok:
+                self.discard(fork)
+        self.gc()
+        return ok
+
+    def discard(self, fork: IndexFork):
+        shutil.rmtree(os.path.join(self.root, fork.name), ignore_errors=True)
+
+    def extend(self, apply: Callable[[VectorStore], bool]) -> Optional[VectorStore]:
+        """
+        One-shot fork + publish: run `apply(vs)` on a fork and publish it if
+        `apply` returns True; otherwise the fork is dropped and the published
+        generation is swapped in. Returns the live store (None if nothing is
+        published yet).
+        """
+        with self.writing():
+            fork = self.fork()
+            if fork is None:
+                return None
+            if not self.publish(fork, apply) and fork.base != self._generation:
+                self._swap(fork.base, self.factory(os.path.join(self.root, fork.base)))
+        return self._store
+
+    def status(self) -> dict:
+        vs = self._store
+        return {
+            "generation": self._generation,
+            "rows": vs.n if vs is not None else 0,
+            "building": self.building,
+            "last_build": dict(self._last_build) or None,
+            "generations": self.generations(),
+        }
+
+
+class IndexFork:
+    """An unpublished generation forked from `base` (see IndexManager.fork)."""
+    def __init__(self, name: str, base: str, vs: VectorStore):
+        self.name = name
+        self.base = base
+        self.vs = vs
@@ -0,0 +1,214 @@
+# app/services/ingest.py
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, Optional, Tuple
+
+import pandas as pd
+
+ID_COL = "uniq_id"
+
+
+class UploadStore:
+    """
+    Append-only JSONL log of uploaded catalog rows (one raw row per line).
+
+    The base CSV is never rewritten; on boot the API replays this log after
+    loading the catalog, so uploaded rows survive restarts and stay aligned
+    with the persisted vector index (rows are logged before they are indexed).
+    Several processes may share the log: `tail()` returns the rows appended
+    since this store last read it.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.offset = 0  # end of the last complete line read by frames()
+        self._lock = threading.Lock()
+
+    def frames(self, chunk_rows: int = 5000, start: int = 0) -> Iterator[pd.DataFrame]:
+        """
+        Logged rows from byte `start` in file order, `chunk_rows` at a time;
+        torn lines are skipped, and a last line without its newline (still
+        being written) is left for the next read.
+        """
+        if not os.path.isfile(self.path):
+            return
+        batch = []
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            pos = start
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                pos += len(line)
+                try:
+                    batch.append(json.loads(line))
+                except ValueError:
+                    continue
+                if len(batch) >= chunk_rows:
+                    self.offset = pos
+                    yield pd.DataFrame.from_records(batch)
+                    batch = []
+        self.offset = pos
+        if batch:
+            yield pd.DataFrame.from_records(batch)
+
+    def tail(self, chunk_rows: int = 5000) -> Iterator[pd.DataFrame]:
+        """Rows logged since the previous frames() / tail() read."""
+        return self.frames(chunk_rows, start=self.offset)
+
+    def append(self, rows: pd.DataFrame):
+        if rows.empty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        data = rows.to_json(orient="records", lines=True, force_ascii=False)
+        if not data.endswith("\n"):
+            data += "\n"
+        with self._lock:
+            with open(self.path, "a+b") as f:
+                # start on a fresh line if a previous writer died mid-line
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        data = "\n" + data
+                f.write(data.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def read_chunks(path: str, chunk_rows: int) -> Iterator[Tuple[pd.DataFrame, int]]:
+    """(chunk, bytes consumed so far) for a CSV file, never holding more than one chunk."""
+    with open(path, "rb") as f:
+        for chunk in pd.read_csv(f, chunksize=chunk_rows):
+            yield chunk, f.tell()
+
+
+def clean_chunk(chunk: pd.DataFrame, is_known: Callable[[str], bool]) -> Tuple[pd.DataFrame, int, int]:
+    """
+    Drop rows without a uniq_id and rows whose uniq_id was already ingested
+    (earlier in this chunk or already in the catalog).
+    Returns (rows, n_invalid, n_duplicates).
+    """
+    ids = chunk[ID_COL].map(lambda v: "" if pd.isna(v) else str(v).strip())
+    valid = ids != ""
+    chunk, ids = chunk[valid], ids[valid]
+    fresh = ~ids.duplicated() & ~ids.map(is_known)
+    rows = chunk[fresh].copy()
+    rows[ID_COL] = ids[fresh]
+    return rows.reset_index(drop=True), int((~valid).sum()), int((~fresh).sum())
+
+
+class IngestJob:
+    """Progress of one upload; `status()` is what the API reports."""
+    def __init__(self, path: str, filename: str = ""):
+        self.id = uuid.uuid4().hex[:12]
+        self.path = path
+        self.filename = filename
+        self.state = "queued"  # queued | running | done | failed
+        self.bytes_total = os.path.getsize(path)
+        self.bytes_read = 0
+        self.chunks = 0
+        self.rows_read = 0
+        self.rows_added = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.rows = None  # catalog size when finished
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.done = threading.Event()
+
+    def status(self) -> dict:
+        end = self.finished or time.time()
+        elapsed = (end - self.started) if self.started else 0.0
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "state": self.state,
+            "progress": (self.bytes_read / self.bytes_total) if self.bytes_total else 1.0,
+            "chunks": self.chunks,
+            "rows_read": self.rows_read,
+            "rows_added": self.rows_added,
+            "invalid": self.invalid,
+            "duplicates": self.duplicates,
+            "rows": self.rows,
+            "rows_per_s": (self.rows_read / elapsed) if elapsed > 0 else None,
+            "error": self.error,
+        }
+
+
+class IngestQueue:
+    """
+    Runs uploads one at a time on a dedicated thread.
+
+    Each CSV is read `chunk_rows` rows at a time; every chunk is validated,
+    de-duplicated on uniq_id and handed to `apply_chunk` (normalize, embed,
+    append; returns how many rows it added, if it drops more duplicates)
+    before the next one is read, so memory stays bounded by the chunk
+    size and searches keep running between chunks. `finish` runs once after
+    the last chunk (also after a failed one, so the chunks applied so far
+    are completed) and returns the catalog size. The spooled file is
+    removed when the job ends; the last `keep` jobs stay queryable.
+    """
+    def __init__(self, apply_chunk: Callable[[pd.DataFrame], Optional[int]], is_known: Callable[[str], bool],
+                 finish: Optional[Callable[[], int]] = None, chunk_rows: int = 2000, keep: int = 50):
+        self.apply_chunk = apply_chunk
+        self.is_known = is_known
+        self.finish = finish
+        self.chunk_rows = max(1, int(chunk_rows))
+        self.keep = keep
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest")
+
+    def submit(self, path: str, filename: str = "") -> IngestJob:
+        job = IngestJob(path, filename)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.keep:
+                old_id, old = next(iter(self._jobs.items()))
+                if not old.done.is_set():
+                    break
+                self._jobs.pop(old_id)
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: IngestJob):
+        job.state, job.started = "running", time.time()
+        error = None
+        try:
+            for chunk, pos in read_chunks(job.path, self.chunk_rows):
+                rows, invalid, dupes = clean_chunk(chunk, self.is_known)
+                added = self.apply_chunk(rows) if len(rows) else 0
+                added = len(rows) if added is None else added
+                job.chunks += 1
+                job.rows_read += len(chunk)
+                job.rows_added += added
+                job.invalid += invalid
+                job.duplicates += dupes + len(rows) - added
+                job.bytes_read = pos
+            job.bytes_read = job.bytes_total
+        except Exception as e:
+            error = str(e)
+        try:
+            if self.finish is not None:
+                job.rows = self.finish()
+        except Exception as e:
+            error = error or str(e)
+        finally:
+            job.state, job.error = ("failed", error) if error is not None else ("done", None)
+            job.finished = time.time()
+            try:
+                os.remove(job.path)
+            except OSError:
+                pass
+            job.done.set()
@@ -2,18 +2,129 @@
 
 from __future__ import annotations
 
-from typing import List, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+import hashlib
+import json
 import os
+import threading
+import time
 import pandas as pd
 
-# Use community package (works with langchain 0.2.x)
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS as LCFAISS
-from langchain_community.vectorstores import Pinecone as LCPinecone
-from langchain.docstore.document import Document
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 
-# Pinecone client is optional (only used if USE_PINECONE=True)
-from pinecone import Pinecone, ServerlessSpec
+# langchain_community (works with langchain 0.2.x) and the Pinecone client are
+# imported where they are used: they are slow to import and Pinecone is optional
+
+
+class TextEmbedderLC(Embeddings):
+    """
+    LangChain Embeddings adapter over our TextEmbedder, so LC indexes reuse
+    its on-disk embedding cache instead of re-encoding every row.
+    """
+
+    def __init__(self, embedder) -> None:
+        self.embedder = embedder
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embedder.encode(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embedder.encode([text])[0].tolist()
+
+
+def row_texts(df: pd.DataFrame, text_cols: List[str]) -> List[str]:
+    # column-wise concat: much faster than a row-wise agg on large frames
+    out = df[text_cols[0]].fillna("").astype(str)
+    for c in text_cols[1:]:
+        out = out + ". " + df[c].fillna("").astype(str)
+    return out.tolist()
+
+
+def content_hash(text: str) -> str:
+    # synced records hold only the text and uniq_id, so the text alone decides re-upserting
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:20]
+
+
+class SyncState:
+    """
+    uniq_id -> content hash of every record the index has confirmed, as an
+    append-only JSONL log ({"id", "hash"} or {"id", "deleted": true}; the last
+    line per id wins, a torn last line is ignored). Batches are recorded as
+    they are acknowledged, so an interrupted sync resumes by sending only what
+    was not confirmed.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.hashes: Dict[str, str] = {}
+        self._lines = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except Exception:
+                    continue
+                self._lines += 1
+                if rec.get("deleted"):
+                    self.hashes.pop(str(rec["id"]), None)
+                else:
+                    self.hashes[str(rec["id"])] = str(rec["hash"])
+
+    def record(self, upserted: Iterable[Tuple[str, str]] = (), deleted: Iterable[str] = ()):
+        upserted, deleted = list(upserted), list(deleted)
+        lines = [json.dumps({"id": u, "hash": h}) for u, h in upserted]
+        lines += [json.dumps({"id": u, "deleted": True}) for u in deleted]
+        if not lines:
+            return
+        with self._lock:
+            with open(self.path, "a+b") as f:
+                data = "\n".join(lines) + "\n"
+                # start on a fresh line if a previous writer died mid-line
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        data = "\n" + data
+                f.write(data.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            self.hashes.update(upserted)
+            for u in deleted:
+                self.hashes.pop(u, None)
+            self._lines += len(lines)
+
+    def compact(self):
+        """Rewrite the log as one line per live id once superseded lines dominate it."""
+        with self._lock:
+            if self._lines <= 2 * len(self.hashes) + 1000:
+                return
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for u, h in self.hashes.items():
+                    f.write(json.dumps({"id": u, "hash": h}) + "\n")
+            os.replace(tmp, self.path)
+            self._lines = len(self.hashes)
+
+    def reset(self):
+        with self._lock:
+            self.hashes, self._lines = {}, 0
+            if os.path.isfile(self.path):
+                os.remove(self.path)
+
+
+def _chunks(seq: list, size: int):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
 
 
 class LCRetriever:
@@ -22,7 +133,10 @@ class LCRetriever:
     depending on flags passed from settings.
 
     - build(df, text_cols): builds/refreshes the index from a DataFrame
-    - search(query, top_k): returns list of (row_index, score) pairs
+    - sync(df, text_cols): incremental bulk sync, keyed by uniq_id (see sync)
+    - search(query, top_k, catalog): returns list of (row_index, score) pairs
+    Use either build() or sync() on a given index: build() writes records
+    under random ids and clears the sync state.
     """
 
     def __init__(
@@ -34,6 +148,7 @@ class LCRetriever:
         pinecone_cloud: str | None,
         pinecone_region: str | None,
         emb_model: str,
+        embedder=None,
     ) -> None:
         self.index_dir = index_dir
         os.makedirs(index_dir, exist_ok=True)
@@ -44,8 +159,13 @@ class LCRetriever:
         self.pinecone_cloud = pinecone_cloud
         self.pinecone_region = pinecone_region
 
-        # HF sentence encoder used by both FAISS and Pinecone paths
-        self.embeddings = HuggingFaceEmbeddings(model_name=emb_model)
+        # HF sentence encoder used by both FAISS and Pinecone paths;
+        # pass a (cached) TextEmbedder to share its embedding cache
+        if embedder is not None:
+            self.embeddings = TextEmbedderLC(embedder)
+        else:
+            from langchain_community.embeddings import HuggingFaceEmbeddings
+            self.embeddings = HuggingFaceEmbeddings(model_name=emb_model)
 
         self.db = None  # LangChain VectorStore instance
 
@@ -57,32 +177,20 @@ class LCRetriever:
         Build (or rebuild) the vector store from a dataframe.
         text_cols are concatenated into one text string per row.
         """
-        texts = (df[text_cols].fillna("").agg(". ".join, axis=1)).tolist()
+        texts = row_texts(df, text_cols)
         docs = [Document(page_content=t, metadata={"row_id": i}) for i, t in enumerate(texts)]
+        self.sync_state().reset()  # ids written below are not uniq_ids
 
         if self.use_pinecone:
-            if not self.pinecone_api_key or not self.pinecone_index:
-                raise RuntimeError("Pinecone selected but API key or index name not provided.")
-
-            pc = Pinecone(api_key=self.pinecone_api_key)
-
-            # Create index if it doesn't exist
-            existing = [i.name for i in pc.list_indexes()]
-            if self.pinecone_index not in existing:
-                dim = len(self.embeddings.embed_query("dimension probe"))
-                pc.create_index(
-                    name=self.pinecone_index,
-                    dimension=dim,
-                    metric="cosine",
-                    spec=ServerlessSpec(cloud=self.pinecone_cloud or "aws",
-                                        region=self.pinecone_region or "us-east-1"),
-                )
+            from langchain_community.vectorstores import Pinecone as LCPinecone
+            self._pinecone_client(create=True)
 
             # Build LC vectorstore over Pinecone
             self.db = LCPinecone.from_documents(
                 docs, self.embeddings, index_name=self.pinecone_index
             )
         else:
+            from langchain_community.vectorstores import FAISS as LCFAISS
             # Local FAISS vectorstore
             self.db = LCFAISS.from_documents(docs, self.embeddings)
             # Persist for later loads
@@ -96,28 +204,209 @@ class LCRetriever:
             return
 
         if self.use_pinecone:
-            if not self.pinecone_api_key or not self.pinecone_index:
-                raise RuntimeError("Pinecone selected but API key or index name not provided.")
+            from langchain_community.vectorstores import Pinecone as LCPinecone
 
-            pc = Pinecone(api_key=self.pinecone_api_key)
-            index = pc.Index(self.pinecone_index)
+            index = self._pinecone_client().Index(self.pinecone_index)
             # For Pinecone, LangChain wraps an existing index
             self.db = LCPinecone(index, self.embeddings, text_key="text")
         else:
+            from langchain_community.vectorstores import FAISS as LCFAISS
             # allow_dangerous_deserialization is required for FAISS load in LC 0.2.x
             self.db = LCFAISS.load_local(
                 self.index_dir, self.embeddings, allow_dangerous_deserialization=True
             )
 
+    def _pinecone_client(self, create: bool = False):
+        if not self.pinecone_api_key or not self.pinecone_index:
+            raise RuntimeError("Pinecone selected but API key or index name not provided.")
+        from pinecone import Pinecone, ServerlessSpec
+
+        pc = Pinecone(api_key=self.pinecone_api_key)
+        # Create index if it doesn't exist
+        if create and self.pinecone_index not in [i.name for i in pc.list_indexes()]:
+            dim = len(self.embeddings.embed_query("dimension probe"))
+            pc.create_index(
+                name=self.pinecone_index,
+                dimension=dim,
+                metric="cosine",
+                spec=ServerlessSpec(cloud=self.pinecone_cloud or "aws",
+                                    region=self.pinecone_region or "us-east-1"),
+            )
+        return pc
+
     # -----------------------------
-    # Search
+    # Incremental sync
     # -----------------------------
-    def search(self, query: str, top_k: int = 5) -> List[Tuple[int, float]]:
+    def sync_state(self, remote: Optional[bool] = None) -> SyncState:
+        remote = self.use_pinecone if remote is None else remote
+        target = f"pinecone-{self.pinecone_index or 'default'}" if remote else "faiss"
+        return SyncState(os.path.join(self.index_dir, f"sync-{target}.jsonl"))
+
+    def diff(self, df: pd.DataFrame, text_cols: List[str], state: Optional[SyncState] = None):
+        """
+        Compare `df` with what the index last confirmed.
+        Returns (upserts, deletes, unchanged): upserts are (uniq_id, text,
+        hash) for new or changed rows, deletes the synced ids no longer in
+        `df`. The first row wins for a repeated uniq_id. Only the text is
+        hashed, so rows that merely moved are unchanged; search() maps hits
+        back to row positions through the catalog.
+        """
+        state = state if state is not None else self.sync_state()
+        texts = row_texts(df, text_cols)
+        uids = (df["uniq_id"].fillna("").astype(str).tolist() if "uniq_id" in df.columns
+                else [""] * len(df))
+        upserts, seen, unchanged = [], set(), 0
+        for row_id, (uid, text) in enumerate(zip(uids, texts)):
+            uid = uid or f"row-{row_id}"
+            if uid in seen:
+                continue
+            seen.add(uid)
+            h = content_hash(text)
+            if state.hashes.get(uid) == h:
+                unchanged += 1
+            else:
+                upserts.append((uid, text, h))
+        deletes = [uid for uid in state.hashes if uid not in seen]
+        return upserts, deletes, unchanged
+
+    def sync(self, df: pd.DataFrame, text_cols: List[str], batch_size: int = 256, upsert_batch: int = 100,
+             workers: int = 4, delete_missing: bool = True, index=None) -> dict:
+        """
+        Bring the index in line with `df`, sending only new / changed rows.
+        - rows are embedded `batch_size` at a time and upserted in requests of
+          `upsert_batch` records (Pinecone's recommended size), up to `workers`
+          requests in flight on a client with a connection pool of that size,
+          while the next batch is being embedded
+        - record ids are uniq_ids; ids synced before but missing from `df`
+          are deleted unless `delete_missing` is False
+        - `index`: any object with pinecone.Index's upsert / delete (e.g. a
+          local stand-in); default: the configured Pinecone index, or FAISS
+        Returns counts of upserted / deleted / unchanged rows.
+        """
+        t0 = time.perf_counter()
+        local = index is None and not self.use_pinecone
+        state = self.sync_state(remote=not local)
+        db = self._load_faiss(state) if local else None
+        upserts, deletes, unchanged = self.diff(df, text_cols, state)
+        if not delete_missing:
+            deletes = []
+        if local:
+            self._sync_faiss(db, upserts, deletes, state, batch_size)
+        else:
+            if index is None:
+                index = self._pinecone_client(create=True).Index(self.pinecone_index, pool_threads=workers)
+            self._sync_remote(index, upserts, deletes, state, batch_size, upsert_batch, workers)
+        state.compact()
+        return {"upserted": len(upserts), "deleted": len(deletes), "unchanged": unchanged,
+                "seconds": time.perf_counter() - t0}
+
+    def _sync_remote(self, index, upserts: list, deletes: list, state: SyncState, batch_size: int,
+                     upsert_batch: int, workers: int):
+        workers = max(1, int(workers))
+        inflight: deque = deque()  # (future, upserted (uniq_id, hash) pairs, deleted ids)
+        errors: List[BaseException] = []
+
+        def settle(n_left: int):
+            # oldest first; each acknowledged request is recorded before the next is awaited
+            while len(inflight) > n_left:
+                fut, upserted, deleted = inflight.popleft()
+                try:
+                    fut.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                state.record(upserted=upserted, deleted=deleted)
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lc-sync") as pool:
+            for batch in _chunks(upserts, max(1, int(batch_size))):
+                if errors:
+                    break
+                vectors = self.embeddings.embed_documents([text for _, text, _ in batch])
+                records = [{"id": uid, "values": vec, "metadata": {"text": text, "uniq_id": uid}}
+                           for (uid, text, _), vec in zip(batch, vectors)]
+                for part, recs in zip(_chunks(batch, upsert_batch), _chunks(records, upsert_batch)):
+                    settle(workers - 1)
+                    inflight.append((pool.submit(index.upsert, vectors=recs), [(u, h) for u, _, h in part], []))
+            for part in _chunks(deletes, 1000):  # Pinecone's per-request delete limit
+                if errors:
+                    break
+                settle(workers - 1)
+                inflight.append((pool.submit(index.delete, ids=part), [], part))
+            settle(0)
+        if errors:
+            raise errors[0]
+
+    def _load_faiss(self, state: SyncState):
+        """
+        The saved FAISS index with `state` reconciled to its docstore (None,
+        and a reset state, if there is no usable index). After a crash between
+        saving the index and recording the state, ids the docstore lacks are
+        forgotten and ids the state lacks are dropped, so both are re-sent.
+        """
+        from langchain_community.vectorstores import FAISS as LCFAISS
+
+        try:
+            db = LCFAISS.load_local(self.index_dir, self.embeddings, allow_dangerous_deserialization=True)
+        except Exception:
+            db = None
+        if db is None or db.index.ntotal != len(db.index_to_docstore_id):  # missing or torn
+            state.reset()
+            return None
+        ids = set(db.index_to_docstore_id.values())
+        lost = [uid for uid in state.hashes if uid not in ids]
+        if lost:
+            state.record(deleted=lost)
+        unrecorded = [uid for uid in ids if uid not in state.hashes]
+        if unrecorded:
+            db.delete(unrecorded)
+            self._save_faiss(db)
+        return db
+
+    def _save_faiss(self, db):
+        # save next to the index, then swap the files in (a crash never leaves a half-written file)
+        tmp_dir = os.path.join(self.index_dir, ".faiss-tmp")
+        db.save_local(tmp_dir)
+        for name in ("index.pkl", "index.faiss"):
+            os.replace(os.path.join(tmp_dir, name), os.path.join(self.index_dir, name))
+
+    def _sync_faiss(self, db, upserts: list, deletes: list, state: SyncState, batch_size: int):
+        # local index: nothing to parallelize, but only new / changed rows are embedded
+        if not upserts and not deletes:
+            return
+        from langchain_community.vectorstores import FAISS as LCFAISS
+
+        if db is not None:
+            stale = [uid for uid, _, _ in upserts if uid in state.hashes] + deletes
+            if stale:
+                db.delete(stale)
+        for batch in _chunks(upserts, max(1, int(batch_size))):
+            texts = [text for _, text, _ in batch]
+            pairs = list(zip(texts, self.embeddings.embed_documents(texts)))
+            metadatas = [{"uniq_id": uid} for uid, _, _ in batch]
+            ids = [uid for uid, _, _ in batch]
+            if db is None:
+                db = LCFAISS.from_embeddings(pairs, self.embeddings, metadatas=metadatas, ids=ids)
+            else:
+                db.add_embeddings(pairs, metadatas=metadatas, ids=ids)
+        self._save_faiss(db)
+        state.record(upserted=[(uid, h) for uid, _, h in upserts], deleted=deletes)
+        self.db = db
+
+    def search(self, query: str, top_k: int = 5, catalog=None) -> List[Tuple[int, float]]:
         """
         Perform similarity search and return a list of (row_id, score) tuples.
         Lower score is better (cosine distance).
+        Records written by sync() carry their uniq_id, not a row position:
+        pass the Catalog to map them to rows (ids it no longer has are dropped).
         """
         self.load()
         results = self.db.similarity_search_with_score(query, k=top_k)
-        # Extract dataframe row indices stored in metadata
-        return [(int(doc.metadata["row_id"]), float(score)) for doc, score in results]
+        uids = [doc.metadata.get("uniq_id") for doc, _ in results]
+        rows = catalog.rows_for(uids) if catalog is not None else [None] * len(results)
+        out = []
+        for (doc, score), row in zip(results, rows):
+            if row is None:
+                row = doc.metadata.get("row_id")  # build() stores row indices
+            if row is not None:
+                out.append((int(row), float(score)))
+        return out
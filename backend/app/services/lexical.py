@@ -0,0 +1,185 @@
+# app/services/lexical.py
+from __future__ import annotations
+import glob
+import json
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, accent-folded alphanumeric tokens ("IKEA Poäng" -> ["ikea", "poang"])."""
+    if not isinstance(text, str):
+        return []
+    folded = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(ch for ch in folded if not unicodedata.combining(ch))
+    return _TOKEN_RE.findall(folded)
+
+
+def rrf_fuse(rankings: Sequence[Sequence[int]], top_k: int, rrf_k: int = 60) -> List[Tuple[int, float]]:
+    """Reciprocal rank fusion: sum of 1 / (rrf_k + rank) over the ranked id lists."""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, idx in enumerate(ranking):
+            scores[idx] = scores.get(idx, 0.0) + 1.0 / (rrf_k + rank + 1)
+    best = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))[:top_k]
+    return [(int(i), float(s)) for i, s in best]
+
+
+class _Segment:
+    """Postings for a contiguous block of rows, grouped by term id (CSR layout)."""
+    def __init__(self, term_ids: np.ndarray, indptr: np.ndarray, doc_ids: np.ndarray, tfs: np.ndarray):
+        self.term_ids = term_ids  # sorted unique term ids present in the segment
+        self.indptr = indptr      # postings of term_ids[i] are [indptr[i], indptr[i+1])
+        self.doc_ids = doc_ids    # global row ids
+        self.tfs = tfs
+
+    def postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        i = int(np.searchsorted(self.term_ids, term_id))
+        if i == len(self.term_ids) or self.term_ids[i] != term_id:
+            return self.doc_ids[:0], self.tfs[:0]
+        s, e = self.indptr[i], self.indptr[i + 1]
+        return self.doc_ids[s:e], self.tfs[s:e]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over row texts (row i <-> vector i).
+
+    Postings are stored as append-only segments: build() writes one, every
+    add() writes another (bm25_seg_00000.npz, ...), plus the shared vocabulary
+    and per-row lengths. Term statistics (df, N) are derived at query time,
+    so appending never rewrites earlier segments; avgdl is kept up to date
+    by load() and add().
+    """
+    def __init__(self, index_dir: str, k1: float = 1.2, b: float = 0.75):
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+        self.vocab: Dict[str, int] = {}
+        self.doc_len = np.empty(0, dtype="float32")
+        self.avgdl = 1.0
+        self._segments: List[_Segment] = []
+
+    # -------- persistence --------
+    @property
+    def vocab_path(self) -> str:
+        return os.path.join(self.index_dir, "bm25_vocab.json")
+
+    @property
+    def len_path(self) -> str:
+        return os.path.join(self.index_dir, "bm25_len.npy")
+
+    def _segment_path(self, i: int) -> str:
+        return os.path.join(self.index_dir, f"bm25_seg_{i:05d}.npz")
+
+    @classmethod
+    def load(cls, index_dir: str, **kw) -> Optional["BM25Index"]:
+        idx = cls(index_dir, **kw)
+        seg_paths = sorted(glob.glob(os.path.join(index_dir, "bm25_seg_*.npz")))
+        if not (seg_paths and os.path.isfile(idx.vocab_path) and os.path.isfile(idx.len_path)):
+            return None
+        with open(idx.vocab_path, "r", encoding="utf-8") as f:
+            idx.vocab = {t: i for i, t in enumerate(json.load(f))}
+        idx.doc_len = np.load(idx.len_path)
+        idx._update_avgdl()
+        for p in seg_paths:
+            with np.load(p) as z:
+                idx._segments.append(_Segment(z["term_ids"], z["indptr"], z["doc_ids"], z["tfs"]))
+        # a crash between writing a segment and its lengths leaves rows we cannot score
+        if idx._segments and int(idx._segments[-1].doc_ids.max(initial=-1)) >= len(idx.doc_len):
+            return None
+        return idx
+
+    def _save(self, seg: _Segment):
+        # written under a temp name first: a torn segment would fail np.load and lose the whole index
+        path = self._segment_path(len(self._segments) - 1)
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, term_ids=seg.term_ids, indptr=seg.indptr, doc_ids=seg.doc_ids, tfs=seg.tfs)
+        os.replace(path + ".tmp", path)
+        with open(self.vocab_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(sorted(self.vocab, key=self.vocab.get), f)
+        os.replace(self.vocab_path + ".tmp", self.vocab_path)
+        np.save(self.len_path + ".tmp.npy", self.doc_len)
+        os.replace(self.len_path + ".tmp.npy", self.len_path)
+
+    # -------- indexing --------
+    @property
+    def n(self) -> int:
+        return int(len(self.doc_len))
+
+    def _update_avgdl(self):
+        # per add() / load(), not per query: mean() is O(n) over every row
+        self.avgdl = (float(self.doc_len.mean(dtype="float64")) if self.n else 0.0) or 1.0
+
+    def add(self, texts: Sequence[str]) -> int:
+        """Index `texts` as rows n, n+1, ... and persist them as a new segment."""
+        start = self.n
+        terms, docs, tfs, lens = [], [], [], []
+        for j, text in enumerate(texts):
+            toks = tokenize(text)
+            lens.append(len(toks))
+            for tok, tf in Counter(toks).items():
+                tid = self.vocab.setdefault(tok, len(self.vocab))
+                terms.append(tid)
+                docs.append(start + j)
+                tfs.append(tf)
+        terms = np.asarray(terms, dtype="int32")
+        order = np.argsort(terms, kind="stable")
+        terms = terms[order]
+        term_ids, counts = np.unique(terms, return_counts=True)
+        indptr = np.zeros(len(term_ids) + 1, dtype="int64")
+        np.cumsum(counts, out=indptr[1:])
+        seg = _Segment(term_ids.astype("int32"), indptr,
+                       np.asarray(docs, dtype="int32")[order], np.asarray(tfs, dtype="float32")[order])
+
+        self.doc_len = np.concatenate([self.doc_len, np.asarray(lens, dtype="float32")])
+        self._update_avgdl()
+        self._segments.append(seg)
+        os.makedirs(self.index_dir, exist_ok=True)
+        self._save(seg)
+        return self.n
+
+    # -------- search --------
+    def scores(self, query: str, mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(row ids, BM25 scores) of rows matching at least one query term."""
+        n = self.n
+        tids = sorted({self.vocab[t] for t in tokenize(query) if t in self.vocab})
+        if not tids or n == 0:
+            return np.empty(0, dtype="int64"), np.empty(0, dtype="float32")
+        avgdl = self.avgdl
+
+        all_docs, all_w = [], []
+        for tid in tids:
+            parts = [seg.postings(tid) for seg in self._segments]
+            docs = np.concatenate([p[0] for p in parts])
+            tf = np.concatenate([p[1] for p in parts])
+            df = len(docs)
+            idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            norm = tf + self.k1 * (1.0 - self.b + self.b * self.doc_len[docs] / avgdl)
+            all_docs.append(docs)
+            all_w.append(idf * tf * (self.k1 + 1.0) / norm)
+
+        docs = np.concatenate(all_docs).astype("int64")
+        w = np.concatenate(all_w)
+        if mask is not None:
+            ok = docs < len(mask)
+            ok[ok] = mask[docs[ok]]
+            docs, w = docs[ok], w[ok]
+        ids, inv = np.unique(docs, return_inverse=True)
+        return ids, np.bincount(inv, weights=w).astype("float32")
+
+    def search(self, query: str, top_k: int, mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        ids, sc = self.scores(query, mask=mask)
+        if ids.size == 0:
+            return []
+        k = min(top_k, ids.size)
+        top = np.argpartition(-sc, k - 1)[:k]
+        top = top[np.lexsort((ids[top], -sc[top]))]
+        return [(int(ids[i]), float(sc[i])) for i in top]
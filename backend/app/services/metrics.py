@@ -0,0 +1,184 @@
+# app/services/metrics.py
+from __future__ import annotations
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# seconds; covers cache hits (sub-ms) up to cold model loads / index builds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 120.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(key: LabelKey, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, value: float, **labels):
+        # counters: mirror a monotonic total tracked elsewhere (e.g. TTLCache.hits)
+        with self._lock:
+            self._values[_label_key(labels)] = float(value)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [f"{self.name}{_fmt_labels(k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram (Prometheus semantics), one series per label set."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, list] = {}  # key -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            s[i] += 1
+            s[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(s)) for k, s in self._series.items())
+        lines = self._header()
+        for key, s in items:
+            cum = 0
+            for le, c in zip(self.buckets + (float("inf"),), s[:-1]):
+                cum += c
+                lines.append(f"{self.name}_bucket{_fmt_labels(key, [('le', _fmt_value(le))])} {cum}")
+            lines.append(f"{self.name}_sum{_fmt_labels(key)} {_fmt_value(s[-1])}")
+            lines.append(f"{self.name}_count{_fmt_labels(key)} {cum}")
+        return lines
+
+
+class Registry:
+    """
+    In-process metrics, rendered in the Prometheus text exposition format.
+    `collectors` are called at scrape time for values that are cheaper to
+    read than to track (cache stats, index sizes, ...).
+    """
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, **kw):
+        with self._lock:
+            m = self._metrics.get(name)
+            if m is None:
+                m = self._metrics[name] = cls(name, help, **kw)
+            return m
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._get(Counter, name, help)
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        return self._get(Gauge, name, help)
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def add_collector(self, fn: Callable[[], None]):
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        for fn in self._collectors:
+            try:
+                fn()
+            except Exception:
+                pass  # a broken collector must not take /metrics down
+        with self._lock:
+            metrics = [self._metrics[k] for k in sorted(self._metrics)]
+        return "\n".join(line for m in metrics for line in m.render()) + "\n"
+
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram("recommender_stage_seconds", "Time spent per pipeline stage.")
+
+# per-request (stage, seconds) list while Server-Timing is collected; None otherwise
+_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar("timings", default=None)
+
+
+@contextmanager
+def timed(stage: str):
+    """Observe the block's wall time in STAGE_SECONDS and the current request's timings."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        STAGE_SECONDS.observe(dt, stage=stage)
+        rec = _timings.get()
+        if rec is not None:
+            rec.append((stage, dt))
+
+
+def start_request_timings() -> List[Tuple[str, float]]:
+    rec: List[Tuple[str, float]] = []
+    _timings.set(rec)
+    return rec
+
+
+def server_timing_header(rec: List[Tuple[str, float]], total: Optional[float] = None) -> str:
+    """`Server-Timing` value (durations in ms); repeated stages are summed, in first-seen order."""
+    sums: Dict[str, float] = {}
+    for stage, dt in rec:
+        sums[stage] = sums.get(stage, 0.0) + dt
+    if total is not None:
+        sums["total"] = total
+    return ", ".join(f"{stage};dur={dt * 1000:.2f}" for stage, dt in sums.items())
@@ -0,0 +1,422 @@
+# app/services/model_server.py
+from __future__ import annotations
+import itertools
+import os
+import queue
+import secrets
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener, address_type
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import numpy as np
+
+from .genai import FALLBACK_TEXT, DescriptionGenerator
+
+# reply callback: (ok, result or error message)
+Reply = Callable[[bool, Any], None]
+
+
+class MicroBatcher:
+    """
+    Runs `fn` over requests that arrive close together as one batch.
+    - Each request is a list (texts, prompts, ...); `fn(requests)` returns one result per request
+    - A batch closes after `max_wait` seconds or once it holds `max_batch` items
+    - One worker thread per batcher, so the model only ever sees one call at a time
+    """
+    def __init__(self, fn: Callable[[List[list]], List[Any]], max_batch: int = 64, max_wait: float = 0.005,
+                 name: str = "batcher"):
+        self.fn = fn
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait))
+        self._q: "queue.Queue[tuple[list, Reply]]" = queue.Queue()
+        self.requests = 0
+        self.batches = 0
+        self.items = 0
+        threading.Thread(target=self._run, name=name, daemon=True).start()
+
+    def submit(self, payload: list, reply: Reply):
+        self._q.put((payload, reply))
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "batches": self.batches, "items": self.items,
+                "queued": self._q.qsize(), "max_batch": self.max_batch, "max_wait": self.max_wait}
+
+    def _collect(self) -> list:
+        batch = [self._q.get()]
+        n = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while n < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._q.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            n += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            payloads = [p for p, _ in batch]
+            self.requests += len(batch)
+            self.batches += 1
+            self.items += sum(len(p) for p in payloads)
+            try:
+                results = self.fn(payloads)
+            except Exception as e:
+                for _, reply in batch:
+                    reply(False, f"{type(e).__name__}: {e}")
+                continue
+            for (_, reply), res in zip(batch, results):
+                reply(True, res)
+
+
+def _split(flat, sizes: List[int]) -> list:
+    out, i = [], 0
+    for n in sizes:
+        out.append(flat[i:i + n])
+        i += n
+    return out
+
+
+def encode_handler(embedder) -> Callable[[List[List[str]]], List[np.ndarray]]:
+    """
+    Batch function for TextEmbedder: single-text requests (search queries) share
+    one uncached forward pass; bulk requests go through the embedder's disk cache.
+    """
+    def run(requests: List[List[str]]) -> List[np.ndarray]:
+        out: List[Optional[np.ndarray]] = [None] * len(requests)
+        single = [i for i, r in enumerate(requests) if len(r) == 1]
+        bulk = [i for i, r in enumerate(requests) if len(r) > 1]
+        if single:
+            embs = embedder.encode([requests[i][0] for i in single], cache=False)
+            for j, i in enumerate(single):
+                out[i] = embs[j:j + 1]
+        if bulk:
+            embs = embedder.encode([t for i in bulk for t in requests[i]])
+            for i, part in zip(bulk, _split(embs, [len(requests[i]) for i in bulk])):
+                out[i] = part
+        for i, r in enumerate(requests):
+            if not r:
+                out[i] = np.zeros((0, 0), dtype="float32")
+        return out
+    return run
+
+
+def generate_handler(generator: DescriptionGenerator) -> Callable[[List[List[str]]], List[List[str]]]:
+    """Batch function for DescriptionGenerator: all prompts in one padded generate_batch call."""
+    def run(requests: List[List[str]]) -> List[List[str]]:
+        texts = generator.generate_batch([p for r in requests for p in r])
+        return _split(texts, [len(r) for r in requests])
+    return run
+
+
+def image_embed_handler(classifier) -> Callable[[List[list]], List[List[Optional[np.ndarray]]]]:
+    """
+    Batch function for CVClassifier: every image (bytes, path or URL) in the
+    batch is decoded on its thread pool and embedded in one forward pass;
+    None for images that could not be loaded.
+    """
+    def run(requests: List[list]) -> List[List[Optional[np.ndarray]]]:
+        refs = [ref for r in requests for ref in r]
+        out: List[Optional[np.ndarray]] = [None] * len(refs)
+        for pos, feats in classifier.process(refs, batch_size=max(1, len(refs))):
+            for i, f in zip(pos, feats):
+                out[i] = f
+        return _split(out, [len(r) for r in requests])
+    return run
+
+
+def default_authkey_path(address: str) -> str:
+    """Where the shared secret for `address` lives unless configured: next to the socket, or in the temp dir."""
+    if address_type(address) == "AF_UNIX":
+        return address + ".key"
+    return os.path.join(tempfile.gettempdir(), address.replace("\\", "/").rstrip("/").rsplit("/", 1)[-1] + ".key")
+
+
+def read_authkey(path: str) -> bytes:
+    """The secret in `path`; refuses a file other users could read or have planted (POSIX)."""
+    with open(path, "rb") as f:
+        if hasattr(os, "getuid"):
+            st = os.fstat(f.fileno())
+            if st.st_uid != os.getuid() or st.st_mode & 0o077:
+                raise PermissionError(f"{path} must be owned by this user with mode 0600")
+        key = f.read().strip()
+    if not key:
+        raise PermissionError(f"{path} is empty")
+    return key
+
+
+def ensure_authkey(path: str) -> bytes:
+    """Read the secret in `path`, creating it (random, mode 0600) if it does not exist yet."""
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        return read_authkey(path)
+    with os.fdopen(fd, "w", encoding="ascii") as f:
+        f.write(secrets.token_hex(32))
+    return read_authkey(path)
+
+
+class ModelServer:
+    """
+    Hosts the models for every worker on one machine, behind a local socket
+    (a filesystem path, or a \\\\.\\pipe\\ name on Windows).
+    Requests are (id, op, payload) tuples; each op is served by a MicroBatcher,
+    so concurrent calls from different workers share a forward pass. Replies
+    are (id, ok, result) and may arrive out of order.
+    Messages are pickled, so every connection must first pass the
+    multiprocessing HMAC handshake with `authkey` (by default a random secret
+    in a 0600 file, see ensure_authkey) before anything is unpickled.
+    """
+    def __init__(self, address: str, batchers: Dict[str, MicroBatcher], info: Optional[dict] = None,
+                 authkey: Optional[bytes] = None, authkey_file: str = ""):
+        self.address = address
+        self.batchers = batchers
+        self.info = dict(info or {})
+        self.authkey = authkey
+        self.authkey_file = authkey_file or default_authkey_path(address)
+        self.started = time.time()
+        self._listener: Optional[Listener] = None
+
+    def status(self) -> dict:
+        return {**self.info, "uptime_s": time.time() - self.started,
+                "ops": {op: b.stats() for op, b in self.batchers.items()}}
+
+    def bind(self):
+        if self.authkey is None:
+            self.authkey = ensure_authkey(self.authkey_file)
+        is_path = address_type(self.address) == "AF_UNIX"
+        if is_path and os.path.exists(self.address):
+            try:
+                Client(self.address, authkey=self.authkey).close()
+            except (OSError, AuthenticationError):
+                os.remove(self.address)  # stale socket from a server that died
+            else:
+                raise RuntimeError(f"A model server is already listening on {self.address}")
+        # created 0600 (no window before a chmod); the authkey is what keeps other users out
+        old_umask = os.umask(0o177) if is_path else None
+        try:
+            self._listener = Listener(self.address, authkey=self.authkey)
+        finally:
+            if old_umask is not None:
+                os.umask(old_umask)
+
+    def serve_forever(self):
+        if self._listener is None:
+            self.bind()
+        listener = self._listener
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except AuthenticationError:
+                    continue  # wrong or missing authkey
+                except OSError:
+                    if self._listener is None:
+                        return  # closed
+                    continue
+                threading.Thread(target=self._serve_conn, args=(conn,), name="model-conn", daemon=True).start()
+        finally:
+            self.close()
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+    def _serve_conn(self, conn):
+        send_lock = threading.Lock()
+
+        def reply(rid: int, ok: bool, value: Any):
+            with send_lock:
+                try:
+                    conn.send((rid, ok, value))
+                except (OSError, ValueError):
+                    pass  # worker went away; its other requests fail the same way
+
+        try:
+            while True:
+                rid, op, payload = conn.recv()
+                if op == "status":
+                    reply(rid, True, self.status())
+                    continue
+                batcher = self.batchers.get(op)
+                if batcher is None:
+                    reply(rid, False, f"Unknown op {op!r}")
+                    continue
+                batcher.submit(list(payload), lambda ok, value, rid=rid: reply(rid, ok, value))
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+
+class _Channel:
+    def __init__(self, conn):
+        self.conn = conn
+        self.pending: Dict[int, Future] = {}
+
+
+class ModelClient:
+    """
+    Thread-safe connection from one worker to the ModelServer. Calls from any
+    thread share the connection; a reader thread routes replies to futures.
+    Connects lazily (waiting up to `connect_timeout` for the server to come up)
+    and reconnects after the server restarts. Authenticates with `authkey`, or
+    with the secret the server keeps in `authkey_file`.
+    """
+    def __init__(self, address: str, connect_timeout: float = 120.0, timeout: Optional[float] = None,
+                 authkey: Optional[bytes] = None, authkey_file: str = ""):
+        self.address = address
+        self.connect_timeout = float(connect_timeout)
+        self.timeout = timeout
+        self.authkey = authkey
+        self.authkey_file = authkey_file or default_authkey_path(address)
+        self._chan: Optional[_Channel] = None
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+
+    def _connect(self, timeout: float) -> _Channel:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                # the server writes its key file before it listens
+                conn = Client(self.address, authkey=self.authkey or read_authkey(self.authkey_file))
+                break
+            except (OSError, AuthenticationError) as e:
+                if time.monotonic() >= deadline:
+                    raise ConnectionError(f"Model server not reachable at {self.address}: {e}") from e
+                time.sleep(0.2)
+        chan = _Channel(conn)
+        threading.Thread(target=self._read, args=(chan,), name="model-client", daemon=True).start()
+        return chan
+
+    def submit(self, op: str, payload: Any = None, connect_timeout: Optional[float] = None) -> Future:
+        fut: Future = Future()
+        with self._lock:
+            if self._chan is None:
+                self._chan = self._connect(self.connect_timeout if connect_timeout is None else connect_timeout)
+            chan = self._chan
+            rid = next(self._ids)
+            chan.pending[rid] = fut
+            try:
+                chan.conn.send((rid, op, payload))
+            except (OSError, ValueError) as e:
+                chan.pending.pop(rid, None)
+                self._drop(chan, e)
+                raise ConnectionError(f"Model server connection lost: {e}") from e
+        return fut
+
+    def call(self, op: str, payload: Any = None, timeout: Optional[float] = None) -> Any:
+        timeout = timeout if timeout is not None else self.timeout
+        connect_timeout = None if timeout is None else min(timeout, self.connect_timeout)
+        return self.submit(op, payload, connect_timeout).result(timeout)
+
+    def _read(self, chan: _Channel):
+        try:
+            while True:
+                rid, ok, value = chan.conn.recv()
+                fut = chan.pending.pop(rid, None)
+                if fut is None:
+                    continue
+                if ok:
+                    fut.set_result(value)
+                else:
+                    fut.set_exception(RuntimeError(f"Model server error: {value}"))
+        except (EOFError, OSError) as e:
+            with self._lock:
+                self._drop(chan, e)
+
+    def _drop(self, chan: _Channel, err: Exception):
+        # caller holds self._lock
+        if self._chan is chan:
+            self._chan = None
+        pending, chan.pending = chan.pending, {}
+        for fut in pending.values():
+            if not fut.done():
+                fut.set_exception(ConnectionError(f"Model server connection lost: {err}"))
+        try:
+            chan.conn.close()
+        except OSError:
+            pass
+
+    def close(self):
+        with self._lock:
+            if self._chan is not None:
+                self._drop(self._chan, ConnectionError("client closed"))
+
+
+class RemoteEmbedder:
+    """
+    TextEmbedder interface backed by the model server. Large inputs (index
+    builds) are sent `chunk` texts at a time so queries from other workers
+    are batched in between instead of queueing behind the whole catalog.
+    """
+    def __init__(self, client: ModelClient, model_name: str = "", chunk: int = 256):
+        self.client = client
+        self.model_name = model_name
+        self.chunk = max(1, int(chunk))
+        self._signature: Optional[str] = None
+
+    @property
+    def signature(self) -> str:
+        """TextEmbedder.signature of the server's encoder (its model and int8 mode decide)."""
+        if self._signature is None:
+            info = self.client.call("status")
+            self._signature = info["embedding_model"] + ("#int8" if info.get("embedding_int8") else "")
+        return self._signature
+
+    def encode(self, texts: Union[str, List[str]], **kw) -> np.ndarray:
+        if isinstance(texts, str):
+            texts = [texts]
+        texts = list(texts)
+        if len(texts) <= self.chunk:
+            return np.asarray(self.client.call("encode", texts), dtype="float32")
+        parts = [self.client.call("encode", texts[i:i + self.chunk]) for i in range(0, len(texts), self.chunk)]
+        return np.vstack(parts).astype("float32", copy=False)
+
+
+class RemoteGenerator(DescriptionGenerator):
+    """
+    DescriptionGenerator whose generation runs on the model server. Several
+    request threads per worker, so single-prompt streams (astream) from
+    concurrent requests can share a batch on the server.
+    """
+    def __init__(self, client: ModelClient, model_name: str = "", workers: int = 8):
+        # no local model: DescriptionGenerator.__init__ (which would load one) is skipped
+        self.client = client
+        self.model_name = model_name
+        self.pipe = None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="genai-remote")
+
+    def generate(self, prompt: str) -> str:
+        return self.generate_batch([prompt])[0]
+
+    def generate_batch(self, prompts: List[str]) -> List[str]:
+        if not prompts:
+            return []
+        try:
+            return list(self.client.call("generate", list(prompts)))
+        except Exception:
+            # server down or failing: same canned text as a generator without a model
+            return [FALLBACK_TEXT] * len(prompts)
+
+
+class RemoteImageEmbedder:
+    """CVClassifier.embed backed by the model server (started with --cv), so workers load no image model."""
+    def __init__(self, client: ModelClient):
+        self.client = client
+
+    def embed(self, image: Union[bytes, str]) -> np.ndarray:
+        emb = self.client.call("image_embed", [image])[0]
+        if emb is None:
+            raise ValueError("image could not be decoded")
+        return np.asarray(emb, dtype="float32")
@@ -1,13 +1,54 @@
 # app/services/nlp.py
 import numpy as np
 import pandas as pd
-from sklearn.cluster import KMeans
-from typing import List
+from typing import List, Optional
 
-def cluster_products(df: pd.DataFrame, embedder, text_cols: List[str], n_clusters: int):
-    texts = df[text_cols].fillna("").agg(" ".join, axis=1).tolist()
-    X = embedder.encode(texts)
+# catalogs larger than this use mini-batch k-means when method="auto"
+MINIBATCH_THRESHOLD = 20000
+
+def _minibatch_labels(X: np.ndarray, n_clusters: int, batch_size: int = 4096, epochs: int = 3) -> np.ndarray:
+    from sklearn.cluster import MiniBatchKMeans
+    # stream over X in chunks (works on a read-only memmap without a full copy)
+    n = X.shape[0]
+    km = MiniBatchKMeans(n_clusters=n_clusters, batch_size=batch_size, random_state=42, n_init=3)
+    # a short tail joins the chunk before it: the first partial_fit (in shuffled order)
+    # needs at least n_clusters rows
+    starts = list(range(0, n, batch_size))
+    if len(starts) > 1 and n - starts[-1] < batch_size:
+        starts.pop()
+    bounds = list(zip(starts, starts[1:] + [n]))
+    rng = np.random.default_rng(42)
+    for _ in range(epochs):
+        for i in rng.permutation(len(bounds)):
+            s, e = bounds[i]
+            km.partial_fit(np.asarray(X[s:e], dtype="float32"))
+    labels = np.empty(n, dtype="int32")
+    for s in range(0, n, 65536):
+        labels[s:s + 65536] = km.predict(np.asarray(X[s:s + 65536], dtype="float32"))
+    return labels
+
+def cluster_products(df: pd.DataFrame, embedder, text_cols: List[str], n_clusters: int,
+                     vectors: Optional[np.ndarray] = None, method: str = "auto"):
+    """
+    Cluster catalog rows into `n_clusters` groups.
+    - `vectors`: precomputed normalized row embeddings (e.g. the persisted
+      VectorStore matrix); rows are only re-encoded when it is not given
+    - method: "kmeans" (full, n_init=10), "minibatch" (streaming mini-batch)
+      or "auto" (minibatch above MINIBATCH_THRESHOLD rows)
+    """
+    if vectors is None:
+        texts = df[text_cols].fillna("").agg(" ".join, axis=1).tolist()
+        X = embedder.encode(texts)
+    else:
+        X = vectors
+    if method == "auto":
+        method = "minibatch" if X.shape[0] > MINIBATCH_THRESHOLD else "kmeans"
+    if method == "minibatch":
+        return _minibatch_labels(X, n_clusters)
+    if method != "kmeans":
+        raise ValueError(f"Unknown clustering method {method!r}.")
     # KMeans on normalized vectors
+    from sklearn.cluster import KMeans
     kmeans = KMeans(n_clusters=n_clusters, n_init=10, random_state=42)
     labels = kmeans.fit_predict(X)
     return labels
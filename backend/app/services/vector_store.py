@@ -1,60 +1,296 @@
 # backend/app/services/vector_store.py
 from __future__ import annotations
 import os
+import csv
 import json
-from typing import List, Tuple
+import threading
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
 import numpy as np
-from sklearn.neighbors import NearestNeighbors
+import pandas as pd
+
+from .ann import FlatIndex, IVFIndex, ScalarQuantizer, batch_topk_inner_product, chunked_topk, topk_scores
+from .lexical import BM25Index, rrf_fuse
+
+if TYPE_CHECKING:
+    from sklearn.neighbors import NearestNeighbors  # imported lazily in _fit_index
+
+INDEX_TYPES = ("exact", "ivf")
+STORAGE_TYPES = ("float32", "int8")
+# dense: embeddings only | lexical: BM25 only | hybrid: RRF of both |
+# shortlist: BM25 candidates re-scored with embeddings
+SEARCH_MODES = ("dense", "lexical", "hybrid", "shortlist")
+
+
+def append_npy(path: str, rows: np.ndarray) -> bool:
+    """
+    Grow a C-order .npy file along axis 0 in place: write the new rows after
+    the declared data, then rewrite the shape in the header (np.save pads the
+    header so the first axis can grow). A crash between the two steps leaves
+    ignored trailing bytes, which the next append overwrites.
+    Returns False (nothing written) if the file cannot be grown this way.
+    """
+    rows = np.ascontiguousarray(rows)
+    fmt = np.lib.format
+    with open(path, "r+b") as f:
+        version = fmt.read_magic(f)
+        if version == (1, 0):
+            shape, fortran, dtype = fmt.read_array_header_1_0(f)
+            prefix = 10
+        else:
+            shape, fortran, dtype = fmt.read_array_header_2_0(f)
+            prefix = 12
+        data_offset = f.tell()
+        if fortran or dtype != rows.dtype or tuple(shape[1:]) != tuple(rows.shape[1:]):
+            return False
+
+        new_shape = (int(shape[0]) + int(rows.shape[0]),) + tuple(shape[1:])
+        header = "{'descr': %r, 'fortran_order': False, 'shape': %r, }" % (fmt.dtype_to_descr(dtype), new_shape)
+        pad = data_offset - prefix - len(header) - 1
+        if pad < 0:
+            return False
+
+        f.seek(data_offset + int(np.prod(shape, dtype="int64")) * dtype.itemsize)
+        f.truncate()
+        f.write(rows.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+        f.seek(prefix)
+        f.write((header + " " * pad + "\n").encode("latin1"))
+        f.flush()
+        os.fsync(f.fileno())
+    return True
 
 
 class VectorStore:
     """
-    Dense vector storage + ANN search using scikit-learn (CPU-only).
-    Uses cosine similarity (via 1 - cosine distance) and persists the
-    normalized vectors to disk so warm boots are fast.
+    Dense vector storage + nearest-neighbour search (CPU-only, cosine
+    similarity). Persists the normalized vectors to disk so warm boots are
+    fast; the search engine is chosen per store:
+
+    index_type:
+    - "exact": brute-force scan; scikit-learn NearestNeighbors over in-memory
+      float32 vectors, ann.FlatIndex (numpy) in mmap or int8 mode (default)
+    - "ivf":   inverted-file ANN (see ann.IVFIndex); `nprobe` trades recall for latency
+
+    mmap=True opens vectors.npy read-only with np.load(mmap_mode="r") and
+    searches it in place (no private copy, no NearestNeighbors fit), so
+    several worker processes share one copy via the OS page cache.
+
+    storage="int8" keeps scalar-quantized codes (codes.npy) in memory and
+    scans those instead; only a shortlist of `rerank` * k rows is re-scored
+    against the full-precision vectors, which then stay memory-mapped.
+
+    A BM25 index over the same row texts (see lexical.BM25Index) is built and
+    appended alongside the vectors for lexical and hybrid search.
     """
-    def __init__(self, index_dir: str):
+    def __init__(self, index_dir: str, index_type: str = "exact", nprobe: int = 8, nlist: int = 0,
+                 mmap: bool = False, storage: str = "float32", rerank: int = 4):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index_type {index_type!r}; expected one of {INDEX_TYPES}.")
+        if storage not in STORAGE_TYPES:
+            raise ValueError(f"Unknown storage {storage!r}; expected one of {STORAGE_TYPES}.")
         self.index_dir = index_dir
+        self.index_type = index_type
+        self.nprobe = nprobe
+        self.nlist = nlist
+        self.mmap = mmap
+        self.storage = storage
+        self.rerank = max(1, int(rerank))
         os.makedirs(self.index_dir, exist_ok=True)
 
         # files
         self.vec_path = os.path.join(self.index_dir, "vectors.npy")
         self.meta_path = os.path.join(self.index_dir, "meta.csv")   # keep for compatibility
         self.info_path = os.path.join(self.index_dir, "meta.json")  # small metadata
+        self.ivf_path = os.path.join(self.index_dir, "ivf.npz")     # IVF centroids + lists
+        self.codes_path = os.path.join(self.index_dir, "codes.npy") # int8 codes
+        self.sq_path = os.path.join(self.index_dir, "sq.npz")       # int8 scales
 
         # in-memory
         self._vectors: np.ndarray | None = None  # normalized (N, D)
-        self._index: NearestNeighbors | None = None
+        self._buf: np.ndarray | None = None      # in-memory vectors with spare rows for appends
+        self._index: NearestNeighbors | FlatIndex | IVFIndex | None = None
         self._dim: int | None = None
         self._n: int = 0
+        self._text_cols: List[str] | None = None
+        self._encoder: str | None = None         # embedder signature the vectors came from
+        self._codes: np.ndarray | None = None    # int8 (N, D) when storage="int8"
+        self._codes_buf: np.ndarray | None = None  # in-memory codes with spare rows for appends
+        self._sq: ScalarQuantizer | None = None
+        self._bm25: BM25Index | None = None
+        self._bm25_lock = threading.Lock()
 
         self._load_if_exists()
 
+    @property
+    def quantized(self) -> bool:
+        return self.storage == "int8"
+
+    @property
+    def n(self) -> int:
+        return self._n
+
+    @property
+    def text_cols(self) -> Optional[List[str]]:
+        return self._text_cols
+
+    @property
+    def encoder(self) -> Optional[str]:
+        """Signature of the embedder that built the index (None for indexes built before it was recorded)."""
+        return self._encoder
+
+    @property
+    def vectors(self) -> Optional[np.ndarray]:
+        """Normalized (N, D) row vectors (read-only memmap in mmap/int8 mode)."""
+        if self._vectors is None:
+            self._load_if_exists()
+        return self._vectors
+
     # -------- persistence helpers --------
     def _save_meta(self):
-        info = {"dim": self._dim, "n": self._n}
+        info = {"dim": self._dim, "n": self._n, "text_cols": self._text_cols,
+                "index_type": self.index_type, "storage": self.storage, "encoder": self._encoder}
         with open(self.info_path, "w", encoding="utf-8") as f:
             json.dump(info, f)
 
+    def _load_meta(self):
+        if not os.path.isfile(self.info_path):
+            return
+        try:
+            with open(self.info_path, "r", encoding="utf-8") as f:
+                info = json.load(f)
+            self._text_cols = info.get("text_cols")
+            self._encoder = info.get("encoder")
+        except Exception:
+            self._text_cols, self._encoder = None, None
+
+    def _save_vectors(self, arr: np.ndarray):
+        # write to a temp file first so a crash never leaves a half-written matrix
+        tmp_path = self.vec_path + ".tmp.npy"
+        np.save(tmp_path, arr)
+        os.replace(tmp_path, self.vec_path)
+
+    def _meta_header(self) -> List[str]:
+        if not os.path.isfile(self.meta_path):
+            return []
+        with open(self.meta_path, "r", encoding="utf-8", newline="") as f:
+            return next(csv.reader(f), [])
+
+    def _open_vectors(self) -> np.ndarray:
+        # int8 mode only touches full-precision rows for re-ranking, so never load them eagerly
+        return np.load(self.vec_path, mmap_mode="r" if (self.mmap or self.quantized) else None)
+
+    def _save_codes(self, codes: np.ndarray):
+        tmp_path = self.codes_path + ".tmp.npy"
+        np.save(tmp_path, codes)
+        os.replace(tmp_path, self.codes_path)
+
+    def _fit_codes(self, reuse_saved: bool = False):
+        self._codes_buf = None
+        if reuse_saved and os.path.isfile(self.codes_path) and os.path.isfile(self.sq_path):
+            try:
+                codes = np.load(self.codes_path, mmap_mode="r" if self.mmap else None)
+                if codes.shape == (self._n, self._dim):
+                    self._codes, self._sq = codes, ScalarQuantizer.load(self.sq_path)
+                    return
+            except Exception:
+                pass
+        self._sq = ScalarQuantizer().fit(self._vectors)
+        self._sq.save(self.sq_path)
+        self._save_codes(self._sq.encode(self._vectors))
+        self._codes = np.load(self.codes_path, mmap_mode="r" if self.mmap else None)
+
+    def _fit_index(self, reuse_saved: bool = False):
+        if self.quantized:
+            self._fit_codes(reuse_saved=reuse_saved)
+        if self.index_type == "exact" and (self.mmap or self.quantized):
+            self._index = FlatIndex()
+            return
+        if self.index_type == "exact":
+            from sklearn.neighbors import NearestNeighbors  # sklearn only loads for in-memory exact indexes
+            self._index = NearestNeighbors(
+                n_neighbors=min(10, max(1, self._n)),
+                algorithm="auto",
+                metric="cosine",
+            ).fit(self._vectors)
+            return
+
+        # ivf: reuse the persisted index on warm boots if it covers every row
+        if reuse_saved and os.path.isfile(self.ivf_path):
+            try:
+                ivf = IVFIndex.load(self.ivf_path, nprobe=self.nprobe)
+                if ivf.ntotal == self._n and int(ivf.centroids.shape[1]) == self._dim:
+                    self._index = ivf
+                    return
+            except Exception:
+                pass
+        self._index = IVFIndex(nlist=self.nlist, nprobe=self.nprobe).fit(self._vectors)
+        self._index.save(self.ivf_path)
+
+    @staticmethod
+    def _row_texts(df, text_cols: List[str]) -> List[str]:
+        # column-wise concat; a row-wise agg(" ".join) is ~100x slower on large catalogs
+        cols = [df[c].fillna("").astype(str) for c in text_cols]
+        if not cols:
+            return [""] * len(df)
+        out = cols[0]
+        for c in cols[1:]:
+            out = out + " " + c
+        return out.tolist()
+
+    @staticmethod
+    def _encode_rows(df, embedder, text_cols: List[str], texts: Optional[List[str]] = None) -> np.ndarray:
+        if texts is None:
+            texts = VectorStore._row_texts(df, text_cols)
+        embs = embedder.encode(texts)  # shape (N, D)
+        embs = np.asarray(embs, dtype="float32")
+
+        # normalize for cosine similarity
+        norms = np.linalg.norm(embs, axis=1, keepdims=True) + 1e-12
+        return embs / norms
+
+    def embed(self, df, embedder, text_cols: Optional[List[str]] = None) -> np.ndarray:
+        """Normalized embeddings for the rows of `df` (e.g. computed before `append`)."""
+        text_cols = list(text_cols or self._text_cols or [])
+        if not text_cols:
+            raise ValueError("text_cols must be given when the index has none recorded.")
+        return self._encode_rows(df.reindex(columns=text_cols), embedder, text_cols)
+
+    @staticmethod
+    def _grow(buf: Optional[np.ndarray], cur: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (buffer, view of cur + rows): amortized doubling, so appending a chunk
+        does not copy the whole matrix. `buf` must be None or the buffer `cur`
+        was returned from.
+        """
+        n, m = int(cur.shape[0]), int(rows.shape[0])
+        if buf is None or buf.shape[0] < n + m:
+            new = np.empty((max(n + m, 2 * n),) + tuple(rows.shape[1:]), dtype=rows.dtype)
+            new[:n] = cur
+            buf = new
+        buf[n:n + m] = rows
+        return buf, buf[:n + m]
+
+    def _grow_vectors(self, embs: np.ndarray) -> np.ndarray:
+        self._buf, vectors = self._grow(self._buf, self._vectors[:self._n], embs)
+        return vectors
+
     def _load_if_exists(self):
         if not (os.path.isfile(self.vec_path) and os.path.isfile(self.meta_path)):
             return
         try:
-            arr = np.load(self.vec_path)
+            arr = self._open_vectors()
             if arr.ndim == 1:
                 # handle empty edge-case robustly
                 arr = arr.reshape(0, 0)
             self._vectors = arr
             self._n = int(arr.shape[0])
             self._dim = int(arr.shape[1]) if self._n else 0
+            self._load_meta()
 
             if self._n:
-                self._index = NearestNeighbors(
-                    n_neighbors=min(10, self._n),
-                    algorithm="auto",
-                    metric="cosine",
-                ).fit(self._vectors)
+                self._fit_index(reuse_saved=True)
         except Exception:
             # if anything goes wrong, force rebuild on next request
             self._vectors, self._index, self._dim, self._n = None, None, None, 0
@@ -72,29 +308,161 @@ class VectorStore:
         - Normalizes rows for cosine
         - Saves vectors to vectors.npy and df to meta.csv (compat)
         """
-        texts = df[text_cols].fillna("").astype(str).agg(" ".join, axis=1).tolist()
-        embs = embedder.encode(texts)  # shape (N, D)
-        embs = np.asarray(embs, dtype="float32")
-
-        # normalize for cosine similarity
-        norms = np.linalg.norm(embs, axis=1, keepdims=True) + 1e-12
-        embs = embs / norms
+        texts = self._row_texts(df, text_cols)
+        embs = self._encode_rows(df, embedder, text_cols, texts)
 
         # persist
-        np.save(self.vec_path, embs)
+        self._save_vectors(embs)
+        self._buf = None
         df.reset_index(drop=True).to_csv(self.meta_path, index=False)
 
         # fit index
-        self._vectors = embs
+        self._vectors = self._open_vectors() if self.mmap else embs
         self._n, self._dim = int(embs.shape[0]), int(embs.shape[1])
-        self._index = NearestNeighbors(
-            n_neighbors=min(10, max(1, self._n)),
-            algorithm="auto",
-            metric="cosine",
-        ).fit(self._vectors)
+        self._text_cols = list(text_cols)
+        self._encoder = getattr(embedder, "signature", None)
+        self._fit_index()
+        self._build_lexical(texts)
 
         self._save_meta()
 
+    def append(self, df, embedder=None, text_cols: Optional[List[str]] = None,
+               embeddings: Optional[np.ndarray] = None) -> int:
+        """
+        Append the rows of `df` to an already built index.
+        - Encodes only the new rows (no full-catalog re-embed), unless
+          `embeddings` (from `embed`) are passed in
+        - Grows vectors.npy in place and appends the rows to meta.csv
+        - Refits the exact index, or adds the rows to the IVF lists
+        New rows get row indices n, n+1, ... in insertion order.
+        Falls back to a full build when nothing is on disk yet.
+        Returns the total number of indexed rows.
+        """
+        if self._vectors is None:
+            self._load_if_exists()
+        text_cols = list(text_cols or self._text_cols or [])
+        if not text_cols:
+            raise ValueError("text_cols must be given when the index has none recorded.")
+        if self._vectors is None or self._n == 0:
+            self.build(df, embedder, text_cols)
+            return self._n
+        if len(df) == 0:
+            return self._n
+
+        embs = self.embed(df, embedder, text_cols) if embeddings is None else np.asarray(embeddings, dtype="float32")
+        if int(embs.shape[1]) != self._dim:
+            raise ValueError(f"Embedding dim {embs.shape[1]} does not match index dim {self._dim}.")
+        if int(embs.shape[0]) != len(df):
+            raise ValueError(f"Got {embs.shape[0]} embeddings for {len(df)} rows.")
+
+        if self.mmap or self.quantized:
+            if not append_npy(self.vec_path, embs):
+                self._save_vectors(np.vstack([self._vectors, embs]))
+            vectors = self._open_vectors()
+        else:
+            vectors = self._grow_vectors(embs)
+            if not append_npy(self.vec_path, embs):
+                self._save_vectors(vectors)
+
+        # keep meta.csv row-aligned with vectors.npy (same columns as the original build)
+        header = self._meta_header()
+        if header:
+            df.reindex(columns=header).to_csv(self.meta_path, mode="a", header=False, index=False)
+        else:
+            df.reset_index(drop=True).to_csv(self.meta_path, index=False)
+
+        if self.quantized:
+            # keep the trained scales; encode only the new rows
+            new_codes = self._sq.encode(embs)
+            if self.mmap:
+                if not append_npy(self.codes_path, new_codes):
+                    self._save_codes(np.vstack([self._codes, new_codes]))
+                self._codes = np.load(self.codes_path, mmap_mode="r")
+            else:
+                self._codes_buf, codes = self._grow(self._codes_buf, self._codes, new_codes)
+                if not append_npy(self.codes_path, new_codes):
+                    self._save_codes(codes)
+                self._codes = codes
+        self._vectors = vectors
+        self._n = int(vectors.shape[0])
+        self._text_cols = text_cols
+        if isinstance(self._index, IVFIndex):
+            # keep the trained centroids; just route the new rows into lists
+            self._index.add(embs)
+            self._index.save(self.ivf_path)
+        elif self._index is not None and not isinstance(self._index, FlatIndex):
+            self._fit_index()  # NearestNeighbors: refit on the grown matrix
+        # FlatIndex has nothing to refit
+        bm25 = self._bm25 or BM25Index.load(self.index_dir)
+        if bm25 is not None and bm25.n == self._n - len(df):
+            bm25.add(self._row_texts(df.reindex(columns=text_cols), text_cols))
+            self._bm25 = bm25
+        # otherwise lexical() rebuilds it from meta.csv on first use
+
+        self._save_meta()
+        return self._n
+
+    # -------- lexical / hybrid --------
+    def _build_lexical(self, texts: List[str]):
+        for p in os.listdir(self.index_dir):
+            if p.startswith("bm25_"):
+                os.remove(os.path.join(self.index_dir, p))
+        bm25 = BM25Index(self.index_dir)
+        bm25.add(texts)
+        self._bm25 = bm25
+
+    def lexical(self) -> BM25Index:
+        """BM25 index for the current rows; (re)built from meta.csv if missing or stale."""
+        if self._bm25 is not None and self._bm25.n == self._n:
+            return self._bm25
+        with self._bm25_lock:
+            if self._bm25 is None or self._bm25.n != self._n:
+                bm25 = BM25Index.load(self.index_dir)
+                if bm25 is not None and bm25.n == self._n:
+                    self._bm25 = bm25
+                else:
+                    meta = pd.read_csv(self.meta_path, usecols=lambda c: c in (self._text_cols or []))
+                    cols = [c for c in (self._text_cols or []) if c in meta.columns]
+                    self._build_lexical(self._row_texts(meta.head(self._n), cols))
+        return self._bm25
+
+    def search_text(self, text: str, q: Optional[np.ndarray], top_k: int = 5, mode: str = "dense",
+                    mask: Optional[np.ndarray] = None, depth: int = 100,
+                    rrf_k: int = 60) -> List[Tuple[int, float]]:
+        """
+        Search by query text in one of SEARCH_MODES; `q` is the encoded query
+        (unused, and may be None, for mode="lexical").
+        - hybrid:    reciprocal rank fusion of the top `depth` dense and BM25 rows
+        - shortlist: dense scores for the top `depth` BM25 rows only (full dense
+                     scan if BM25 matches fewer than top_k rows)
+        Lexical-only scores are BM25 scores; hybrid scores are RRF scores.
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode {mode!r}; expected one of {SEARCH_MODES}.")
+        if mode == "dense":
+            return self.search_embedding(q, top_k=top_k, mask=mask)
+        if mask is not None and mask.shape[0] != self._n:
+            fixed = np.zeros(self._n, dtype=bool)
+            m = min(self._n, mask.shape[0])
+            fixed[:m] = mask[:m]
+            mask = fixed
+
+        bm25 = self.lexical()
+        if mode == "lexical":
+            return bm25.search(text, top_k, mask=mask)
+
+        depth = max(int(depth), top_k)
+        lex = bm25.search(text, depth, mask=mask)
+        if mode == "shortlist":
+            if len(lex) < top_k:
+                return self.search_embedding(q, top_k=top_k, mask=mask)
+            allowed = np.zeros(self._n, dtype=bool)
+            allowed[[i for i, _ in lex]] = True
+            return self.search_embedding(q, top_k=top_k, mask=allowed)
+
+        dense = self.search_embedding(q, top_k=depth, mask=mask)
+        return rrf_fuse([[i for i, _ in dense], [i for i, _ in lex]], top_k, rrf_k=rrf_k)
+
     def search(self, query: str, embedder, top_k: int = 5) -> List[Tuple[int, float]]:
         """
         Return list of (row_index, similarity) pairs for the given query.
@@ -106,10 +474,138 @@ class VectorStore:
             raise RuntimeError("VectorStore not built yet.")
 
         q = embedder.encode([query]).astype("float32")
-        q = q / (np.linalg.norm(q, axis=1, keepdims=True) + 1e-12)
+        return self.search_embedding(q[0], top_k=top_k)
 
+    def search_embedding(self, q: np.ndarray, top_k: int = 5, mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Same as `search` for an already encoded query vector (D,),
+        e.g. one served from a query-embedding cache.
+        `mask` (bool per row) restricts the scan to allowed rows, so a
+        filtered query still returns up to top_k matching rows.
+        """
+        if self._vectors is None or self._index is None:
+            self._load_if_exists()
+        if self._vectors is None or self._index is None or self._n == 0:
+            raise RuntimeError("VectorStore not built yet.")
+
+        q = np.asarray(q, dtype="float32").reshape(-1)
+        q = q / (np.linalg.norm(q) + 1e-12)
+
+        sims, idxs = self._search_vector(q, top_k, mask=mask)
+        return [(int(i), float(s)) for i, s in zip(idxs, sims)]
+
+    def search_batch(self, queries: np.ndarray, top_k: int = 5,
+                     mask: Optional[np.ndarray] = None) -> List[List[Tuple[int, float]]]:
+        """
+        Search many encoded queries (m, D) at once; one hit list per query.
+        Exact float32 search runs as a single blocked (m x N) matrix product
+        with a top-k partition; IVF, int8 and filtered searches go per query.
+        """
+        if self._vectors is None or self._index is None:
+            self._load_if_exists()
+        if self._vectors is None or self._index is None or self._n == 0:
+            raise RuntimeError("VectorStore not built yet.")
+
+        Q = np.asarray(queries, dtype="float32").reshape(len(queries), -1)
+        Q = Q / (np.linalg.norm(Q, axis=1, keepdims=True) + 1e-12)
+        k = min(max(1, top_k), self._n)
+
+        if self.index_type == "exact" and not self.quantized and mask is None:
+            sims, idxs = batch_topk_inner_product(self._vectors, Q, k)
+        else:
+            pairs = [self._search_vector(q, k, mask=mask) for q in Q]
+            sims, idxs = [p[0] for p in pairs], [p[1] for p in pairs]
+        return [[(int(i), float(s)) for i, s in zip(ri, rs)] for ri, rs in zip(idxs, sims)]
+
+    def _candidates(self, q: np.ndarray, k: int, nprobe: Optional[int] = None,
+                    mask: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """
+        Row ids to score, or None for "every row".
+        IVF probes `nprobe` lists; with a mask it keeps probing more lists
+        until at least k allowed rows are found (or every list is probed).
+        """
+        if mask is not None and mask.shape[0] != self._n:
+            # filters are built over the serving catalog; tolerate a stale length
+            fixed = np.zeros(self._n, dtype=bool)
+            m = min(self._n, mask.shape[0])
+            fixed[:m] = mask[:m]
+            mask = fixed
+
+        if not isinstance(self._index, IVFIndex):
+            return None if mask is None else np.flatnonzero(mask)
+
+        nprobe = int(nprobe or self.nprobe)
+        while True:
+            cand = self._index.candidates(q, nprobe)
+            if mask is not None:
+                cand = cand[mask[cand]]
+            if mask is None or cand.size >= k or nprobe >= self._index.nlist:
+                return cand
+            nprobe *= 2
+
+    def _search_vector(self, q: np.ndarray, top_k: int, nprobe: Optional[int] = None,
+                       mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
         k = min(max(1, top_k), self._n)
-        dists, idxs = self._index.kneighbors(q, n_neighbors=k, return_distance=True)
-        sims = 1.0 - dists[0]  # convert cosine distance -> similarity
+        cand = self._candidates(q, k, nprobe=nprobe, mask=mask)
+        if self.quantized:
+            return self._search_quantized(q, k, cand)
+        if cand is not None:
+            # restricted scan: only allowed / probed rows are scored
+            sims, pos = chunked_topk(int(cand.size), lambda s, e: self._vectors[cand[s:e]] @ q, k, 65536)
+            return sims, cand[pos]
+        if isinstance(self._index, FlatIndex):
+            return self._index.search(self._vectors, q, k)
+
+        dists, idxs = self._index.kneighbors(q[None, :], n_neighbors=k, return_distance=True)
+        return 1.0 - dists[0], idxs[0]  # convert cosine distance -> similarity
+
+    def _search_quantized(self, q: np.ndarray, k: int, cand: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        # 1) approximate shortlist from int8 codes (optionally restricted to candidates)
+        if cand is not None and cand.size == 0:
+            return np.empty(0, dtype="float32"), cand
+        _, shortlist = self._sq.search(self._codes, q, k * self.rerank, ids=cand)
+        if shortlist.size == 0:
+            return np.empty(0, dtype="float32"), shortlist
+
+        # 2) exact re-rank of the shortlist with full-precision vectors
+        shortlist = np.sort(shortlist)  # sequential reads from the memory map
+        sims = np.asarray(self._vectors[shortlist], dtype="float32") @ q
+        sims, pos = topk_scores(sims, k)
+        return sims, shortlist[pos]
+
+    def recall_at_k(self, k: int = 10, n_queries: int = 200, nprobe: Optional[int] = None,
+                    queries: Optional[np.ndarray] = None) -> dict:
+        """
+        Mean recall@k of the configured index against exact brute-force search.
+        Uses `queries` (normalized, (m, D)) if given, else a seeded sample of
+        catalog vectors. Always 1.0 for index_type="exact" with float32 storage;
+        with storage="int8" it also captures the quantization loss.
+        """
+        if self._vectors is None or self._index is None:
+            self._load_if_exists()
+        if self._vectors is None or self._index is None or self._n == 0:
+            raise RuntimeError("VectorStore not built yet.")
+
+        if queries is None:
+            rng = np.random.default_rng(0)
+            m = min(n_queries, self._n)
+            queries = self._vectors[rng.choice(self._n, m, replace=False)]
+        k = min(max(1, k), self._n)
+
+        exact = FlatIndex()
+        hits = 0
+        for q in queries:
+            _, truth = exact.search(self._vectors, q, k)
+            _, got = self._search_vector(q, k, nprobe=nprobe)
+            hits += len(set(got.tolist()) & set(truth.tolist()))
 
-        return [(int(i), float(s)) for i, s in zip(idxs[0], sims)]
+        return {
+            "index_type": self.index_type,
+            "storage": self.storage,
+            "k": k,
+            "nprobe": (nprobe or self.nprobe) if self.index_type == "ivf" else None,
+            "rerank": self.rerank if self.quantized else None,
+            "bytes_per_vector": int(self._dim) * (1 if self.quantized else 4),
+            "n_queries": int(len(queries)),
+            "recall": hits / float(k * len(queries)),
+        }
@@ -0,0 +1,139 @@
+# app/services/visual_index.py
+from __future__ import annotations
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .ann import topk_scores
+from .vector_store import append_npy
+
+
+class VisualIndex:
+    """
+    Image embeddings for catalog products, keyed by uniq_id (so row order
+    changes from uploads / rebuilds don't invalidate it).
+    - visual_vectors.npy: float32 (N, D), L2-normalized, grown in place per batch
+    - visual_rows.jsonl: {"uniq_id"} per vector, same order
+    Appends write vectors before rows; a crash in between leaves extra vectors
+    that load() ignores, so the build job can resume from the rows file.
+    load() stops at a torn row line; the next append cuts the file back to
+    the last good line before writing.
+    """
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        os.makedirs(index_dir, exist_ok=True)
+        self.vectors_path = os.path.join(index_dir, "visual_vectors.npy")
+        self.rows_path = os.path.join(index_dir, "visual_rows.jsonl")
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((0, 0), dtype="float32")
+        self._ids: List[str] = []
+        self._pos: Dict[str, int] = {}
+        self._stamp = None
+        self._rows_end = 0  # bytes of visual_rows.jsonl up to the last good line
+        self.load()
+
+    @property
+    def n(self) -> int:
+        return len(self._ids)
+
+    @property
+    def dim(self) -> int:
+        return int(self._vectors.shape[1]) if self._vectors.ndim == 2 else 0
+
+    def __contains__(self, uniq_id: str) -> bool:
+        return uniq_id in self._pos
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.rows_path)
+            return st.st_mtime_ns, st.st_size
+        except FileNotFoundError:
+            return None
+
+    def load(self):
+        stamp = self._file_stamp()
+        ids, ends = [], []
+        if stamp is not None:
+            with open(self.rows_path, "rb") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line) if line.endswith(b"\n") else None
+                    except ValueError:
+                        rec = None
+                    if rec is None:
+                        break  # torn last line
+                    ids.append(str(rec["uniq_id"]))
+                    ends.append((ends[-1] if ends else 0) + len(line))
+        vectors = np.zeros((0, 0), dtype="float32")
+        if ids and os.path.isfile(self.vectors_path):
+            vectors = np.load(self.vectors_path, mmap_mode="r")
+        n = min(len(ids), int(vectors.shape[0]))
+        with self._lock:
+            self._vectors = vectors[:n] if n else np.zeros((0, 0), dtype="float32")
+            self._ids = ids[:n]
+            self._pos = {}
+            for i, uid in enumerate(self._ids):
+                self._pos.setdefault(uid, i)
+            self._stamp = stamp
+            self._rows_end = ends[n - 1] if n else 0
+
+    def refresh(self) -> bool:
+        """Reload if the build job has written more rows since the last load."""
+        if self._file_stamp() == self._stamp:
+            return False
+        self.load()
+        return True
+
+    def append(self, uniq_ids: Sequence[str], embeddings: np.ndarray):
+        """Persist one batch (called by the build job; serving workers pick it up via refresh())."""
+        embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+        if len(uniq_ids) != embeddings.shape[0]:
+            raise ValueError("uniq_ids and embeddings differ in length")
+        if not len(uniq_ids):
+            return
+        if self.n and embeddings.shape[1] != self.dim:
+            raise ValueError(f"Embedding dim {embeddings.shape[1]} != index dim {self.dim}")
+        if self._on_disk_rows() != self.n:
+            # first batch, or vectors written without their rows (crash between the two writes)
+            self._replace_vectors(np.array(self._vectors) if self.n else embeddings[:0])
+        if not append_npy(self.vectors_path, embeddings):
+            self._replace_vectors(np.concatenate([np.asarray(self._vectors), embeddings]))
+        with open(self.rows_path, "ab") as f:
+            f.truncate(self._rows_end)  # drop a torn line (and rows past the vectors) left by a crash
+            f.write("".join(json.dumps({"uniq_id": str(uid)}) + "\n" for uid in uniq_ids).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        self.load()
+
+    def _replace_vectors(self, arr: np.ndarray):
+        # new file + rename: readers keep their mmap of the old one
+        tmp = self.vectors_path + ".tmp.npy"
+        np.save(tmp, arr)
+        os.replace(tmp, self.vectors_path)
+
+    def _on_disk_rows(self) -> int:
+        try:
+            return int(np.load(self.vectors_path, mmap_mode="r").shape[0])
+        except (FileNotFoundError, ValueError):
+            return -1
+
+    def search(self, q: np.ndarray, top_k: int = 5, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """(uniq_id, cosine similarity) of the `top_k` nearest images to embedding `q`."""
+        with self._lock:
+            vectors, ids = self._vectors, self._ids
+        if not ids:
+            return []
+        q = np.asarray(q, dtype="float32").reshape(-1)
+        sims, pos = topk_scores(np.asarray(vectors @ q), top_k + (1 if exclude else 0))
+        out = [(ids[i], float(s)) for i, s in zip(pos, sims) if ids[i] != exclude]
+        return out[:top_k]
+
+    def similar(self, uniq_id: str, top_k: int = 5) -> Optional[List[Tuple[str, float]]]:
+        """Products that look most like `uniq_id` (None if it has no image embedding)."""
+        i = self._pos.get(uniq_id)
+        if i is None:
+            return None
+        return self.search(np.asarray(self._vectors[i]), top_k, exclude=uniq_id)
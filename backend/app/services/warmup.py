@@ -0,0 +1,83 @@
+# app/services/warmup.py
+from __future__ import annotations
+import threading
+import time
+import traceback
+from typing import Callable, Dict, List, Optional
+
+
+class WarmUp:
+    """
+    Startup work (catalog load, index open, model warm-up) run in order on one
+    background thread, so the process answers liveness checks right away.
+    - add(name, fn): steps run in the order they were added
+    - start(): idempotent; after a failed step it resumes from that step
+    - done(name) / wait(name, timeout): has a step (or all of them) finished
+    - ready: every step done; status() is the per-step breakdown for /readyz
+    A failed step stops the run (later steps usually need earlier ones).
+    """
+    def __init__(self):
+        self._steps: List[tuple] = []
+        self._state: Dict[str, dict] = {}
+        self._events: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at: Optional[float] = None
+
+    def add(self, name: str, fn: Callable[[], object]):
+        self._steps.append((name, fn))
+        self._state[name] = {"state": "pending"}
+        self._events[name] = threading.Event()
+
+    def start(self) -> bool:
+        """Run the pending steps in the background; False if they are running or all done."""
+        with self._lock:
+            if (self._thread is not None and self._thread.is_alive()) or self.ready:
+                return False
+            if self.started_at is None:
+                self.started_at = time.monotonic()
+            self._thread = threading.Thread(target=self._run, name="warm-up", daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self):
+        for name, fn in self._steps:
+            st = self._state[name]
+            if st["state"] == "done":
+                continue
+            t0 = time.perf_counter()
+            self._state[name] = {"state": "running"}
+            try:
+                fn()
+            except Exception as e:
+                traceback.print_exc()
+                self._state[name] = {"state": "failed", "seconds": time.perf_counter() - t0, "error": str(e)}
+                return
+            self._state[name] = {"state": "done", "seconds": time.perf_counter() - t0}
+            self._events[name].set()
+
+    def done(self, name: str) -> bool:
+        return self._events[name].is_set()
+
+    def wait(self, name: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """Block until step `name` (default: the last one) is done; False on timeout or failure."""
+        name = name if name is not None else self._steps[-1][0]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._events[name].wait(0.05):
+            if self._state[name]["state"] == "failed" or self._stopped_early(name):
+                return False
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+        return True
+
+    def _stopped_early(self, name: str) -> bool:
+        # an earlier step failed, so `name` will not run until start() is called again
+        thread = self._thread
+        return (thread is None or not thread.is_alive()) and not self._events[name].is_set()
+
+    @property
+    def ready(self) -> bool:
+        return all(ev.is_set() for ev in self._events.values())
+
+    def status(self) -> dict:
+        return {"ready": self.ready, "steps": {name: dict(self._state[name]) for name, _ in self._steps}}
@@ -0,0 +1,65 @@
+# benchmarks/compare.py
+"""
+Diff two benchmark reports:
+
+    python -m benchmarks.compare base.json new.json --threshold 0.10
+
+Prints every numeric metric present in both, and exits 1 if any got worse
+by more than the threshold (lower is better for times, higher for
+throughput and recall). Latencies that moved by less than --floor-ms are
+reported but never flagged: sub-millisecond timings jitter by tens of
+percent between identical runs.
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+from typing import Dict
+
+HIGHER_IS_BETTER = ("rows_per_s", "prompts_per_s", "qps", "recall", "speedup", "cosine")
+# sizes / counts and synthetic data generation, not performance
+IGNORED = {"schema", "catalog_gen_s", "rows", "rows_read", "rows_added", "duplicates", "dim", "prompts",
+           "bytes_per_vector", "cpus"}
+
+
+def flatten(d, prefix: str = "") -> Dict[str, float]:
+    out = {}
+    for k, v in d.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(flatten(v, key + "."))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[key] = float(v)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare two benchmark reports.")
+    ap.add_argument("base")
+    ap.add_argument("new")
+    ap.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    ap.add_argument("--floor-ms", type=float, default=0.25, help="ignore *_ms changes smaller than this")
+    args = ap.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = flatten(json.load(f))
+    with open(args.new, encoding="utf-8") as f:
+        new = flatten(json.load(f))
+
+    regressions = 0
+    for key in sorted(set(base) & set(new)):
+        if key.startswith("meta.") or key.rsplit(".", 1)[-1] in IGNORED:
+            continue
+        b, n = base[key], new[key]
+        change = (n - b) / b if b else 0.0
+        worse = -change if any(s in key for s in HIGHER_IS_BETTER) else change
+        flag = ""
+        noise = key.endswith("_ms") and abs(n - b) < args.floor_ms
+        if worse > args.threshold and not noise:
+            flag, regressions = "  REGRESSION", regressions + 1
+        print(f"{key:60s} {b:14.4f} {n:14.4f} {change:+8.1%}{flag}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# benchmarks/encoder.py
+"""
+Speed / quality trade-off of the TextEmbedder encoder modes on this CPU:
+
+    python -m benchmarks.encoder --rows 2000 --batch-size 32 --threads 4
+    python -m benchmarks.encoder --csv app/data/sample_products.csv --out enc.json
+
+Encodes the same catalog texts with fp32, fp32 + length bucketing, and
+int8 + length bucketing (EMBEDDING_QUANTIZE). For each mode it reports
+rows/s, plus agreement with fp32: per-row cosine, and recall@k of each
+query's nearest catalog rows. Needs sentence-transformers and the model
+(no stand-in: the point is the real model's numbers).
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+import time
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from app.services.ann import batch_topk_inner_product
+from app.services.vector_store import VectorStore
+
+from .run import TEXT_COLS, git_commit
+from .synthetic import make_catalog, make_queries
+
+MODES = {
+    "fp32": dict(quantize=False, bucket=False),
+    "fp32_bucketed": dict(quantize=False, bucket=True),
+    "int8_bucketed": dict(quantize=True, bucket=True),
+}
+
+
+def load_texts(csv: str, rows: int, seed: int) -> List[str]:
+    df = pd.read_csv(csv).head(rows) if csv else make_catalog(rows, seed=seed)
+    return VectorStore._row_texts(df.reindex(columns=TEXT_COLS), TEXT_COLS)
+
+
+def neighbour_recall(ref_docs: np.ndarray, ref_q: np.ndarray, docs: np.ndarray, q: np.ndarray, k: int) -> float:
+    """Mean overlap of each query's top-k rows under `docs` with its top-k under the fp32 `ref_docs`."""
+    _, want = batch_topk_inner_product(ref_docs, ref_q, k)
+    _, got = batch_topk_inner_product(docs, q, k)
+    return float(np.mean([len(set(a) & set(b)) / len(a) for a, b in zip(want, got)]))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare TextEmbedder fp32 / bucketed / int8 modes.")
+    ap.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    ap.add_argument("--csv", default="", help="catalog CSV to take texts from (default: synthetic)")
+    ap.add_argument("--rows", type=int, default=2000)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("-k", type=int, default=10)
+    ap.add_argument("--batch-size", type=int, default=32)
+    ap.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0: torch default)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="", help="write the JSON report here (default: stdout)")
+    args = ap.parse_args()
+
+    from app.services.embeddings import TextEmbedder, cosine_agreement
+    try:
+        import sentence_transformers  # noqa: F401  (TextEmbedder imports it lazily)
+    except ImportError as e:
+        sys.exit(f"benchmarks.encoder needs sentence-transformers: {e}")
+
+    texts = load_texts(args.csv, args.rows, args.seed)
+    queries = make_queries(args.queries, seed=args.seed + 1)
+    report = {"meta": {"commit": git_commit(), "model": args.model, "args": vars(args)}, "modes": {}}
+    ref = None
+    for name, kw in MODES.items():
+        print(f"[encoder] {name} ...", file=sys.stderr, flush=True)
+        emb = TextEmbedder(args.model, batch_size=args.batch_size, threads=args.threads, **kw)
+        emb.encode(texts[:args.batch_size])  # warm-up
+        t0 = time.perf_counter()
+        docs = emb.encode(texts)
+        dt = time.perf_counter() - t0
+        q = emb.encode(queries)
+        res = {"rows": len(texts), "seconds": dt, "rows_per_s": len(texts) / dt}
+        if ref is None:
+            ref = (docs, q, dt)
+        else:
+            res["speedup"] = ref[2] / dt
+            res["cosine"] = cosine_agreement(docs, ref[0])
+            res["neighbour_recall_at_k"] = neighbour_recall(ref[0], ref[1], docs, q, args.k)
+        report["modes"][name] = res
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# benchmarks/lc_sync.py
+"""
+LCRetriever.sync against an in-process Pinecone stand-in:
+
+    python -m benchmarks.lc_sync --rows 20000 --latency-ms 20 --workers 1,4,8
+
+- full: first sync of a synthetic catalog, per upsert concurrency, with
+  `--latency-ms` of simulated round trip per request
+- incremental: re-sync after editing 1% of rows and appending 1% (only those
+  should be sent), then a no-op re-sync
+- delete: re-sync after dropping 0.5% of rows; only those are deleted (rows
+  below them move, but records are keyed by uniq_id, so nothing is re-sent)
+- resume: a sync whose index fails halfway, then a re-run that should send
+  only the unconfirmed rest
+Uses the hashing stand-in encoder; needs langchain-core (LCRetriever's base).
+"""
+from __future__ import annotations
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+
+import pandas as pd
+
+from .run import TEXT_COLS, git_commit
+from .standin import HashingEmbedder, InMemoryPineconeIndex
+from .synthetic import make_catalog
+
+
+def make_retriever(index_dir: str, embedder):
+    from app.services.lc_search import LCRetriever
+    return LCRetriever(index_dir=index_dir, use_pinecone=True, pinecone_api_key=None, pinecone_index="standin",
+                       pinecone_cloud=None, pinecone_region=None, emb_model="", embedder=embedder)
+
+
+def edit_catalog(df: pd.DataFrame, seed: int) -> pd.DataFrame:
+    """1% of rows retitled, 1% new rows appended."""
+    out = df.copy()
+    changed = out.sample(frac=0.01, random_state=seed).index
+    out.loc[changed, "title"] = out.loc[changed, "title"] + " (2nd edition)"
+    added = make_catalog(max(1, len(df) // 100), seed=seed + 1, id_prefix="new-")
+    return pd.concat([out, added], ignore_index=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Time LCRetriever bulk / incremental sync on a Pinecone stand-in.")
+    ap.add_argument("--rows", type=int, default=20000)
+    ap.add_argument("--workers", default="1,4,8", help="upsert concurrency levels to time the full sync with")
+    ap.add_argument("--batch-size", type=int, default=256, help="rows per embedding batch")
+    ap.add_argument("--upsert-batch", type=int, default=100, help="records per upsert request")
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="simulated round trip per request")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="", help="write the JSON report here (default: stdout)")
+    args = ap.parse_args()
+
+    try:
+        import app.services.lc_search  # noqa: F401
+    except ImportError as e:
+        sys.exit(f"benchmarks.lc_sync needs langchain-core: {e}")
+
+    df = make_catalog(args.rows, seed=args.seed)
+    embedder = HashingEmbedder()
+    latency = args.latency_ms / 1000.0
+    kw = dict(batch_size=args.batch_size, upsert_batch=args.upsert_batch)
+    report = {"meta": {"commit": git_commit(), "args": vars(args)}, "full": {}}
+    workdir = tempfile.mkdtemp(prefix="lc-sync-")
+    try:
+        base = None
+        for w in [int(x) for x in args.workers.split(",")]:
+            print(f"[lc_sync] full sync, {w} workers ...", file=sys.stderr, flush=True)
+            index = InMemoryPineconeIndex(latency=latency)
+            retriever = make_retriever(tempfile.mkdtemp(dir=workdir), embedder)
+            res = retriever.sync(df, TEXT_COLS, workers=w, index=index, **kw)
+            res["rows_per_s"] = len(df) / res["seconds"]
+            base = base or res["seconds"]
+            res["speedup"] = base / res["seconds"]
+            report["full"][f"workers_{w}"] = res
+
+        print("[lc_sync] incremental ...", file=sys.stderr, flush=True)
+        edited = edit_catalog(df, args.seed)
+        inc = retriever.sync(edited, TEXT_COLS, workers=w, index=index, **kw)
+        inc["index_matches_catalog"] = index.describe_index_stats()["total_vector_count"] == edited["uniq_id"].nunique()
+        report["incremental"] = inc
+        report["noop"] = retriever.sync(edited, TEXT_COLS, workers=w, index=index, **kw)
+        dropped = edited.drop(edited.sample(n=max(1, len(df) // 200), random_state=args.seed + 2).index)
+        report["delete"] = retriever.sync(dropped.reset_index(drop=True), TEXT_COLS, workers=w, index=index, **kw)
+
+        print("[lc_sync] resume ...", file=sys.stderr, flush=True)
+        calls = -(-len(df) // args.upsert_batch)
+        index = InMemoryPineconeIndex(latency=latency, fail_after=calls // 2)
+        retriever = make_retriever(tempfile.mkdtemp(dir=workdir), embedder)
+        try:
+            retriever.sync(df, TEXT_COLS, workers=w, index=index, **kw)
+        except ConnectionError:
+            pass
+        confirmed = len(retriever.sync_state())
+        index.fail_after = None
+        resumed = retriever.sync(df, TEXT_COLS, workers=w, index=index, **kw)
+        report["resume"] = {"confirmed_before_failure": confirmed, "resent": resumed["upserted"],
+                            "complete": len(retriever.sync_state()) == df["uniq_id"].nunique()}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
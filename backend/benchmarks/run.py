@@ -0,0 +1,259 @@
+# benchmarks/run.py
+"""
+Offline benchmark suite; writes a JSON report to diff between commits.
+
+    python -m benchmarks.run --sizes 1k,100k --out bench.json
+    python -m benchmarks.run --sizes 1m --configs exact/float32,ivf/int8
+    python -m benchmarks.compare old.json bench.json
+
+Everything runs against seeded synthetic catalogs (benchmarks.synthetic) and
+a hashing stand-in encoder (benchmarks.standin), so numbers measure this
+code, not model quality. --model / --genai-model swap in real models when
+they are installed locally.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from app.services.analytics import AnalyticsAggregator, compute_analytics
+from app.services.catalog import Catalog, normalize_frame
+from app.services.ingest import IngestQueue
+from app.services.vector_store import VectorStore
+
+from .standin import HashingEmbedder, PrecomputedEmbedder
+from .synthetic import make_catalog, make_queries
+
+TEXT_COLS = ["title", "description", "categories", "brand", "material", "color"]
+SCHEMA = 1
+
+
+def parse_size(s: str) -> int:
+    s = s.strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(s[-1:], 1)
+    return int(float(s.rstrip("km")) * mult)
+
+
+def latency_ms(fn: Callable[[object], object], inputs: List[object], warmup: int = 5,
+               repeat: int = 3) -> Dict[str, float]:
+    """Per-call latency over `inputs`; each statistic is the best of `repeat` passes (shared boxes are noisy)."""
+    for x in inputs[:warmup]:
+        fn(x)
+    runs = []
+    for _ in range(max(1, repeat)):
+        times = []
+        for x in inputs:
+            t0 = time.perf_counter()
+            fn(x)
+            times.append((time.perf_counter() - t0) * 1000.0)
+        t = np.asarray(times)
+        runs.append((np.percentile(t, 50), np.percentile(t, 99), t.mean()))
+    p50, p99, mean = np.min(np.asarray(runs), axis=0)
+    return {"p50_ms": float(p50), "p99_ms": float(p99), "mean_ms": float(mean)}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       text=True).strip()
+    except Exception:
+        return ""
+
+
+def make_encoder(model: str):
+    if not model:
+        return HashingEmbedder()
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model)
+
+
+# -------- individual benchmarks --------
+def bench_encode(encoder, texts: List[str], batch: int = 256) -> dict:
+    t0 = time.perf_counter()
+    vecs = [encoder.encode(texts[i:i + batch]) for i in range(0, len(texts), batch)]
+    dt = time.perf_counter() - t0
+    vecs = np.vstack(vecs).astype("float32")
+    return {"rows": len(texts), "seconds": dt, "rows_per_s": len(texts) / dt, "dim": int(vecs.shape[1])}, vecs
+
+
+def bench_text_embedder(encoder, texts: List[str], cache_dir: str) -> dict:
+    """TextEmbedder on top of the stand-in: cold (fills the disk cache) vs warm (all hits)."""
+    try:
+        from app.services.embeddings import TextEmbedder
+    except ImportError as e:
+        return {"skipped": f"app.services.embeddings not importable: {e}"}
+    from app.services.embedding_cache import EmbeddingCache
+
+    emb = TextEmbedder.__new__(TextEmbedder)  # reuse the wrapper, skip the model download
+    emb.model_name, emb.model = "bench-standin", encoder
+    emb.cache = EmbeddingCache(cache_dir, emb.model_name)
+    out = {}
+    for phase in ("cold", "warm"):
+        t0 = time.perf_counter()
+        for i in range(0, len(texts), 256):
+            emb.encode(texts[i:i + 256])
+        dt = time.perf_counter() - t0
+        out[f"{phase}_rows_per_s"] = len(texts) / dt
+    return out
+
+
+def bench_index(df: pd.DataFrame, vecs: np.ndarray, encoder, qvecs: np.ndarray, queries: List[str],
+                config: str, k: int, workdir: str) -> dict:
+    index_type, storage = config.split("/")
+    vs = VectorStore(os.path.join(workdir, config.replace("/", "-")), index_type=index_type, storage=storage)
+    t0 = time.perf_counter()
+    vs.build(df, PrecomputedEmbedder(vecs, encoder), text_cols=TEXT_COLS)  # vectors + BM25, no encoding
+    out = {"build_s": time.perf_counter() - t0}
+
+    out["dense"] = latency_ms(lambda q: vs.search_embedding(q, top_k=k), list(qvecs))
+    out["dense_batch_qps"] = len(qvecs) / max(1e-9, min(_timeit(lambda: vs.search_batch(qvecs, top_k=k))
+                                                        for _ in range(3)))
+    rec = vs.recall_at_k(k=k, queries=qvecs)
+    out["recall_at_k"] = rec["recall"]
+    out["bytes_per_vector"] = rec["bytes_per_vector"]
+    pairs = list(zip(queries, qvecs))
+    for mode in ("lexical", "hybrid", "shortlist"):
+        out[mode] = latency_ms(lambda p, m=mode: vs.search_text(p[0], p[1], top_k=k, mode=m), pairs)
+    return out
+
+
+def _timeit(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def bench_analytics(df: pd.DataFrame) -> dict:
+    norm_df = df.assign(price_num=pd.to_numeric(df["price"].str.lstrip("$"), errors="coerce"))
+    out = {"compute_analytics_s": _timeit(lambda: compute_analytics(norm_df))}
+    agg = AnalyticsAggregator.from_frame(norm_df)
+    chunk = norm_df.head(1000)
+    out["update_1k_ms"] = _timeit(lambda: agg.update(chunk)) * 1000.0
+    out["summary_ms"] = latency_ms(lambda _: agg.summary(), [None] * 200)["p50_ms"]
+    return out
+
+
+def bench_ingest(base: pd.DataFrame, encoder, n_rows: int, workdir: str, chunk_rows: int = 2000) -> dict:
+    """Chunked upload path: parse CSV, de-duplicate, normalize, embed, append (as /data/upload does)."""
+    catalog = Catalog(normalize_frame(base))
+    vs = VectorStore(os.path.join(workdir, "ingest"))
+    vs.build(catalog.df, encoder, text_cols=TEXT_COLS)
+
+    feed = make_catalog(n_rows, seed=7, id_prefix="up-")
+    # 5% duplicates of existing rows, as supplier feeds re-send items
+    feed = pd.concat([feed, base.sample(n=max(1, n_rows // 20), random_state=0)], ignore_index=True)
+    path = os.path.join(workdir, "feed.csv")
+    feed.to_csv(path, index=False)
+
+    def apply_chunk(rows: pd.DataFrame):
+        norm = catalog.normalize(rows)
+        embs = vs.embed(norm, encoder, TEXT_COLS)
+        catalog.append(norm, normalized=True)
+        vs.append(norm, text_cols=TEXT_COLS, embeddings=embs)
+
+    queue = IngestQueue(apply_chunk, is_known=catalog.__contains__, chunk_rows=chunk_rows)
+    job = queue.submit(path, filename="feed.csv")
+    job.done.wait()
+    st = job.status()
+    if st["state"] != "done":
+        return {"error": st["error"]}
+    return {"rows_read": st["rows_read"], "rows_added": st["rows_added"], "duplicates": st["duplicates"],
+            "seconds": job.finished - job.started, "rows_per_s": st["rows_per_s"]}
+
+
+def bench_generation(model: str, rows: List[dict], n: int) -> dict:
+    from app.services.genai import DescriptionGenerator, product_prompt
+    prompts = [product_prompt(r, "cozy reading chair") for r in rows[:n]]
+    gen = DescriptionGenerator(model_name=model)
+    if gen.pipe is None:
+        return {"skipped": f"model {model!r} could not be loaded"}
+    dt = _timeit(lambda: gen.generate_batch(prompts))
+    return {"prompts": len(prompts), "seconds": dt, "prompts_per_s": len(prompts) / dt}
+
+
+# -------- driver --------
+def run_size(n: int, args, encoder) -> dict:
+    workdir = tempfile.mkdtemp(prefix=f"bench-{n}-")
+    try:
+        res: dict = {}
+        t0 = time.perf_counter()
+        df = make_catalog(n, seed=args.seed)
+        res["catalog_gen_s"] = time.perf_counter() - t0
+
+        texts = VectorStore._row_texts(df, TEXT_COLS)  # same texts the index build encodes
+        res["encode"], vecs = bench_encode(encoder, texts)
+        vecs /= np.linalg.norm(vecs, axis=1, keepdims=True) + 1e-12
+        res["text_embedder"] = bench_text_embedder(encoder, texts[:min(n, 20000)], os.path.join(workdir, "ec"))
+
+        queries = make_queries(args.queries, seed=args.seed + 1)
+        qvecs = np.asarray(encoder.encode(queries), dtype="float32")
+        qvecs /= np.linalg.norm(qvecs, axis=1, keepdims=True) + 1e-12
+        res["index"] = {c: bench_index(df, vecs, encoder, qvecs, queries, c, args.k, workdir)
+                        for c in args.configs.split(",")}
+        del vecs
+
+        res["analytics"] = bench_analytics(df)
+        if args.ingest_rows:
+            res["ingest"] = bench_ingest(df, encoder, min(args.ingest_rows, max(1000, n // 10)), workdir)
+        if args.genai_model:
+            res["generation"] = bench_generation(args.genai_model, df.head(64).to_dict("records"), 16)
+        return res
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark search, embedding, analytics and ingestion.")
+    ap.add_argument("--sizes", default="1k,100k", help="catalog sizes, e.g. 1k,100k,1m")
+    ap.add_argument("--configs", default="exact/float32,ivf/float32,exact/int8",
+                    help="index_type/storage pairs to build and query")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("-k", type=int, default=10)
+    ap.add_argument("--ingest-rows", type=int, default=20000, help="upload size cap (0 skips ingestion)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--model", default="", help="sentence-transformer to use instead of the stand-in")
+    ap.add_argument("--genai-model", default="", help="also time DescriptionGenerator with this model")
+    ap.add_argument("--out", default="", help="write the JSON report here (default: stdout)")
+    args = ap.parse_args()
+
+    encoder = make_encoder(args.model)
+    report = {
+        "schema": SCHEMA,
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "encoder": args.model or "hashing-standin",
+            "args": vars(args),
+        },
+        "sizes": {},
+    }
+    for s in args.sizes.split(","):
+        n = parse_size(s)
+        print(f"[bench] {n} rows ...", file=sys.stderr, flush=True)
+        report["sizes"][str(n)] = run_size(n, args, encoder)
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/standin.py
+"""Offline stand-ins: hashed word/bigram features for the sentence-transformer, an in-process Pinecone index."""
+from __future__ import annotations
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+
+
+class HashingEmbedder:
+    """
+    Deterministic, dependency-light text encoder with the `encode` interface
+    used by VectorStore / SentenceTransformer. Related texts share tokens, so
+    neighbours are meaningful enough for recall and latency measurements; it
+    says nothing about semantic quality.
+    """
+    def __init__(self, dim: int = 64, seed: int = 0):
+        self.dim = dim
+        # hash into a wider sparse space, then project down (dense, like a real model)
+        self._vec = HashingVectorizer(n_features=4096, ngram_range=(1, 2), alternate_sign=False, norm="l2")
+        self._proj = np.random.default_rng(seed).standard_normal((4096, dim)).astype("float32") / np.sqrt(dim)
+
+    def encode(self, texts: Union[str, List[str]], **kw) -> np.ndarray:
+        if isinstance(texts, str):
+            texts = [texts]
+        x = self._vec.transform(texts)
+        return np.asarray(x @ self._proj, dtype="float32")
+
+
+class PrecomputedEmbedder:
+    """Returns fixed vectors for the full-catalog encode, so index builds time only indexing."""
+    def __init__(self, vectors: np.ndarray, fallback):
+        self.vectors = vectors
+        self.fallback = fallback
+
+    def encode(self, texts, **kw) -> np.ndarray:
+        if not isinstance(texts, str) and len(texts) == len(self.vectors):
+            return self.vectors
+        return self.fallback.encode(texts)
+
+
+class InMemoryPineconeIndex:
+    """
+    In-process stand-in for a pinecone.Index: upsert / delete / fetch / query /
+    describe_index_stats with dict records, thread-safe. `latency` seconds
+    are slept per call to mimic a network round trip (so request concurrency
+    shows up in timings); after `fail_after` upsert calls every upsert raises
+    ConnectionError, to exercise resumable syncs.
+    """
+    def __init__(self, latency: float = 0.0, fail_after: Optional[int] = None):
+        self.latency = latency
+        self.fail_after = fail_after
+        self.calls: Counter = Counter()
+        self._values: Dict[str, np.ndarray] = {}
+        self._metadata: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors: List[dict], namespace: str = "", **kw) -> dict:
+        with self._lock:
+            self.calls["upsert"] += 1
+            if self.fail_after is not None and self.calls["upsert"] > self.fail_after:
+                raise ConnectionError("stand-in index unavailable")
+        time.sleep(self.latency)
+        with self._lock:
+            for v in vectors:
+                self._values[v["id"]] = np.asarray(v["values"], dtype="float32")
+                self._metadata[v["id"]] = dict(v.get("metadata") or {})
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids: List[str], namespace: str = "", **kw) -> dict:
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls["delete"] += 1
+            for i in ids:
+                self._values.pop(i, None)
+                self._metadata.pop(i, None)
+        return {}
+
+    def fetch(self, ids: List[str], namespace: str = "", **kw) -> dict:
+        with self._lock:
+            return {"vectors": {i: {"id": i, "values": self._values[i].tolist(), "metadata": self._metadata[i]}
+                                for i in ids if i in self._values}}
+
+    def query(self, vector: List[float], top_k: int = 10, include_metadata: bool = False, namespace: str = "",
+              **kw) -> dict:
+        with self._lock:
+            ids = list(self._values)
+            mat = np.stack([self._values[i] for i in ids]) if ids else np.zeros((0, len(vector)), dtype="float32")
+        q = np.asarray(vector, dtype="float32")
+        sims = mat @ q / (np.linalg.norm(mat, axis=1) * np.linalg.norm(q) + 1e-12)
+        order = np.argsort(-sims)[:top_k]
+        return {"matches": [{"id": ids[j], "score": float(sims[j]),
+                             **({"metadata": self._metadata[ids[j]]} if include_metadata else {})} for j in order]}
+
+    def describe_index_stats(self, **kw) -> dict:
+        with self._lock:
+            dim = len(next(iter(self._values.values()))) if self._values else 0
+            return {"dimension": dim, "total_vector_count": len(self._values)}
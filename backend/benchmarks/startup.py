@@ -0,0 +1,124 @@
+# benchmarks/startup.py
+"""
+Startup budget check: how long `import app.main` takes and what it pulls in.
+
+    python -m benchmarks.startup --budget-s 2.5
+    python -m benchmarks.startup --serve --out startup.json
+
+Imports app.main in fresh interpreters (best of --repeats) and exits 1 if
+the import exceeds the budget, loads any model / ML library listed in HEAVY,
+or reads the catalog: those belong on the warm-up thread, not the import
+path. --serve also starts uvicorn and times the first 200 from /healthz
+(liveness) and from /readyz (warm-up done, index live; needs the models).
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Optional
+
+from .run import git_commit
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_BUDGET_S = 2.5  # also enforced by tests/test_startup.py
+
+# must not be imported by `import app.main`
+HEAVY = ("torch", "torchvision", "sentence_transformers", "transformers", "sklearn", "scipy",
+         "langchain", "langchain_community", "pinecone")
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import app.main as m
+dt = time.perf_counter() - t0
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print(json.dumps({{"import_s": dt, "heavy": heavy, "catalog_loaded": m.catalog is not None}}))
+"""
+
+
+def probe_import() -> dict:
+    out = subprocess.run([sys.executable, "-c", _PROBE.format(heavy=HEAVY)], cwd=BACKEND_DIR,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(url: str, t0: float, timeout: float) -> Optional[float]:
+    """Seconds from t0 until `url` answers 200 (None on timeout)."""
+    while time.perf_counter() - t0 < timeout:
+        try:
+            with urllib.request.urlopen(url, timeout=1.0) as r:
+                if r.status == 200:
+                    return time.perf_counter() - t0
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.05)
+    return None
+
+
+def probe_serve(timeout: float) -> dict:
+    port = _free_port()
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+                            cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base = f"http://127.0.0.1:{port}"
+        live = _wait_for(base + "/healthz", t0, timeout)
+        ready = _wait_for(base + "/readyz", t0, timeout) if live is not None else None
+        return {"healthz_s": live, "readyz_s": ready}
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Check the app's import-time budget.")
+    ap.add_argument("--budget-s", type=float, default=DEFAULT_BUDGET_S, help="max seconds for `import app.main`")
+    ap.add_argument("--repeats", type=int, default=3)
+    ap.add_argument("--serve", action="store_true", help="also time /healthz and /readyz under uvicorn")
+    ap.add_argument("--timeout", type=float, default=300.0, help="max seconds to wait for --serve endpoints")
+    ap.add_argument("--out", default="", help="write the JSON report here (default: stdout)")
+    args = ap.parse_args()
+
+    runs = [probe_import() for _ in range(max(1, args.repeats))]
+    best = min(runs, key=lambda r: r["import_s"])
+    startup = {"import_s": best["import_s"]}
+    if args.serve:
+        startup.update({k: v for k, v in probe_serve(args.timeout).items() if v is not None})
+    report = {"meta": {"commit": git_commit(), "python": sys.version.split()[0], "args": vars(args)},
+              "startup": startup}
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    problems = []
+    if best["import_s"] > args.budget_s:
+        problems.append(f"import took {best['import_s']:.2f}s (budget {args.budget_s:.2f}s)")
+    heavy = sorted({name for r in runs for name in r["heavy"]})
+    if heavy:
+        problems.append(f"imported at startup: {', '.join(heavy)}")
+    if any(r["catalog_loaded"] for r in runs):
+        problems.append("catalog loaded at import")
+    for p in problems:
+        print(f"[startup] FAIL: {p}", file=sys.stderr)
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
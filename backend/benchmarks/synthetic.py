@@ -0,0 +1,88 @@
+# benchmarks/synthetic.py
+"""Seeded synthetic furniture catalogs and queries (same columns as the real CSV)."""
+from __future__ import annotations
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+ADJECTIVES = ["Modern", "Rustic", "Mid-Century", "Industrial", "Scandinavian", "Vintage", "Minimalist",
+              "Farmhouse", "Contemporary", "Classic", "Compact", "Oversized", "Folding", "Adjustable",
+              "Upholstered", "Tufted", "Convertible", "Stackable", "Ergonomic", "Outdoor"]
+MATERIALS = ["Wood", "Teak", "Oak", "Walnut", "Pine", "Bamboo", "Metal", "Steel", "Iron", "Aluminum",
+             "Glass", "Marble", "Rattan", "Wicker", "Leather", "Faux Leather", "Velvet", "Linen",
+             "Fabric", "Plastic"]
+COLORS = ["Black", "White", "Gray", "Brown", "Beige", "Navy", "Green", "Walnut", "Natural", "Espresso",
+          "Cream", "Blue", "Pink", "Yellow", "Teal", "Charcoal"]
+PRODUCTS = {
+    "Living Room Furniture": ["Sofa", "Loveseat", "Coffee Table", "Side Table", "TV Stand", "Armchair",
+                              "Accent Chair", "Ottoman", "Recliner", "Bookshelf"],
+    "Bedroom Furniture": ["Bed Frame", "Nightstand", "Dresser", "Wardrobe", "Headboard", "Vanity Stool"],
+    "Kitchen & Dining Room Furniture": ["Dining Table", "Dining Chair", "Bar Stool", "Bench", "Buffet Cabinet"],
+    "Home Office Furniture": ["Computer Desk", "Office Chair", "Filing Cabinet", "Standing Desk"],
+    "Storage & Organization": ["Shoe Rack", "Storage Cabinet", "Coat Rack", "Wall Shelf", "Storage Bench"],
+    "Patio Furniture & Accessories": ["Adirondack Chair", "Patio Set", "Porch Swing", "Hammock"],
+}
+COUNTRIES = ["China", "USA", "Vietnam", "India", "Malaysia", "Indonesia", "Mexico", ""]
+
+
+def _brands(rng: np.random.Generator, n: int) -> np.ndarray:
+    letters = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+    lens = rng.integers(4, 9, size=n)
+    return np.array(["".join(rng.choice(letters, size=k)) for k in lens], dtype=object)
+
+
+def make_catalog(n: int, seed: int = 0, id_prefix: str = "") -> pd.DataFrame:
+    """`n` rows with the catalog's columns; deterministic for a given (n, seed, id_prefix)."""
+    rng = np.random.default_rng(seed)
+    cats = np.array(list(PRODUCTS), dtype=object)
+    cat_idx = rng.integers(0, len(cats), size=n)
+    kinds = np.empty(n, dtype=object)
+    for i, c in enumerate(cats):
+        sel = cat_idx == i
+        kinds[sel] = rng.choice(np.array(PRODUCTS[c], dtype=object), size=int(sel.sum()))
+
+    brand_pool = _brands(rng, max(50, n // 200))
+    # Zipf-ish brand popularity, like real marketplaces
+    weights = 1.0 / np.arange(1, len(brand_pool) + 1)
+    brand = rng.choice(brand_pool, size=n, p=weights / weights.sum())
+    adj = rng.choice(np.array(ADJECTIVES, dtype=object), size=n)
+    material = rng.choice(np.array(MATERIALS, dtype=object), size=n)
+    color = rng.choice(np.array(COLORS, dtype=object), size=n)
+    price = np.round(np.exp(rng.normal(4.3, 0.9, size=n)), 2)
+
+    title = brand + " " + adj + " " + material + " " + kinds + ", " + color
+    lower = lambda a: pd.Series(a).str.lower().to_numpy(dtype=object)
+    description = ("A " + lower(adj) + " " + lower(kinds) + " made of " + lower(material)
+                   + ". Easy to assemble and built for everyday use in the " + color + " finish.")
+    categories = "['Home & Kitchen', 'Furniture', '" + cats[cat_idx] + "', '" + kinds + "']"
+    images = "['https://m.media-amazon.com/images/I/" + pd.Series(rng.integers(10**9, 10**10, size=n)).astype(str).to_numpy(dtype=object) + ".jpg']"
+    ids = pd.Series(rng.integers(0, 2**63 - 1, size=n, dtype=np.int64)).map(lambda v: f"{v:016x}")
+
+    return pd.DataFrame({
+        "uniq_id": id_prefix + ids,
+        "title": title,
+        "brand": brand,
+        "description": description,
+        "price": "$" + pd.Series(price).astype(str),
+        "categories": categories,
+        "images": images,
+        "manufacturer": brand,
+        "package dimensions": "",
+        "country_of_origin": rng.choice(np.array(COUNTRIES, dtype=object), size=n),
+        "material": material,
+        "color": color,
+    })
+
+
+def make_queries(n: int, seed: int = 1) -> List[str]:
+    """Shopper-style queries: "<adjective> <material> <product>", some with a color."""
+    rng = np.random.default_rng(seed)
+    kinds = [k for ks in PRODUCTS.values() for k in ks]
+    out = []
+    for _ in range(n):
+        parts = [rng.choice(ADJECTIVES), rng.choice(MATERIALS), rng.choice(kinds)]
+        if rng.random() < 0.4:
+            parts.insert(0, rng.choice(COLORS))
+        out.append(" ".join(parts).lower())
+    return out
@@ -0,0 +1,61 @@
+# tests/test_analytics.py
+"""Incremental analytics aggregates and the conditional GET (ETag / If-None-Match) helper."""
+import pandas as pd
+import pytest
+
+from app.main import etag_matches
+from app.services.analytics import AnalyticsAggregator
+from app.services.catalog import normalize_frame
+from benchmarks.synthetic import make_catalog
+
+
+@pytest.mark.parametrize("header, expected", [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"x", "abc"', True),
+    ('"x",W/"abc" ', True),
+    ("*", True),
+    ('"abcd"', False),
+    ('"ab,c"', False),
+    ("abc", False),
+    ("", False),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, '"abc"') is expected
+
+
+def test_etag_matches_without_an_etag():
+    assert not etag_matches("*", "")
+
+
+def test_incremental_updates_match_a_full_recompute():
+    df = normalize_frame(make_catalog(500, seed=7))
+    agg = AnalyticsAggregator.from_frame(df.iloc[:200])
+    agg.update(df.iloc[200:350])
+    agg.update(df.iloc[350:])
+    full = AnalyticsAggregator.from_frame(df)
+    summary, expected = dict(agg.summary()), dict(full.summary())
+    assert summary["avg_price"] is not None
+    for key in ("avg_price", "price_quantiles"):  # float sums in a different order
+        assert summary.pop(key) == pytest.approx(expected.pop(key))
+    assert summary == expected
+    # the ETag is a content hash: equal data, equal tag (across workers and restarts)
+    assert agg.etag == full.etag
+
+
+def test_snapshot_pairs_the_summary_with_its_etag():
+    df = normalize_frame(make_catalog(100, seed=8))
+    agg = AnalyticsAggregator.from_frame(df.iloc[:50])
+    summary, etag = agg.snapshot()
+    agg.update(df.iloc[50:])
+    new_summary, new_etag = agg.snapshot()
+    assert (summary["count"], new_summary["count"]) == (50, 100)
+    assert etag != new_etag
+    assert AnalyticsAggregator.from_frame(df.iloc[:50]).etag == etag
+    assert (agg.summary(), agg.etag) == (new_summary, new_etag)
+
+
+def test_empty_catalog():
+    summary, etag = AnalyticsAggregator.from_frame(pd.DataFrame(columns=["price", "brand", "categories"])).snapshot()
+    assert summary["count"] == 0 and summary["avg_price"] is None
+    assert etag.startswith('"') and etag.endswith('"')
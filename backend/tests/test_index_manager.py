@@ -0,0 +1,119 @@
+# tests/test_index_manager.py
+"""IndexManager generations: rebuild, fork -> append -> publish, discard and gc of drafts."""
+import os
+
+import numpy as np
+import pytest
+
+from app.services.index_manager import CURRENT_FILE, DRAFT_FILE, IndexManager
+from app.services.vector_store import VectorStore
+from benchmarks.standin import HashingEmbedder
+from benchmarks.synthetic import make_catalog
+
+TEXT_COLS = ["title", "description"]
+
+
+@pytest.fixture(scope="module")
+def embedder():
+    return HashingEmbedder(dim=16)
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return make_catalog(300, seed=5)
+
+
+@pytest.fixture
+def manager(tmp_path, catalog, embedder):
+    mgr = IndexManager(str(tmp_path), lambda path: VectorStore(path),
+                       fork_factory=lambda path: VectorStore(path, mmap=True))
+    mgr.rebuild(lambda vs: vs.build(catalog.iloc[:200], embedder, TEXT_COLS)).result()
+    return mgr
+
+
+def live_name(mgr: IndexManager) -> str:
+    with open(os.path.join(mgr.root, CURRENT_FILE), encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def append(vs: VectorStore, rows, embedder) -> int:
+    return vs.append(rows, embeddings=vs.embed(rows, embedder))
+
+
+def test_rebuild_publishes_a_generation(manager):
+    assert manager.status()["generation"] == live_name(manager)
+    assert manager.store().n == 200
+    assert manager.status()["last_build"]["state"] == "done"
+
+
+def test_fork_is_private_until_published(manager, catalog, embedder):
+    base = live_name(manager)
+    base_size = os.path.getsize(os.path.join(manager.root, base, "vectors.npy"))
+
+    fork = manager.fork()
+    assert fork.base == base and fork.vs.mmap
+    assert os.path.isfile(os.path.join(manager.root, fork.name, DRAFT_FILE))
+    append(fork.vs, catalog.iloc[200:250], embedder)
+    append(fork.vs, catalog.iloc[250:300], embedder)
+    # the published generation is never written to
+    assert live_name(manager) == base
+    assert manager.store().n == 200
+    assert os.path.getsize(os.path.join(manager.root, base, "vectors.npy")) == base_size
+
+    assert manager.publish(fork)
+    assert live_name(manager) == fork.name
+    assert manager.current() is fork.vs and manager.current().n == 300
+    assert not os.path.exists(os.path.join(manager.root, fork.name, DRAFT_FILE))
+    reopened = VectorStore(os.path.join(manager.root, fork.name))
+    np.testing.assert_allclose(reopened.vectors, reopened.embed(catalog, embedder), atol=1e-5)
+
+
+def test_publish_discards_fork_when_finalize_declines(manager, catalog, embedder):
+    base = live_name(manager)
+    fork = manager.fork()
+    append(fork.vs, catalog.iloc[200:210], embedder)
+    assert not manager.publish(fork, finalize=lambda vs: False)
+    assert live_name(manager) == base
+    assert not os.path.exists(os.path.join(manager.root, fork.name))
+    assert manager.store().n == 200
+
+
+def test_failed_finalize_keeps_the_live_generation(manager):
+    base = live_name(manager)
+    fork = manager.fork()
+
+    def finalize(vs):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        manager.publish(fork, finalize=finalize)
+    assert live_name(manager) == base
+    assert not os.path.exists(os.path.join(manager.root, fork.name))
+
+
+def test_extend_publishes_only_when_apply_succeeds(manager, catalog, embedder):
+    vs = manager.extend(lambda vs: append(vs, catalog.iloc[200:220], embedder) == 220)
+    assert vs.n == 220 and manager.store().n == 220
+    base = live_name(manager)
+    assert manager.extend(lambda vs: False).n == 220
+    assert live_name(manager) == base
+
+
+def test_fork_before_anything_is_published(tmp_path):
+    mgr = IndexManager(str(tmp_path), lambda path: VectorStore(path))
+    assert mgr.fork() is None
+    assert mgr.extend(lambda vs: True) is None
+
+
+def test_gc_keeps_active_drafts_and_collects_stale_ones(manager, catalog, embedder):
+    manager.keep, manager.gc_grace = 1, 0.0
+    draft = manager.fork()
+    manager.extend(lambda vs: append(vs, catalog.iloc[200:210], embedder) == 210)
+    manager.extend(lambda vs: append(vs, catalog.iloc[210:220], embedder) == 220)
+
+    manager.gc()
+    assert manager.generations() == sorted([draft.name, live_name(manager)])
+
+    manager.draft_ttl = 0.0
+    assert manager.gc() == [draft.name]
+    assert manager.generations() == [live_name(manager)]
@@ -0,0 +1,104 @@
+# tests/test_ingest.py
+"""UploadStore log replay (torn / unfinished lines, tail) and the chunked IngestQueue."""
+import json
+
+import pandas as pd
+import pytest
+
+from app.services.ingest import IngestQueue, UploadStore, clean_chunk
+
+
+def rows(*ids) -> pd.DataFrame:
+    return pd.DataFrame({"uniq_id": list(ids), "title": [f"item {i}" for i in ids]})
+
+
+def replay(store: UploadStore, **kw) -> list:
+    return [r for frame in store.frames(**kw) for r in frame["uniq_id"]]
+
+
+def test_replay_returns_logged_rows_in_order(tmp_path):
+    store = UploadStore(str(tmp_path / "uploads.jsonl"))
+    assert replay(store) == []
+    store.append(rows("a", "b"))
+    store.append(rows("c"))
+    assert replay(store, chunk_rows=2) == ["a", "b", "c"]
+    assert [len(f) for f in store.frames(chunk_rows=2)] == [2, 1]
+
+
+def test_replay_skips_torn_lines_and_leaves_unfinished_line(tmp_path):
+    path = tmp_path / "uploads.jsonl"
+    store = UploadStore(str(path))
+    store.append(rows("a"))
+    with open(path, "ab") as f:
+        f.write(b'{"uniq_id": "torn", "tit\n')               # a writer died mid-line earlier
+        f.write(json.dumps({"uniq_id": "b"}).encode() + b"\n")
+        f.write(b'{"uniq_id": "c", "title": "still bei')      # being written right now
+    assert replay(store) == ["a", "b"]
+    assert store.offset < path.stat().st_size
+
+    # the next writer starts a fresh line instead of gluing onto the partial one
+    store.append(rows("d"))
+    assert replay(UploadStore(str(path))) == ["a", "b", "d"]
+
+
+def test_tail_returns_rows_appended_by_other_writers(tmp_path):
+    path = str(tmp_path / "uploads.jsonl")
+    reader, writer = UploadStore(path), UploadStore(path)
+    writer.append(rows("a", "b"))
+    assert replay(reader) == ["a", "b"]
+    assert [r for f in reader.tail() for r in f["uniq_id"]] == []
+    writer.append(rows("c"))
+    assert [r for f in reader.tail() for r in f["uniq_id"]] == ["c"]
+    assert [r for f in reader.tail() for r in f["uniq_id"]] == []
+
+
+def test_clean_chunk_drops_missing_and_duplicate_ids():
+    chunk = pd.DataFrame({"uniq_id": [" a ", None, "b", "a", "known", ""], "title": list("uvwxyz")})
+    out, invalid, dupes = clean_chunk(chunk, lambda uid: uid == "known")
+    assert out["uniq_id"].tolist() == ["a", "b"]
+    assert (invalid, dupes) == (2, 2)
+
+
+def write_csv(path, ids) -> str:
+    rows(*ids).to_csv(path, index=False)
+    return str(path)
+
+
+def test_queue_applies_chunks_then_finishes(tmp_path):
+    seen, known = [], {"k"}
+    applied = lambda chunk: seen.append(chunk["uniq_id"].tolist()) or known.update(chunk["uniq_id"])
+    queue = IngestQueue(applied, known.__contains__, finish=lambda: len(known), chunk_rows=2)
+    job = queue.submit(write_csv(tmp_path / "up.csv", ["a", "b", "k", "c", "a"]))
+    assert job.done.wait(10)
+
+    st = job.status()
+    assert st["state"] == "done" and st["error"] is None
+    assert seen == [["a", "b"], ["c"]]
+    assert (st["chunks"], st["rows_read"], st["rows_added"], st["duplicates"]) == (3, 5, 3, 2)
+    assert st["rows"] == 4 and st["progress"] == 1.0
+    assert not (tmp_path / "up.csv").exists()
+    assert queue.get(job.id) is job
+
+
+def test_queue_runs_finish_after_a_failed_chunk(tmp_path):
+    finished = []
+
+    def apply(chunk):
+        if "bad" in set(chunk["uniq_id"]):
+            raise ValueError("cannot embed")
+
+    queue = IngestQueue(apply, lambda uid: False, finish=lambda: finished.append(1) or 2, chunk_rows=2)
+    job = queue.submit(write_csv(tmp_path / "up.csv", ["a", "b", "bad", "c"]))
+    assert job.done.wait(10)
+    assert job.state == "failed" and job.error == "cannot embed"
+    assert finished == [1] and job.rows == 2 and job.rows_added == 2
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 3, 100])
+def test_queue_counts_every_row_once(tmp_path, chunk_rows):
+    ids, known = [f"r{i}" for i in range(10)], set()
+    # rows seen in earlier chunks are caught through the catalog that apply_chunk grows
+    queue = IngestQueue(lambda chunk: known.update(chunk["uniq_id"]), known.__contains__, chunk_rows=chunk_rows)
+    job = queue.submit(write_csv(tmp_path / "up.csv", ids + ids[:3]))
+    assert job.done.wait(10)
+    assert (job.rows_read, job.rows_added, job.duplicates) == (13, 10, 3)
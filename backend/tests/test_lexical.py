@@ -0,0 +1,66 @@
+# tests/test_lexical.py
+"""BM25 segments (append, reload, masks) and reciprocal rank fusion."""
+import numpy as np
+import pytest
+
+from app.services.lexical import BM25Index, rrf_fuse, tokenize
+
+DOCS = ["oak dining table", "walnut coffee table", "velvet accent chair",
+        "oak bookshelf with oak trim", "steel office chair"]
+
+
+def test_rrf_fuse_rewards_rows_ranked_high_in_both_lists():
+    fused = rrf_fuse([[1, 2, 3], [3, 1, 4]], top_k=3, rrf_k=60)
+    assert [i for i, _ in fused] == [1, 3, 2]
+    assert fused[0][1] == pytest.approx(1 / 61 + 1 / 62)
+
+
+def test_rrf_fuse_breaks_ties_by_row_id_and_truncates():
+    assert rrf_fuse([[7, 5], [5, 7]], top_k=5) == rrf_fuse([[5, 7], [7, 5]], top_k=5)
+    assert [i for i, _ in rrf_fuse([[7, 5], [5, 7]], top_k=1)] == [5]
+    assert rrf_fuse([[], []], top_k=3) == []
+
+
+def test_search_ranks_matching_rows(tmp_path):
+    idx = BM25Index(str(tmp_path))
+    assert idx.add(DOCS) == len(DOCS)
+    hits = idx.search("oak table", top_k=5)
+    assert hits[0][0] == 0  # both terms
+    assert {i for i, _ in hits} == {0, 1, 3}
+    assert idx.search("sofa", top_k=5) == []
+
+
+def test_mask_excludes_rows(tmp_path):
+    idx = BM25Index(str(tmp_path))
+    idx.add(DOCS)
+    mask = np.array([False, True, True, True, True])
+    assert {i for i, _ in idx.search("oak table", top_k=5, mask=mask)} == {1, 3}
+    # a mask built for fewer rows leaves the newer ones out
+    assert {i for i, _ in idx.search("chair", top_k=5, mask=np.ones(3, dtype=bool))} == {2}
+
+
+def test_appended_segments_score_like_a_single_build(tmp_path):
+    one = BM25Index(str(tmp_path / "one"))
+    one.add(DOCS)
+    many = BM25Index(str(tmp_path / "many"))
+    many.add(DOCS[:2])
+    many.add(DOCS[2:4])
+    many.add(DOCS[4:])
+    assert many.avgdl == pytest.approx(one.avgdl)
+    for query in ("oak table", "chair", "walnut coffee"):
+        assert many.search(query, top_k=5) == pytest.approx(one.search(query, top_k=5))
+
+    reloaded = BM25Index.load(str(tmp_path / "many"))
+    assert reloaded.n == len(DOCS)
+    assert reloaded.avgdl == pytest.approx(one.avgdl)
+    assert reloaded.search("oak table", top_k=5) == pytest.approx(one.search("oak table", top_k=5))
+
+
+def test_load_without_an_index(tmp_path):
+    assert BM25Index.load(str(tmp_path)) is None
+
+
+def test_tokenize_folds_case_and_accents():
+    assert tokenize("Oak, Dining-TABLE!") == ["oak", "dining", "table"]
+    assert tokenize("IKEA Poäng") == ["ikea", "poang"]
+    assert tokenize(None) == []
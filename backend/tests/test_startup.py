@@ -0,0 +1,24 @@
+# tests/test_startup.py
+"""`import app.main` stays cheap: see benchmarks/startup.py (fresh interpreters, best of 3)."""
+import pytest
+
+from benchmarks.startup import DEFAULT_BUDGET_S, HEAVY, probe_import
+
+
+@pytest.fixture(scope="module")
+def runs():
+    return [probe_import() for _ in range(3)]
+
+
+def test_import_time_within_budget(runs):
+    best = min(r["import_s"] for r in runs)
+    assert best <= DEFAULT_BUDGET_S, f"import app.main took {best:.2f}s (budget {DEFAULT_BUDGET_S:.2f}s)"
+
+
+def test_no_heavy_modules_imported(runs):
+    heavy = sorted({name for r in runs for name in r["heavy"]})
+    assert not heavy, f"imported at startup (one of {HEAVY}): {heavy}"
+
+
+def test_catalog_not_loaded_at_import(runs):
+    assert not any(r["catalog_loaded"] for r in runs)
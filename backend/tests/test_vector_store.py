@@ -0,0 +1,122 @@
+# tests/test_vector_store.py
+"""VectorStore appends and the IVF / int8 / mmap search paths against exact brute force."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.vector_store import VectorStore
+from benchmarks.standin import HashingEmbedder
+from benchmarks.synthetic import make_catalog, make_queries
+
+TEXT_COLS = ["title", "description", "categories", "brand", "material", "color"]
+CONFIGS = {
+    "exact": {},
+    "mmap": {"mmap": True},
+    "ivf": {"index_type": "ivf", "nlist": 16, "nprobe": 16},
+    "int8": {"storage": "int8"},
+    "ivf-int8-mmap": {"index_type": "ivf", "nlist": 16, "nprobe": 16, "storage": "int8", "mmap": True},
+}
+
+
+@pytest.fixture(scope="module")
+def embedder():
+    return HashingEmbedder(dim=32)
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return make_catalog(600, seed=3)
+
+
+@pytest.fixture(scope="module")
+def queries(embedder):
+    q = embedder.encode(make_queries(20, seed=4))
+    return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+
+def exact_topk(vectors: np.ndarray, q: np.ndarray, k: int, mask=None) -> list:
+    sims = np.asarray(vectors, dtype="float32") @ q
+    if mask is not None:
+        sims = np.where(mask, sims, -np.inf)
+    return [int(i) for i in np.argsort(-sims, kind="stable")[:k]]
+
+
+def built(path, catalog, embedder, **kw) -> VectorStore:
+    vs = VectorStore(str(path), **kw)
+    vs.build(catalog, embedder, TEXT_COLS)
+    return vs
+
+
+@pytest.mark.parametrize("config", list(CONFIGS))
+def test_append_keeps_vectors_and_meta_aligned(tmp_path, catalog, embedder, config):
+    vs = VectorStore(str(tmp_path), **CONFIGS[config])
+    vs.build(catalog.iloc[:400], embedder, TEXT_COLS)
+    for start, end in ((400, 450), (450, 520), (520, 600)):
+        part = catalog.iloc[start:end]
+        assert vs.append(part, embeddings=vs.embed(part, embedder)) == end
+
+    reopened = VectorStore(str(tmp_path), **CONFIGS[config])
+    meta = pd.read_csv(reopened.meta_path)
+    assert reopened.n == len(meta) == len(catalog)
+    assert meta["uniq_id"].tolist() == catalog["uniq_id"].tolist()
+    np.testing.assert_allclose(reopened.vectors, reopened.embed(catalog, embedder), atol=1e-5)
+    # an appended row is its own nearest neighbour
+    row = 555
+    hits = reopened.search_embedding(np.asarray(reopened.vectors[row]), top_k=3)
+    assert row in [i for i, _ in hits]
+    assert hits[0][1] == pytest.approx(1.0, abs=1e-2)
+
+
+@pytest.mark.parametrize("config", [c for c in CONFIGS if c != "exact"])
+def test_search_matches_exact(tmp_path, catalog, embedder, queries, config):
+    vs = built(tmp_path, catalog, embedder, **CONFIGS[config])
+    vectors = np.asarray(vs.vectors)
+    k = 10
+    recall = []
+    for q in queries:
+        want = exact_topk(vectors, q, k)
+        got = [i for i, _ in vs.search_embedding(q, top_k=k)]
+        assert len(got) == k
+        recall.append(len(set(got) & set(want)) / k)
+    # int8 scores candidates approximately, then re-ranks them in float32
+    assert np.mean(recall) >= (0.95 if CONFIGS[config].get("storage") == "int8" else 1.0)
+
+
+def test_search_batch_matches_single_queries(tmp_path, catalog, embedder, queries):
+    vs = built(tmp_path, catalog, embedder)
+    batch = vs.search_batch(queries, top_k=5)
+    single = [vs.search_embedding(q, top_k=5) for q in queries]
+    for b, s in zip(batch, single):
+        assert [i for i, _ in b] == [i for i, _ in s]
+        np.testing.assert_allclose([x for _, x in b], [x for _, x in s], atol=1e-5)
+
+
+@pytest.mark.parametrize("config", list(CONFIGS))
+def test_mask_restricts_results(tmp_path, catalog, embedder, queries, config):
+    vs = built(tmp_path, catalog, embedder, **CONFIGS[config])
+    mask = np.zeros(vs.n, dtype=bool)
+    mask[::7] = True
+    vectors = np.asarray(vs.vectors)
+    for q in queries[:5]:
+        got = [i for i, _ in vs.search_embedding(q, top_k=10, mask=mask)]
+        assert len(got) == 10
+        assert all(mask[i] for i in got)
+        if CONFIGS[config].get("storage") != "int8":
+            assert got == exact_topk(vectors, q, 10, mask=mask)
+
+
+def test_ivf_mask_probes_more_lists_for_sparse_filters(tmp_path, catalog, embedder, queries):
+    vs = built(tmp_path, catalog, embedder, index_type="ivf", nlist=16, nprobe=1)
+    mask = np.zeros(vs.n, dtype=bool)
+    mask[::50] = True
+    got = vs.search_embedding(queries[0], top_k=8, mask=mask)
+    assert len(got) == 8
+    assert all(mask[i] for i, _ in got)
+
+
+def test_mask_for_a_shorter_catalog_is_padded(tmp_path, catalog, embedder, queries):
+    vs = built(tmp_path, catalog, embedder)
+    mask = np.ones(vs.n - 100, dtype=bool)  # built before the last rows were indexed
+    got = vs.search_embedding(queries[0], top_k=vs.n, mask=mask)
+    assert len(got) == vs.n - 100
+    assert max(i for i, _ in got) < vs.n - 100
@@ -55,7 +55,7 @@ export default function ProductCard({
           ) : null}
         </div>
 
-        <p className="desc">{description}</p>
+        <p className="desc">{description ?? "Writing description…"}</p>
       </div>
     </a>
   );
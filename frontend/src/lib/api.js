@@ -22,3 +22,43 @@ export function resolveImageUrl(raw) {
   // Amazon filename only → backend adds base
   return `${API_BASE}/images/${encodeURIComponent(first)}`;
 }
+
+/**
+ * POST /recommend/stream and dispatch its NDJSON events as they arrive:
+ * - onHits(items): ranked product cards (generated_description may be null)
+ * - onDescription(index, text): a pending description finished
+ */
+export async function streamRecommend({ query, k }, { onHits, onDescription }) {
+  const res = await fetch(`${API_BASE}/recommend/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ query, k }),
+  });
+  if (!res.ok) throw new Error(await res.text());
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = "";
+  let items = [];
+
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buf += decoder.decode(value, { stream: true });
+
+    let nl;
+    while ((nl = buf.indexOf("\n")) >= 0) {
+      const line = buf.slice(0, nl).trim();
+      buf = buf.slice(nl + 1);
+      if (!line) continue;
+      const evt = JSON.parse(line);
+      if (evt.type === "hits") {
+        items = evt.items || [];
+        onHits?.(items);
+      } else if (evt.type === "description") {
+        onDescription?.(evt.index, evt.generated_description);
+      }
+    }
+  }
+  return items;
+}
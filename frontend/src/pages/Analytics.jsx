@@ -26,8 +26,8 @@ export default function Analytics() {
           await fetch(`${API_BASE}/healthz`, { mode: "cors" });
         } catch (_) {}
 
-        // 2) Now hit analytics
-        const res = await fetch(`${API_BASE}/analytics/summary`, { mode: "cors" });
+        // 2) Now hit analytics (no-cache = revalidate via ETag; unchanged data comes back as 304)
+        const res = await fetch(`${API_BASE}/analytics/summary`, { mode: "cors", cache: "no-cache" });
         if (!res.ok) {
           const txt = await res.text().catch(() => "");
           throw new Error(`API ${res.status}: ${txt || "failed"}`);
@@ -1,7 +1,7 @@
 // frontend/src/pages/Chat.jsx
 import React, { useState } from "react";
 import ProductCard from "../components/ProductCard";
-import { API_BASE } from "../lib/api";
+import { streamRecommend } from "../lib/api";
 
 export default function Chat() {
   const [query, setQuery] = useState("");
@@ -17,14 +17,22 @@ export default function Chat() {
     setLoading(true);
 
     try {
-      const res = await fetch(`${API_BASE}/recommend`, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ query, k }),
-      });
-      if (!res.ok) throw new Error(await res.text());
-      const data = await res.json();
-      setResults(data);
+      // cards render at search latency; descriptions fill in as they stream
+      const data = await streamRecommend(
+        { query, k },
+        {
+          onHits: (items) => {
+            setResults(items);
+            setLoading(false);
+          },
+          onDescription: (index, text) =>
+            setResults((rs) =>
+              rs.map((r, i) =>
+                i === index ? { ...r, generated_description: text } : r
+              )
+            ),
+        }
+      );
 
       const line = data?.length
         ? `Found ${data.length} products for: "${query}"`